@@ -0,0 +1,79 @@
+"""
+Matching of the STM32 answers to the outstanding serial requests. Run from the BILBO-Software directory:
+    python -m pytest _tests/test_serial_late_answers.py
+"""
+import ctypes
+import os
+import time
+
+import core.communication.serial.serial_interface as serial_interface
+from core.communication.serial.core.serial_protocol import UART_Message
+from core.communication.serial.serial_interface import Serial_Interface, SerialCommandType
+
+
+def make_interface() -> Serial_Interface:
+    # The serial port is opened, but never used. A pseudo terminal stands in for the STM32
+    _, port = os.openpty()
+    interface = Serial_Interface(port=os.ttyname(port))
+    interface.sent = []
+    interface._send = lambda **kwargs: interface.sent.append(kwargs)
+    return interface
+
+
+def answer(interface: Serial_Interface, address: int, value: int, module: int = 1):
+    msg = UART_Message()
+    msg.cmd = SerialCommandType.UART_CMD_ANSWER
+    msg.module = module
+    msg.address = address
+    msg.flag = 1
+    msg.data = bytes(ctypes.c_uint8(value))
+    interface._handleIncomingMessage(msg)
+
+
+def test_answers_in_order():
+    interface = make_interface()
+    first = interface.readAsync(address=0x10, type=ctypes.c_uint8)
+    second = interface.readAsync(address=0x10, type=ctypes.c_uint8)
+    answer(interface, 0x10, 1)
+    answer(interface, 0x10, 2)
+    assert first.wait(0.1) == 1
+    assert second.wait(0.1) == 2
+
+
+def test_late_answer_is_discarded():
+    interface = make_interface()
+    stale = interface.functionAsync(address=0x20, data=1, input_type=ctypes.c_uint8, output_type=ctypes.c_uint8)
+    assert stale.wait(0.01) is None
+
+    # The answer of the timed out call arrives after the next call was sent
+    request = interface.functionAsync(address=0x20, data=2, input_type=ctypes.c_uint8, output_type=ctypes.c_uint8)
+    answer(interface, 0x20, 11)
+    assert not request.event.is_set()
+    answer(interface, 0x20, 22)
+    assert request.wait(0.1) == 22
+
+
+def test_cancelled_request_behind_pending_request():
+    interface = make_interface()
+    first = interface.readAsync(address=0x30, type=ctypes.c_uint8)
+    second = interface.readAsync(address=0x30, type=ctypes.c_uint8)
+    second.cancel()
+    answer(interface, 0x30, 1)
+    assert first.wait(0.1) == 1
+    answer(interface, 0x30, 2)
+    third = interface.readAsync(address=0x30, type=ctypes.c_uint8)
+    answer(interface, 0x30, 3)
+    assert third.wait(0.1) == 3
+
+
+def test_lost_answer_expires(monkeypatch):
+    monkeypatch.setattr(serial_interface, 'LATE_ANSWER_TIMEOUT', 0.05)
+    interface = make_interface()
+    lost = interface.readAsync(address=0x40, type=ctypes.c_uint8)
+    assert lost.wait(0.01) is None
+    time.sleep(0.1)
+
+    # The answer of the cancelled request never arrived, so the next answer belongs to the next request
+    request = interface.readAsync(address=0x40, type=ctypes.c_uint8)
+    answer(interface, 0x40, 5)
+    assert request.wait(0.1) == 5
@@ -0,0 +1,142 @@
+"""
+Stream schema handshake between the WIFI interface and the server, and the binary encoding of the samples. Run from the
+BILBO-Software directory:
+    python -m pytest _tests/test_stream_schema.py
+"""
+import dataclasses
+
+import pytest
+
+from core.communication.wifi.tcp.protocols.tcp_json_protocol import TCP_JSON_Message
+from core.communication.wifi.tcp.protocols.tcp_stream_protocol import (TCP_Stream_Message, TCP_Stream_Protocol,
+                                                                       TCP_Stream_Schema)
+from core.communication.wifi.wifi_interface import WIFI_Interface
+
+
+@dataclasses.dataclass
+class Estimation:
+    x: float
+    v: float
+
+
+@dataclasses.dataclass
+class Sample:
+    tick: int
+    mode: str
+    estimation: Estimation
+
+
+class Server:
+    """
+    Receiving side of the handshake, as done by the TCP connection of the RobotManager. The acknowledgements are
+    received after the sample is sent, like from the receiving thread of the interface
+    """
+
+    def __init__(self, interface: WIFI_Interface):
+        self.interface = interface
+        self.schemas = {}
+        self.json_samples = []
+        self.binary_samples = []
+        self._acks = []
+        interface.connected = True
+        interface._wifi_send = self.receive
+
+    def send(self, sample: dict):
+        self.interface.sendStreamMessage(sample)
+        while self._acks:
+            self.interface._handlerEventMessage(self._acks.pop(0))
+
+    def receive(self, message):
+        if isinstance(message, TCP_Stream_Message):
+            decoded = TCP_Stream_Protocol.decode(TCP_Stream_Protocol.encode(message), self.schemas)
+            assert decoded.schema is not None
+            self.binary_samples.extend(decoded.samples)
+        elif message.type == 'event' and message.event == 'stream_schema':
+            schema = TCP_Stream_Schema.fromDict(message.data)
+            self.schemas[schema.id] = schema
+            ack = TCP_JSON_Message()
+            ack.type = 'event'
+            ack.event = 'stream_schema_ack'
+            ack.data = {'schema_id': schema.id}
+            self._acks.append(ack)
+        elif message.type == 'stream':
+            self.json_samples.append(message.data)
+
+
+@pytest.fixture
+def interface():
+    interface = WIFI_Interface(device_id='test', stream_batch_size=2, stream_sample_type=Sample)
+    yield interface
+    interface._resetStream()
+
+
+def sample(tick, **extra):
+    return {'tick': tick, 'mode': 'balancing', 'estimation': {'x': 0, 'v': 1.5, **extra}}
+
+
+# ======================================================================================================================
+def test_handshake(interface):
+    server = Server(interface)
+
+    # The first sample announces the schema and is sent as JSON, since the schema is not acknowledged yet
+    server.send(sample(0))
+    assert server.json_samples == [sample(0)]
+    assert list(server.schemas) == [1]
+    assert server.schemas[1].fields == [('tick', 'q'), ('mode', 's'), ('estimation.x', 'd'), ('estimation.v', 'd')]
+
+    server.send(sample(1))
+    assert server.binary_samples == []
+    server.send(sample(2))
+    assert server.binary_samples == [sample(1), sample(2)]
+    # The declared type is used for x, although the first value was an int
+    assert isinstance(server.binary_samples[0]['estimation']['x'], float)
+
+
+def test_added_field_renegotiates(interface):
+    server = Server(interface)
+    for tick in range(3):
+        server.send(sample(tick))
+
+    # The added field must not be dropped silently. The sample goes out as JSON and a new schema is announced
+    server.send(sample(3, a=2.0))
+    assert server.json_samples[-1] == sample(3, a=2.0)
+    server.send(sample(4, a=3.0))
+    assert list(server.schemas) == [1, 2]
+    assert ('estimation.a', 'd') in server.schemas[2].fields
+
+    server.send(sample(5, a=4.0))
+    server.send(sample(6, a=5.0))
+    assert server.binary_samples[-2:] == [sample(5, a=4.0), sample(6, a=5.0)]
+
+
+def test_removed_field_renegotiates(interface):
+    server = Server(interface)
+    for tick in range(3):
+        server.send(sample(tick))
+
+    reduced = {'tick': 3, 'mode': 'balancing', 'estimation': {'x': 0.0}}
+    server.send(reduced)
+    assert server.json_samples[-1] == reduced
+    server.send(reduced)
+    assert list(server.schemas) == [1, 2]
+
+
+def test_schema_id_skips_zero(interface):
+    server = Server(interface)
+    interface._stream_schema_id = 0xFFFF
+    server.send(sample(0))
+    assert list(server.schemas) == [1]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def test_encode_rejects_other_fields():
+    schema = TCP_Stream_Schema.fromSample(sample(0), schema_id=1, sample_type=Sample)
+    encoded = schema.encodeSample(sample(1))
+    assert schema.decodeSample(encoded) == (sample(1), len(encoded))
+
+    with pytest.raises(KeyError):
+        schema.encodeSample(sample(1, a=1.0))
+    with pytest.raises(KeyError):
+        schema.encodeSample({'tick': 1, 'mode': 'balancing', 'estimation': 3.0, 'other': 1})
+    with pytest.raises(KeyError):
+        schema.encodeSample({'tick': 1, 'mode': 'balancing', 'estimation': 3.0})
@@ -10,6 +10,7 @@ from core.utils.time import precise_sleep
 from core.utils.callbacks import callback_definition, CallbackContainer
 
 SERIAL_BUFFER_SIZE = 8192
+SERIAL_READ_TIMEOUT = 0.1
 
 
 @callback_definition
@@ -76,7 +77,8 @@ class UART_Socket:
             raise Exception(f"UART Device {self.device} does not exist!")
 
         # self._device = serial.Serial(self.device, baudrate=self.baudrate, timeout=self.timeout)
-        self._device = serial.Serial(self.device, baudrate=self.baudrate)
+        # Reads block until data is available, but at most SERIAL_READ_TIMEOUT, so the rx thread can exit
+        self._device = serial.Serial(self.device, baudrate=self.baudrate, timeout=SERIAL_READ_TIMEOUT)
 
         self.callbacks = UART_Socket_Callbacks()
 
@@ -126,26 +128,40 @@ class UART_Socket:
     # === PRIVATE METHODS ==============================================================================================
     def _rxThreadFunction(self):
         """
-
-        :return:
+        Reads all bytes waiting in the serial driver at once and splits the received data into frames at the
+        delimiter. All frames completed by one read are handled together. Incomplete frames stay in the buffer
+        until the rest is received.
         """
-        # TODO: This might not be the best way to do it
-        buffer = [b'\x00'] * SERIAL_BUFFER_SIZE
-        idx_write = 0
+        buffer = bytearray()
+        delimiter = self.config['delimiter']
 
         while not self._exit:
-            # Read data
-            data = self._device.read(size=1)
-            # Put the data into the reception buffer
-            if len(data) > 0:
-                buffer[idx_write] = data
-
-                # Check if the delimiter is reached
-                if buffer[idx_write] == self.config['delimiter']:
-                    self._rx_handling(buffer[0:idx_write + 1])
-                    idx_write = 0
-                else:
-                    idx_write += 1
+            # Read data. Blocks until at least one byte is available or the read timeout is reached
+            data = self._device.read(size=max(1, self._device.in_waiting))
+            if len(data) == 0:
+                continue
+
+            # Only the new data (and a possibly split delimiter) has to be searched
+            search_start = max(0, len(buffer) - len(delimiter) + 1)
+            buffer += data
+
+            frames = []
+            frame_start = 0
+            index = buffer.find(delimiter, search_start)
+            while index != -1:
+                frames.append(buffer[frame_start:index])
+                frame_start = index + len(delimiter)
+                index = buffer.find(delimiter, frame_start)
+
+            if frame_start > 0:
+                del buffer[:frame_start]
+            elif len(buffer) > SERIAL_BUFFER_SIZE:
+                logging.warning(f"No delimiter in the last {len(buffer)} bytes received from {self.device}. "
+                                f"Discarding the data")
+                buffer.clear()
+
+            if len(frames) > 0:
+                self._rx_handling(frames)
 
     # ------------------------------------------------------------------------------------------------------------------
     def _txThreadFunction(self):
@@ -161,24 +177,34 @@ class UART_Socket:
                 ...
 
     # ------------------------------------------------------------------------------------------------------------------
-    def _rx_handling(self, buffer):
-        if isinstance(buffer, list):
-            buffer = b''.join(buffer)
-
-        if self.config['cobs']:
-            # Remove the last zero
-            buffer = buffer[0:-1]
-            try:
-                buffer = cobs.decode(buffer)
-            except:
-                logging.warning(f"Cannot COBS decode buffer:{buffer} ")
-                return
-
-        self.rx_queue.put_nowait(buffer)
-        for cb in self.callbacks.rx:
-            cb(buffer)
-
-        self.events['rx'].set()
+    def _rx_handling(self, frames: list):
+        """
+        Decodes a batch of frames (without delimiters) and passes them to the rx queue and the callbacks. COBS frames
+        are passed decoded. Other frames are passed as received, including the trailing delimiter
+        """
+        packets = []
+        for frame in frames:
+            if self.config['cobs']:
+                # Empty frames come from consecutive delimiters and carry no data
+                if len(frame) == 0:
+                    continue
+                try:
+                    frame = cobs.decode(frame)
+                except Exception as e:
+                    logging.warning(f"Cannot COBS decode buffer:{bytes(frame)} ({e})")
+                    continue
+            else:
+                frame = bytes(frame) + self.config['delimiter']
+
+            packets.append(frame)
+
+        for packet in packets:
+            self.rx_queue.put_nowait(packet)
+            for cb in self.callbacks.rx:
+                cb(packet)
+
+        if len(packets) > 0:
+            self.events['rx'].set()
 
     # ------------------------------------------------------------------------------------------------------------------
     def _write(self, data):
@@ -1,6 +1,9 @@
+import collections
 import ctypes
 import enum
+import itertools
 import threading
+import time
 
 # === OWN PACKAGES =====================================================================================================
 from core.communication.serial.core.serial_protocol import UART_Message
@@ -10,6 +13,7 @@ from core.utils.ctypes_utils import is_valid_ctype, ctype_to_value, value_to_cty
 from core.utils.callbacks import callback_definition, CallbackContainer, Callback
 from core.utils.events import event_definition, ConditionEvent
 from core.utils.logging_utils import Logger
+from core.utils.bytes_utils import byteArrayToInt
 import core
 
 # === GLOBAL VARIABLES =================================================================================================
@@ -17,6 +21,10 @@ import core
 logger = Logger('SERIAL')
 logger.setLevel('INFO')
 
+# Time in seconds a cancelled request waits for its late answer. If no answer arrives in this time, it is assumed to be
+# lost, so that the following requests to the same module and address are not shifted by one answer forever
+LATE_ANSWER_TIMEOUT = 1.0
+
 
 # known_messages = []  # Holds all defined SerialMessages
 
@@ -59,16 +67,56 @@ class SerialMessage:
 
 # ======================================================================================================================
 class ReadRequest:
+    """
+    Outstanding request that waits for an answer of the STM32. Works like a future: the serial thread sets msg and
+    the event when the answer arrives, wait() blocks until then and returns the decoded value.
+
+    The firmware does not echo a sequence number, but it answers the requests in the order they were received. So
+    requests to the same module and address are matched to answers in the order of their sequence number. A cancelled
+    request keeps its place in this order until its late answer arrives, which is then discarded.
+    """
     event: threading.Event
     module: int = 0
     address: int
+    sequence: int = 0
+    type: type = None
     msg: UART_Message = None
     timeout: bool = True
     flag: int = 0
+    cancel_time: float = None  # Time of the cancellation (time.monotonic()), None while the request is waited for
+
+    _on_cancel: callable = None
 
     def __init__(self):
         self.event = threading.Event()
 
+    def wait(self, timeout: float = None):
+        """
+        Waits for the answer and returns its value. Returns None if the request timed out, the STM32 answered with
+        an error or the answer does not match the type of the request.
+        """
+        if not self.event.wait(timeout=timeout):
+            self.cancel()
+            return None
+
+        self.timeout = False
+        self.flag = self.msg.flag
+        if self.msg.flag != 1 or self.type is None:
+            return None
+
+        # Check if the data length matches the data type
+        if not ctypes.sizeof(self.type) == len(self.msg.data):
+            return None
+        return bytes_to_value(self.msg.data, self.type)
+
+    def cancel(self):
+        """
+        Stops waiting for the answer. A late answer is discarded and not given to the next request for the same module
+        and address, which may be a function call with different inputs.
+        """
+        if self._on_cancel is not None and not self.event.is_set():
+            self._on_cancel(self)
+
 
 # === CALLBACKS ========================================================================================================
 @callback_definition
@@ -100,7 +148,8 @@ class Serial_Interface:
 
     _thread: threading.Thread
     _exit: bool = False
-    _readRequest = list[ReadRequest]
+    _readRequests: dict[tuple[int, int], collections.OrderedDict[int, ReadRequest]]
+    _readRequestsLock: threading.Lock
 
     def __init__(self, port: str, baudrate: int = 115200):
         self.device = SerialConnection(device=port, baudrate=baudrate)
@@ -109,7 +158,10 @@ class Serial_Interface:
 
         self.known_messages = []
 
-        self._readRequests = []
+        # Outstanding requests by (module, address) and then by sequence number
+        self._readRequests = {}
+        self._readRequestsLock = threading.Lock()
+        self._sequence = itertools.count()
 
     # ------------------------------------------------------------------------------------------------------------------
     def init(self):
@@ -157,28 +209,62 @@ class Serial_Interface:
 
     # ------------------------------------------------------------------------------------------------------------------
 
-    def read(self, address, module: int = 1, type=None):
+    def writeMany(self, writes: list[dict]):
+        """
+        Sends several writes back-to-back.
+
+        :param writes: List of dicts with the arguments of write(), e.g. {'module': 1, 'address': 0x10, 'value': 2.0,
+                       'type': ctypes.c_float}
+        """
+        for write in writes:
+            self.write(**write)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def read(self, address, module: int = 1, type=None, timeout=0.1):
+        request = self.readAsync(address=address, module=module, type=type)
+        return request.wait(timeout=timeout)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def readAsync(self, address, module: int = 1, type=None) -> ReadRequest:
+        """
+        Sends a read request without waiting for the answer. The value is returned by wait() of the request.
+        """
         assert (type is None or is_valid_ctype(type))
 
-        # Send the message for reading
+        # Register before sending, so that a fast answer cannot get lost
+        request = self._registerRead(module=module, address=address, type=type)
         self._send(cmd=SerialCommandType.UART_CMD_READ, module=module, address=address, flag=0, data=[])
-        request = self._registerRead(module=module, address=address)
-
-        event_success = request.event.wait(timeout=0.1)
+        return request
 
-        if event_success and request.msg.flag == 1:
-            # Check if the data length matches the data type
-            if not ctypes.sizeof(type) == len(request.msg.data):
-                return None
-            else:
-                return bytes_to_value(request.msg.data, type)
-        else:
-            return None
+    # ------------------------------------------------------------------------------------------------------------------
+    def readMany(self, reads: list[dict], timeout=0.5) -> list:
+        """
+        Sends several read requests back-to-back and waits for all answers, so that the reads take one round-trip
+        instead of one round-trip per read.
+
+        :param reads: List of dicts with the arguments of read(), e.g. {'module': 1, 'address': 0x10,
+                      'type': ctypes.c_float}
+        :param timeout: Time to wait for all answers
+        :return: List of the values in the order of the reads. Values of failed reads are None
+        """
+        requests = [self.readAsync(**read) for read in reads]
+        return self._waitForRequests(requests, timeout)
 
     # ------------------------------------------------------------------------------------------------------------------
 
     def function(self, address, module: int = 1, data=None, input_type=None, output_type=None, timeout=1):
+        request = self.functionAsync(address=address, module=module, data=data, input_type=input_type,
+                                     output_type=output_type)
+        if request is None:
+            return None
+        return request.wait(timeout=timeout)
 
+    # ------------------------------------------------------------------------------------------------------------------
+    def functionAsync(self, address, module: int = 1, data=None, input_type=None, output_type=None) -> ReadRequest:
+        """
+        Sends a function call without waiting for the answer. Returns a request if output_type is given, otherwise
+        the function does not return anything and None is returned.
+        """
         assert (input_type is None or is_valid_ctype(input_type))
         assert (output_type is None or is_valid_ctype(output_type))
 
@@ -189,24 +275,14 @@ class Serial_Interface:
         else:
             buffer = None
 
-        # logger.info(f"Sending function call to module {module} and address {address} with data {buffer}")
-        self._send(cmd=SerialCommandType.UART_CMD_FCT, module=module, address=address, flag=0, data=buffer)
-
         # Register for reading if type is not None
+        request = None
         if output_type is not None:
-            req = self._registerRead(module=module, address=address)
-            event_success = req.event.wait(timeout=timeout)
-            if event_success and req.msg.flag == 1:
-                # Check if the data length matches the data type
-                if not ctypes.sizeof(output_type) == len(req.msg.data):
-                    return None
-                else:
-                    x = ctype_to_value(bytes_to_ctype(req.msg.data, output_type), output_type)
-                    return ctype_to_value(bytes_to_ctype(req.msg.data, output_type), output_type)
-            else:
-                return None
-        else:
-            return None
+            request = self._registerRead(module=module, address=address, type=output_type)
+
+        # logger.info(f"Sending function call to module {module} and address {address} with data {buffer}")
+        self._send(cmd=SerialCommandType.UART_CMD_FCT, module=module, address=address, flag=0, data=buffer)
+        return request
 
     # ------------------------------------------------------------------------------------------------------------------
     def isRunning(self):
@@ -256,21 +332,24 @@ class Serial_Interface:
     # ------------------------------------------------------------------------------------------------------------------
     def _handleMessage_answer(self, msg):
 
-        # Go through all the read requests and check if anyone waits for this
-        if len(self._readRequests) == 0:
+        # The oldest outstanding request for this module and address gets the answer
+        key = (msg.module, msg.address)
+        with self._readRequestsLock:
+            self._removeExpiredRequests(key)
+            requests = self._readRequests.get(key)
+            if not requests:
+                return
+            _, req = requests.popitem(last=False)
+            if len(requests) == 0:
+                del self._readRequests[key]
+
+        if req.cancel_time is not None:
+            logger.debug(f"Discarding late answer for cancelled request {req.module}:{req.address} ({req.sequence})")
             return
 
-        found_request = None
-        for req in self._readRequests:
-            if req.module == msg.module and req.address == msg.address:
-                logger.debug(f"Got an answer for request {req.module}:{req.address}")
-                req.msg = msg
-                req.event.set()
-                found_request = req
-                break
-
-        if found_request is not None:
-            self._readRequests.remove(found_request)
+        logger.debug(f"Got an answer for request {req.module}:{req.address} ({req.sequence})")
+        req.msg = msg
+        req.event.set()
 
     # ------------------------------------------------------------------------------------------------------------------
     def _handleMessage_stream(self, message):
@@ -292,16 +371,58 @@ class Serial_Interface:
 
     # ------------------------------------------------------------------------------------------------------------------
 
-    def _registerRead(self, module, address):
+    def _registerRead(self, module, address, type=None) -> ReadRequest:
         request = ReadRequest()
 
+        # Answers carry the address as integer
+        if isinstance(address, (list, bytes, bytearray)):
+            address = byteArrayToInt(address)
+
         request.address = address
         request.module = module
-
-        logger.debug(f"Register read request for module {module} and address {address}")
-        self._readRequests.append(request)
+        request.type = type
+        request.sequence = next(self._sequence)
+        request._on_cancel = self._removeRead
+
+        logger.debug(f"Register read request for module {module} and address {address} ({request.sequence})")
+        with self._readRequestsLock:
+            self._removeExpiredRequests((module, address))
+            self._readRequests.setdefault((module, address), collections.OrderedDict())[request.sequence] = request
         return request
 
+    # ------------------------------------------------------------------------------------------------------------------
+    def _removeRead(self, request: ReadRequest):
+        """
+        Called when a request is cancelled. The request stays in the queue until its late answer arrives or
+        LATE_ANSWER_TIMEOUT has passed, so that the answer is not matched to the next request
+        """
+        with self._readRequestsLock:
+            request.cancel_time = time.monotonic()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _removeExpiredRequests(self, key):
+        """
+        Removes the cancelled requests at the front of the queue whose answer did not arrive in LATE_ANSWER_TIMEOUT. Must
+        be called with the lock held
+        """
+        requests = self._readRequests.get(key)
+        if requests is None:
+            return
+        now = time.monotonic()
+        while requests:
+            request = next(iter(requests.values()))
+            if request.cancel_time is None or now - request.cancel_time < LATE_ANSWER_TIMEOUT:
+                break
+            requests.popitem(last=False)
+        if len(requests) == 0:
+            del self._readRequests[key]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _waitForRequests(self, requests: list[ReadRequest], timeout) -> list:
+        # All requests share one deadline
+        deadline = time.monotonic() + timeout
+        return [request.wait(timeout=max(0.0, deadline - time.monotonic())) for request in requests]
+
     # ------------------------------------------------------------------------------------------------------------------
     def _send(self, cmd: int = 0, module: int = 0, address: (bytes, bytearray, list, int) = None, flag: int = 0,
               data=None):
@@ -1,8 +1,35 @@
+import struct
 from typing import Union
 
 from core.communication.protocol import Protocol, Message
 from core.utils.network import ipv4_to_bytes, bytes_to_ipv4
 
+CRC8_POLYNOMIAL = 0x07
+
+
+def _crc8_table(polynomial: int) -> list:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ polynomial) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return table
+
+
+_CRC8_TABLE = _crc8_table(CRC8_POLYNOMIAL)
+
+
+def crc8(data: Union[bytes, bytearray, memoryview]) -> int:
+    """
+    CRC-8 (polynomial 0x07, initial value 0x00) of the given data, computed with a 256-entry lookup table.
+    """
+    table = _CRC8_TABLE
+    crc = 0
+    for byte in data:
+        crc = table[crc ^ byte]
+    return crc
+
 
 class TCP_Base_Message(Message):
     data_protocol_id: int
@@ -39,6 +66,8 @@ class TCP_Base_Protocol(Protocol):
     |   15+N-1   |   PAYLOAD[N-1]    |   Payload                     |
     |   15+N     |   CRC8            |   CRC8 of the Payload         |
     |   16+N     |   FOOTER          |   Footer                      |   0x5D
+
+    The CRC8 uses the polynomial 0x07. Older clients send 0x00 instead of the CRC, so a CRC of 0x00 is not checked.
     """
     base = None
     identifier = 0
@@ -58,26 +87,30 @@ class TCP_Base_Protocol(Protocol):
 
     protocol_overhead = 17
 
+    # Header, source, target, protocol id and payload length
+    header = struct.Struct('<BB4s4sBI')
+
     def __init__(self):
         super().__init__()
 
     @classmethod
     def decode(cls, data: Union[list, bytes, bytearray]) -> TCP_Base_Message:
+        if isinstance(data, list):
+            data = bytes(data)
+
         check = cls.check(data)
 
         if not check:
             # logger.debug(f"Corrupted TCP message received")
             return None
 
+        _, _, source, address, protocol_id, payload_len = cls.header.unpack_from(data, 0)
+
         msg = TCP_Base_Message()
-        msg.data_protocol_id = data[cls.idx_protocol]
-        msg.source = bytes_to_ipv4(data[cls.idx_src])
-        msg.address = bytes_to_ipv4(data[cls.idx_add])
-        payload_len = int.from_bytes(data[cls.idx_len], byteorder="little")
+        msg.data_protocol_id = protocol_id
+        msg.source = bytes_to_ipv4(source)
+        msg.address = bytes_to_ipv4(address)
         msg.data = data[cls.idx_payload:cls.idx_payload + payload_len]
-        # logging.debug( f"TCP Message:[PROTOCOL: [{bytearray_to_string(msg.data_protocol_id)}],
-        # SRC: [{bytearray_to_string(msg.src)}], ADD: " f"[{bytearray_to_string(msg.add)}],
-        # DATA: [{bytearray_to_string(msg.data)}]]")
         return msg
 
     @classmethod
@@ -89,26 +122,28 @@ class TCP_Base_Protocol(Protocol):
         :return: byte buffer of the message
         """
         assert (isinstance(msg, TCP_Base_Message))
-        buffer = [0] * (len(msg.data) + cls.protocol_overhead)
-        buffer[0] = cls.header_0
-        buffer[1] = cls.header_1
-        buffer[cls.idx_src] = ipv4_to_bytes(msg.source)
-        buffer[cls.idx_add] = ipv4_to_bytes(msg.address)
-
-        if hasattr(msg, 'data_protocol_id'):
-            buffer[cls.idx_protocol] = msg.data_protocol_id
-        else:
-            buffer[cls.idx_protocol] = 0
-
-        buffer[cls.idx_len] = len(msg.data).to_bytes(length=4, byteorder="little")
-        buffer[cls.idx_payload: cls.idx_payload + len(msg.data)] = msg.data
-        buffer[cls.offset_crc + len(msg.data)] = 0x00  # TODO
-        buffer[cls.offset_footer + len(msg.data)] = cls.footer
-        buffer = bytes(buffer)
+        data = msg.data
+        if isinstance(data, list):
+            data = bytes(data)
+
+        payload_len = len(data)
+        protocol_id = msg.data_protocol_id if getattr(msg, 'data_protocol_id', None) is not None else 0
+
+        buffer = bytearray(payload_len + cls.protocol_overhead)
+        cls.header.pack_into(buffer, 0, cls.header_0, cls.header_1, ipv4_to_bytes(msg.source),
+                             ipv4_to_bytes(msg.address), protocol_id, payload_len)
+
+        with memoryview(buffer) as view:
+            view[cls.idx_payload:cls.idx_payload + payload_len] = data
+
+        buffer[cls.offset_crc + payload_len] = crc8(data)
+        buffer[cls.offset_footer + payload_len] = cls.footer
         return buffer
 
     @classmethod
     def check(cls, data):
+        if len(data) < cls.protocol_overhead:
+            return 0
         if not data[0] == cls.header_0:
             return 0
         if not data[1] == cls.header_1:
@@ -121,6 +156,12 @@ class TCP_Base_Protocol(Protocol):
         if not data[payload_len + cls.offset_footer] == cls.footer:
             return 0
 
+        crc = data[payload_len + cls.offset_crc]
+        if crc != 0x00:
+            with memoryview(data) as view:
+                if crc != crc8(view[cls.idx_payload:cls.idx_payload + payload_len]):
+                    return 0
+
         return 1
 
 
@@ -12,6 +12,8 @@ from .tcp_base_protocol import TCP_Base_Protocol
 def default_numpy_json(obj):
     if isinstance(obj, numpy.generic):
         return obj.item()  # Convert to native Python type
+    if isinstance(obj, numpy.ndarray):
+        return obj.tolist()
     raise TypeError
 
 
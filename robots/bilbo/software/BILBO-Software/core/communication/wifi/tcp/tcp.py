@@ -69,7 +69,9 @@ class TCP_Socket:
     callbacks: TCP_Socket_Callbacks
     events: dict[str, threading.Event]
 
-    _rx_buffer: bytes
+    _rx_buffer: bytearray
+    _rx_offset: int
+    _rx_search: int
 
     # === INIT =========================================================================================================
     def __init__(self, server_address: str = None, server_port: int = 6666, config: dict = None):
@@ -111,8 +113,11 @@ class TCP_Socket:
 
         self._close_check_time = 0
 
-        # Initialize the receive buffer for handling partial packets.
-        self._rx_buffer = b''
+        # Initialize the receive buffer for handling partial packets. _rx_offset is the start of the first
+        # unprocessed packet, _rx_search the position from which the buffer is searched for the next delimiter.
+        self._rx_buffer = bytearray()
+        self._rx_offset = 0
+        self._rx_search = 0
 
     # === METHODS ======================================================================================================
     def init(self):
@@ -308,21 +313,25 @@ class TCP_Socket:
         """
         Process received data. Accumulate data in a buffer and extract complete packets.
         Partial packets are stored until the delimiter is encountered.
+
+        Packets are extracted by moving a read offset through the buffer, and the processed part is removed once
+        per call. Bytes that have already been searched for the delimiter are not searched again.
         """
         # Append new data to the persistent receive buffer.
         self._rx_buffer += data
         delimiter = self.config["delimiter"]
 
+        packets = []
         while True:
-            index = self._rx_buffer.find(delimiter)
+            index = self._rx_buffer.find(delimiter, self._rx_search)
             if index == -1:
-                # No complete packet found yet.
+                # No complete packet found yet. The end of the buffer may hold the start of a delimiter.
+                self._rx_search = max(self._rx_offset, len(self._rx_buffer) - len(delimiter) + 1)
                 break
 
             # Extract one complete packet.
-            packet = self._rx_buffer[:index]
-            # Remove the processed packet and delimiter from the buffer.
-            self._rx_buffer = self._rx_buffer[index + len(delimiter):]
+            packet = self._rx_buffer[self._rx_offset:index]
+            self._rx_offset = self._rx_search = index + len(delimiter)
 
             # If COBS encoding is enabled, decode the packet.
             if self.config["cobs"]:
@@ -331,8 +340,19 @@ class TCP_Socket:
                 except Exception:
                     # Skip the packet if decoding fails.
                     continue
+            else:
+                packet = bytes(packet)
+
+            packets.append(packet)
+
+        # Remove the processed packets from the buffer.
+        if self._rx_offset > 0:
+            del self._rx_buffer[:self._rx_offset]
+            self._rx_search -= self._rx_offset
+            self._rx_offset = 0
 
-            # Process the individual packet.
+        # Process the individual packets.
+        for packet in packets:
             if self.config['rx_queue']:
                 self.rx_queue.put_nowait(packet)
             for callback in self.callbacks.rx:
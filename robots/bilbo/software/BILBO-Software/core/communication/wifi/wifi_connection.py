@@ -9,6 +9,7 @@ from core.utils import network as network
 from core.communication.protocol import Message
 from core.communication.wifi.tcp.protocols.tcp_base_protocol import TCP_Base_Message, TCP_Base_Protocol
 from core.communication.wifi.tcp.protocols.tcp_json_protocol import TCP_JSON_Protocol, TCP_JSON_Message
+from core.communication.wifi.tcp.protocols.tcp_stream_protocol import TCP_Stream_Protocol
 from core.utils.callbacks import callback_definition, CallbackContainer
 import core.settings as settings
 from core.utils.logging_utils import Logger, setLoggerLevel
@@ -49,6 +50,7 @@ class WIFI_Connection:
 
     base_protocol = TCP_Base_Protocol
     protocol = TCP_JSON_Protocol
+    stream_protocol = TCP_Stream_Protocol
 
     _server_data: ServerData
     _thread: threading.Thread
@@ -187,7 +189,7 @@ class WIFI_Connection:
             return
 
         # Check if the protocol of the message is supported
-        if message._protocol is not self.protocol:
+        if message._protocol is not self.protocol and message._protocol is not self.stream_protocol:
             logger.error(f"Cannot send message with protocol: {message._protocol}")
 
         # Generate the payload buffer from the message
@@ -215,7 +217,8 @@ class WIFI_Connection:
         handshake_message.event = 'handshake'
         handshake_message.data = {
             'address': self.address,
-            'name': self.id
+            'name': self.id,
+            'protocols': [self.protocol.identifier, self.stream_protocol.identifier]
         }
 
         self._send(handshake_message)
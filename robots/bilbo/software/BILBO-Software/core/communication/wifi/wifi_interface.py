@@ -1,9 +1,11 @@
 import enum
+import struct
 import threading
 import time
 
 from core.communication.protocol import Protocol
 from core.communication.wifi.tcp.protocols.tcp_json_protocol import TCP_JSON_Protocol, TCP_JSON_Message
+from core.communication.wifi.tcp.protocols.tcp_stream_protocol import TCP_Stream_Schema, TCP_Stream_Message
 from core.communication.wifi.wifi_connection import WIFI_Connection
 from core.communication.wifi.data_link import DataLink, Command, generateDataDict, generateCommandDict
 from core.utils.callbacks import Callback, callback_definition, CallbackContainer
@@ -63,6 +65,13 @@ class WIFI_Interface:
         connected (bool): Connection status.
         callbacks (WIFI_Interface_Callbacks): Callbacks for connection events.
         protocol (Protocol): Communication protocol (default is TCP_JSON_Protocol).
+        binary_stream (bool): Send stream messages with the binary TCP_Stream_Protocol once the server acknowledged
+            the stream schema.
+        stream_batch_size (int): Number of samples that are packed into one binary stream message.
+        stream_batch_time (float): Maximum time in seconds a sample waits in an incomplete batch before the batch is
+            sent.
+        stream_sample_type (type): Dataclass with the declared field types of the stream samples, used for the stream
+            schema instead of the types of the values in the first sample.
     """
 
     name: str
@@ -87,8 +96,21 @@ class WIFI_Interface:
 
     protocol: Protocol = TCP_JSON_Protocol
 
+    binary_stream: bool
+    stream_batch_size: int
+    stream_batch_time: float
+    stream_sample_type: (type, None)
+
+    _stream_schema: (TCP_Stream_Schema, None)
+    _stream_schema_acknowledged: bool
+    _stream_batch: list
+    _stream_batch_timer: (threading.Timer, None)  # Sends an incomplete batch after stream_batch_time
+    _stream_lock: threading.Lock
+
     def __init__(self, interface_type: str = 'wifi', device_class: str = None, device_type: str = None,
-                 device_revision: str = None, device_name: str = None, device_id: str = None):
+                 device_revision: str = None, device_name: str = None, device_id: str = None,
+                 binary_stream: bool = True, stream_batch_size: int = 1, stream_batch_time: float = 0.1,
+                 stream_sample_type: type = None):
         """
         Initializes the WIFI_Interface instance with the provided device information.
 
@@ -99,6 +121,10 @@ class WIFI_Interface:
             device_revision (str, optional): Revision of the device.
             device_name (str, optional): Name of the device.
             device_id (str, optional): Unique identifier for the device.
+            binary_stream (bool): Use the binary stream protocol if the server supports it.
+            stream_batch_size (int): Number of samples per binary stream message.
+            stream_batch_time (float): Maximum age in seconds of an incomplete batch of stream samples.
+            stream_sample_type (type, optional): Dataclass with the declared types of the stream sample fields.
         """
         # Set device properties.
         self.device_class = device_class
@@ -111,6 +137,17 @@ class WIFI_Interface:
 
         self.heartbeat_timer = TimeoutTimer(timeout_time=5, timeout_callback=self._heartbeat_timeout_callback)
 
+        self.binary_stream = binary_stream
+        self.stream_batch_size = stream_batch_size
+        self.stream_batch_time = stream_batch_time
+        self.stream_sample_type = stream_sample_type
+        self._stream_schema = None
+        self._stream_schema_id = 0
+        self._stream_schema_acknowledged = False
+        self._stream_batch = []
+        self._stream_batch_timer = None
+        self._stream_lock = threading.Lock()
+
         # Initialize callbacks and WI-FI connection.
         self.callbacks = WIFI_Interface_Callbacks()
         self.connection = WIFI_Connection(id=device_id)
@@ -169,9 +206,18 @@ class WIFI_Interface:
         """
         Sends a stream message to the remote device.
 
+        If binary streaming is enabled, the first sample defines the stream schema, which is announced to the server
+        with a 'stream_schema' event. Once the server acknowledged the schema, samples are sent with the binary
+        stream protocol. Until then, or if a sample does not match the schema, the sample is sent as JSON.
+
         Args:
             data: The data to be streamed.
         """
+        if self.binary_stream and isinstance(data, dict):
+            with self._stream_lock:
+                if self._sendBinaryStreamSample(data):
+                    return
+
         msg = TCP_JSON_Message()
         msg.source = self.id
         msg.address = 0
@@ -219,6 +265,73 @@ class WIFI_Interface:
         """
         return generateCommandDict(self.commands)
 
+    def _sendBinaryStreamSample(self, data: dict) -> bool:
+        """
+        Packs the sample with the current stream schema and sends it once the batch is full, or at the latest
+        stream_batch_time after the first sample of the batch. Must be called with the stream lock held.
+
+        Returns:
+            bool: False if the sample could not be sent with the binary protocol.
+        """
+        if self._stream_schema is None:
+            # Schema ids run from 1 to 0xFFFF and then start at 1 again. 0 is never used, since it is the id of stream
+            # messages without a schema. The server replaces a schema if its id is announced again
+            self._stream_schema_id = self._stream_schema_id % 0xFFFF + 1
+            self._stream_schema = TCP_Stream_Schema.fromSample(data, self._stream_schema_id,
+                                                               sample_type=self.stream_sample_type)
+            self._stream_schema_acknowledged = False
+            self.sendEventMessage('stream_schema', self._stream_schema.toDict())
+
+        if not self._stream_schema_acknowledged:
+            return False
+
+        try:
+            self._stream_batch.append(self._stream_schema.encodeSample(data))
+        except (KeyError, TypeError, ValueError, struct.error) as e:
+            # The structure of the samples changed. Announce a new schema with the next sample
+            logger.info(f"Stream sample does not match stream schema {self._stream_schema.id} ({e}). "
+                        f"Generating a new schema")
+            self._sendStreamBatch()
+            self._stream_schema = None
+            return False
+
+        if len(self._stream_batch) >= self.stream_batch_size:
+            self._sendStreamBatch()
+        elif self._stream_batch_timer is None:
+            self._stream_batch_timer = threading.Timer(self.stream_batch_time, self._streamBatchTimeout)
+            self._stream_batch_timer.daemon = True
+            self._stream_batch_timer.start()
+        return True
+
+    def _streamBatchTimeout(self):
+        with self._stream_lock:
+            self._stream_batch_timer = None
+            if self.connected:
+                self._sendStreamBatch()
+
+    def _cancelStreamBatchTimer(self):
+        if self._stream_batch_timer is not None:
+            self._stream_batch_timer.cancel()
+            self._stream_batch_timer = None
+
+    def _sendStreamBatch(self):
+        self._cancelStreamBatchTimer()
+        if not self._stream_batch:
+            return
+        msg = TCP_Stream_Message()
+        msg.schema = self._stream_schema
+        msg.schema_id = self._stream_schema.id
+        msg.samples = self._stream_batch
+        self._stream_batch = []
+        self._wifi_send(msg)
+
+    def _resetStream(self):
+        with self._stream_lock:
+            self._cancelStreamBatchTimer()
+            self._stream_schema = None
+            self._stream_schema_acknowledged = False
+            self._stream_batch = []
+
     def _wifi_send(self, message):
         """
         Sends a message over the WIFI connection.
@@ -233,6 +346,7 @@ class WIFI_Interface:
         Callback invoked when the WIFI connection is established.
         Sends device identification and triggers connected callbacks.
         """
+        self._resetStream()
         self._sendDeviceIdentification()
         self.connected = True
         self.state = WIFI_Interface_State.RUNNING
@@ -247,6 +361,7 @@ class WIFI_Interface:
         Triggers disconnected callbacks.
         """
         self.connected = False
+        self._resetStream()
         self.state = WIFI_Interface_State.NOT_CONNECTED
         for callback in self.callbacks.disconnected:
             callback(self)
@@ -501,7 +616,7 @@ class WIFI_Interface:
 
     def _handlerEventMessage(self, message):
         """
-        Processes event messages. Currently handles 'sync' events.
+        Processes event messages. Currently handles 'sync', 'heartbeat' and 'stream_schema_ack' events.
 
         Args:
             message: The event message.
@@ -510,6 +625,8 @@ class WIFI_Interface:
             self.callbacks.sync.call(message.data)
         elif message.event == 'heartbeat':
             self._handleHeartbeatMessage(message.data)
+        elif message.event == 'stream_schema_ack':
+            self._handleStreamSchemaAck(message.data)
         else:
             ...
         # match message.event:
@@ -524,6 +641,13 @@ class WIFI_Interface:
     def _handleHeartbeatMessage(self, data):
         self.heartbeat_timer.reset()
 
+    # ------------------------------------------------------------------------------------------------------------------
+    def _handleStreamSchemaAck(self, data):
+        with self._stream_lock:
+            if self._stream_schema is not None and data.get('schema_id') == self._stream_schema.id:
+                logger.debug(f"Server acknowledged stream schema {self._stream_schema.id}")
+                self._stream_schema_acknowledged = True
+
     # ------------------------------------------------------------------------------------------------------------------
     def _heartbeat_timeout_callback(self):
         return
@@ -6,6 +6,8 @@ import time
 from dataclasses import is_dataclass, fields
 from functools import lru_cache
 
+import numpy as np
+
 from core.utils.dict_utils import cache_dict_paths_for_flatten, \
     optimized_flatten_dict
 from core.utils.files import dirExists, makeDir
@@ -164,7 +166,8 @@ class CSVLogger:
     # ------------------------------------------------------------------------------------------------------------------
     def write_data(self, data):
         """
-        Appends data to the CSV file. The data can be a dict, a dataclass instance, or a list of them.
+        Appends data to the CSV file. The data can be a dict, a dataclass instance, a list of them, or a structured
+        NumPy array with flat field names.
         Uses a cached flattening mapping once the first event has been processed.
         """
         with self.file_lock:
@@ -172,21 +175,26 @@ class CSVLogger:
                 return
                 # raise RuntimeError("CSVLogger is already closed; cannot log more data.")
 
-            if not isinstance(data, list):
-                data = [data]
-
-            flattened_data = []
-            for d in data:
-                # If the event is a dataclass instance, convert it to a dict first.
-                if is_dataclass(d):
-                    d = asdict_optimized(d)
-                # Use cached flattening if available; otherwise, compute and cache it.
-                if self._cached_flatten_paths is None:
-                    flat, paths = cache_dict_paths_for_flatten(d)
-                    self._cached_flatten_paths = paths
-                else:
-                    flat = optimized_flatten_dict(d, self._cached_flatten_paths)
-                flattened_data.append(flat)
+            # Structured arrays already hold flat records, with the field names as column names.
+            if isinstance(data, np.ndarray) and data.dtype.names is not None:
+                names = data.dtype.names
+                flattened_data = [dict(zip(names, record)) for record in data.tolist()]
+            else:
+                if not isinstance(data, list):
+                    data = [data]
+
+                flattened_data = []
+                for d in data:
+                    # If the event is a dataclass instance, convert it to a dict first.
+                    if is_dataclass(d):
+                        d = asdict_optimized(d)
+                    # Use cached flattening if available; otherwise, compute and cache it.
+                    if self._cached_flatten_paths is None:
+                        flat, paths = cache_dict_paths_for_flatten(d)
+                        self._cached_flatten_paths = paths
+                    else:
+                        flat = optimized_flatten_dict(d, self._cached_flatten_paths)
+                    flattened_data.append(flat)
 
             # Add an index column to each row.
             for i, row in enumerate(flattened_data):
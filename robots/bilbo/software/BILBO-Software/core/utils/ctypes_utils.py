@@ -2,6 +2,8 @@ import ctypes
 from dataclasses import is_dataclass, fields
 from typing import List, Dict, Tuple, Union, Type, Any
 
+import numpy as np
+
 # import graphviz
 
 
@@ -260,6 +262,120 @@ def bytes_to_value(byte_data, ctype_type):
     return ctype_to_value(ctype_value=bytes_to_ctype(byte_data=byte_data, ctype_type=ctype_type), ctype_type=ctype_type)
 
 
+_dtype_cache: Dict[Any, np.dtype] = {}
+
+
+def ctype_to_dtype(ctype_type) -> np.dtype:
+    """
+    Generates a NumPy dtype with the same memory layout as the given ctypes type.
+
+    Structures are mapped to (nested) structured dtypes using the field offsets and the total size computed by
+    ctypes, so padding and alignment are identical and raw bytes can be mapped without any conversion.
+
+    Args:
+        ctype_type: A ctypes scalar, array or structure type.
+
+    Returns:
+        np.dtype: The equivalent NumPy dtype.
+    """
+    if ctype_type in _dtype_cache:
+        return _dtype_cache[ctype_type]
+
+    if issubclass(ctype_type, ctypes.Structure):
+        names, formats, offsets = [], [], []
+        for field_name, field_type in ctype_type._fields_:
+            names.append(field_name)
+            formats.append(ctype_to_dtype(field_type))
+            offsets.append(getattr(ctype_type, field_name).offset)
+        dtype = np.dtype({'names': names,
+                          'formats': formats,
+                          'offsets': offsets,
+                          'itemsize': ctypes.sizeof(ctype_type)})
+    elif issubclass(ctype_type, ctypes.Array):
+        dtype = np.dtype((ctype_to_dtype(ctype_type._type_), (ctype_type._length_,)))
+    elif issubclass(ctype_type, ctypes._SimpleCData):
+        dtype = np.dtype(ctype_type)
+    else:
+        raise TypeError(f"Unsupported ctypes type: {ctype_type}")
+
+    _dtype_cache[ctype_type] = dtype
+    return dtype
+
+
+def bytes_to_array(byte_data, ctype_type, count: int = -1) -> np.ndarray:
+    """
+    Maps raw bytes onto a NumPy structured array of the given ctypes type without copying.
+
+    The returned array shares its memory with byte_data, so the buffer must not be reused while the array is in use.
+
+    Args:
+        byte_data (bytes, bytearray, memoryview): The raw bytes holding one or more consecutive instances.
+        ctype_type: The ctypes type of a single element.
+        count (int): Number of elements to map. -1 maps the whole buffer.
+
+    Returns:
+        np.ndarray: A one-dimensional structured array.
+    """
+    return np.frombuffer(byte_data, dtype=ctype_to_dtype(ctype_type), count=count)
+
+
+def record_to_dict(record) -> dict:
+    """
+    Converts a record of a structured array into a nested dictionary of Python values.
+
+    The result has the same layout as the dictionaries returned by `bytes_to_value` for the equivalent ctypes
+    structure.
+
+    Args:
+        record (np.void): A single element of a structured array.
+
+    Returns:
+        dict: A nested dictionary representation of the record.
+    """
+    result = {}
+    for field_name in record.dtype.names:
+        value = record[field_name]
+        if value.dtype.names is not None:
+            if isinstance(value, np.ndarray):
+                result[field_name] = [record_to_dict(v) for v in value]
+            else:
+                result[field_name] = record_to_dict(value)
+        else:
+            result[field_name] = value.tolist()
+    return result
+
+
+class StructArray:
+    """
+    Read-only sequence view of a structured NumPy array.
+
+    Gives direct access to the underlying array via `array` and behaves like a list of dictionaries for consumers
+    that index or iterate it. The dictionaries are only built on first access and cached afterwards.
+    """
+    array: np.ndarray
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+        self._dicts = [None] * len(array)
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if self._dicts[index] is None:
+            self._dicts[index] = record_to_dict(self.array[index])
+        return self._dicts[index]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_list(self) -> list:
+        return list(self)
+
+
 def STRUCTURE(cls):
     """
     Decorator to simplify and automate the creation of ctypes.Structure classes.
@@ -1,9 +1,14 @@
 import h5py
 import numpy as np
+import queue
 import threading
 import random
+import time
 
 from core.utils.dict_utils import cache_dict_paths_for_flatten, optimized_flatten_dict, unflatten_dict_baseline
+from core.utils.logging_utils import Logger
+
+logger = Logger('H5')
 
 
 # -----------------------------------------------------------------------------
@@ -12,13 +17,23 @@ from core.utils.dict_utils import cache_dict_paths_for_flatten, optimized_flatte
 
 class H5PyDictLogger:
     def __init__(self, filename, dataset_name="samples", chunk_size=10000,
-                 type_mapping=None):
+                 type_mapping=None, asynchronous=False, max_batch_samples=1000, max_batch_time=0.5,
+                 flush_interval=2.0, queue_size=1000):
         """
         Initializes the H5PyDictLogger.
 
         :param filename: HDF5 file name.
         :param dataset_name: Name of the dataset in the file.
+        :param chunk_size: Chunk size of the dataset. The dataset grows in steps of this size and is trimmed to the
+                           written samples on every flush.
         :param type_mapping: Mapping from Python types to NumPy dtypes.
+        :param asynchronous: If True, samples are written by a background thread and appendSamples never blocks
+                             on file I/O.
+        :param max_batch_samples: (asynchronous) Number of samples that are collected before they are written.
+        :param max_batch_time: (asynchronous) Maximum time in seconds a sample waits before it is written.
+        :param flush_interval: (asynchronous) Time in seconds between two flushes of the file.
+        :param queue_size: (asynchronous) Maximum number of pending batches. Batches that do not fit are dropped
+                           and counted in dropped_samples.
         """
         if type_mapping is None:
             self.type_mapping = {
@@ -39,6 +54,16 @@ class H5PyDictLogger:
         self.lock = threading.Lock()  # Protects read/write operations.
         self.current_size = 0  # Number of samples currently in the dataset.
         self._dict_flatten_cache = None
+        self._signal_fields_cache = {}
+
+        self.asynchronous = asynchronous
+        self.max_batch_samples = max_batch_samples
+        self.max_batch_time = max_batch_time
+        self.flush_interval = flush_interval
+        self.dropped_samples = 0
+        self.write_errors = 0  # Number of failed writes or flushes of the writer thread
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer_thread = None
 
     def init(self, initial_sample: dict):
         # Create a cache for optimized flattening.
@@ -48,6 +73,7 @@ class H5PyDictLogger:
         # Infer the compound dtype from the flattened dict.
         compound_dtype, _ = self.create_dtype_and_record_from_flat_dict(flat_sample)
         self.dtype = compound_dtype
+        self._signal_fields_cache = {}
 
     def start(self, mode='w'):
         """
@@ -57,7 +83,7 @@ class H5PyDictLogger:
         self.file = h5py.File(self.filename, mode)
         if self.dataset_name in self.file:
             self.dataset = self.file[self.dataset_name]
-            self.current_size = self.dataset.shape[0]
+            self.current_size = int(self.dataset.attrs.get('num_samples', self.dataset.shape[0]))
         else:
             self.dataset = self.file.create_dataset(
                 self.dataset_name,
@@ -68,6 +94,10 @@ class H5PyDictLogger:
             )
             self.current_size = 0
 
+        if self.asynchronous:
+            self._writer_thread = threading.Thread(target=self._writerTask, daemon=True)
+            self._writer_thread.start()
+
     def appendSample(self, sample):
         """
         Appends a single sample to the dataset.
@@ -84,43 +114,64 @@ class H5PyDictLogger:
             if set(sample.keys()) != set(self.dtype.names):
                 sample = optimized_flatten_dict(sample, self._dict_flatten_cache)
             sample = self._dict_to_record(sample)
-        with self.lock:
-            new_size = self.current_size + 1
-            self.dataset.resize((new_size,))
-            self.dataset[self.current_size] = sample
-            self.current_size = new_size
-            self.file.flush()  # Ensure data is written to disk.
+        self._write(np.array([sample], dtype=self.dtype))
 
-    def appendSamples(self, samples: list):
+    def appendSamples(self, samples: (list, np.ndarray)):
         """
         Appends a list of samples to the dataset in a batch operation.
 
-        Each sample is first converted to a flattened dict (if needed) and then to a record.
+        Samples can either be given as a structured array with the dtype of the logger, which is written as is, or
+        as a list of dicts. Each dict is first converted to a flattened dict (if needed) and then to a record.
         The dataset is resized once to accommodate all new samples, and they are written
         in a single operation, followed by one flush.
+
+        In asynchronous mode, the samples are only queued and written later by the writer thread. Use sync() to wait
+        until they are written.
         """
         if self.dtype is None:
             return
 
-        records = []
-        for sample in samples:
-            if isinstance(sample, dict):
-                # Flatten the dict if needed
-                if set(sample.keys()) != set(self.dtype.names):
-                    sample = optimized_flatten_dict(sample, self._dict_flatten_cache)
-                record = self._dict_to_record(sample)
-                records.append(record)
-            else:
-                raise ValueError("Each sample must be a dictionary.")
+        if isinstance(samples, np.ndarray) and samples.dtype == self.dtype:
+            records_array = samples
+        else:
+            records = []
+            for sample in samples:
+                if isinstance(sample, dict):
+                    # Flatten the dict if needed
+                    if set(sample.keys()) != set(self.dtype.names):
+                        sample = optimized_flatten_dict(sample, self._dict_flatten_cache)
+                    record = self._dict_to_record(sample)
+                    records.append(record)
+                else:
+                    raise ValueError("Each sample must be a dictionary.")
 
-        # Convert list of records to a NumPy structured array
-        records_array = np.array(records, dtype=self.dtype)
-        with self.lock:
-            new_size = self.current_size + len(records_array)
-            self.dataset.resize((new_size,))
-            self.dataset[self.current_size:new_size] = records_array
-            self.current_size = new_size
-            self.file.flush()  # Ensure data is written to disk.
+            # Convert list of records to a NumPy structured array
+            records_array = np.array(records, dtype=self.dtype)
+
+        self._write(records_array)
+
+    def sync(self, timeout=10.0) -> bool:
+        """
+        Blocks until all samples appended so far are written to the file and the file is flushed.
+
+        In synchronous mode the data is always written already. Returns False if the timeout expired or if writing
+        failed since the call.
+        """
+        if self._writer_thread is None:
+            return True
+        if not self._writer_thread.is_alive():
+            return False
+
+        write_errors = self.write_errors
+        deadline = None if timeout is None else time.monotonic() + timeout
+        sync_event = threading.Event()
+        try:
+            self._queue.put(sync_event, timeout=timeout)
+        except queue.Full:
+            return False
+
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        return sync_event.wait(timeout=remaining) and self.write_errors == write_errors
 
     def getSample(self, index, signals=None):
         """
@@ -133,6 +184,12 @@ class H5PyDictLogger:
           - If the signal is a prefix (e.g., 'subdict1.subdict2'), all flattened keys starting
             with that prefix are collected and unflattened into a nested dict.
         """
+        # Only the first current_size entries of the dataset hold samples
+        if isinstance(index, slice):
+            index = slice(*index.indices(self.current_size))
+        elif index < 0:
+            index += self.current_size
+
         with self.lock:
             if signals is None:
                 rec = self.dataset[index]
@@ -194,7 +251,7 @@ class H5PyDictLogger:
 
         # Case 2: Slice access – process indices in batches.
         start = index.start if index.start is not None else 0
-        stop = index.stop if index.stop is not None else len(self.dataset)
+        stop = index.stop if index.stop is not None else self.current_size
         step = index.step if index.step is not None else 1
         indices = list(range(start, stop, step))
         total_samples = len(indices)
@@ -208,48 +265,248 @@ class H5PyDictLogger:
                 batches.append(batch_data)
             return np.concatenate(batches)
         else:
-            # Build mapping from each requested signal to the actual fields in the dataset.
-            dtype_fields = self.dtype.names
-            mapping = {}
-            actual_fields = set()
-            for s in signals:
-                if s in dtype_fields:
-                    mapping[s] = [s]
-                    actual_fields.add(s)
-                else:
-                    matched = [field for field in dtype_fields if field.startswith(s + '.')]
-                    mapping[s] = matched
-                    actual_fields.update(matched)
-            # Initialize result dict with each signal mapping to an empty list.
-            result = {s: [] for s in signals}
+            actual_fields = self._getSignalFields(signals)
+            batches = []
             for i in range(0, total_samples, batch_size):
                 batch_indices = indices[i:i + batch_size]
                 with self.lock:
-                    batch_data = self.dataset[batch_indices][list(actual_fields)]
+                    batch_data = self.dataset[batch_indices][actual_fields]
                 if batch_data.shape == ():
                     batch_data = np.array([batch_data], dtype=batch_data.dtype)
-                # Process each record in the batch.
-                for rec in batch_data:
-                    for s in signals:
-                        if mapping[s] == [s]:
-                            result[s].append(rec[s])
-                        else:
-                            subdict = {field[len(s)+1:]: rec[field] for field in mapping[s]}
-                            result[s].append(unflatten_dict_baseline(subdict))
-            return result
+                batches.append(batch_data)
+            if not batches:
+                return {s: [] for s in signals}
+            return self.extractSignals(np.concatenate(batches), signals)
 
-    def close(self):
+    def getSignals(self, index, signals) -> dict:
         """
-        Closes the HDF5 file.
+        Column-oriented counterpart of getSampleBatch.
+
+        Reads only the fields needed for the signals of the given range of samples in one read from the file and
+        returns them as arrays instead of per-sample values:
+          - A direct match returns a NumPy array with one entry per sample.
+          - A prefix (e.g., 'subdict1.subdict2') returns a nested dict with an array for each matching field.
+
+        :param index: Integer or slice of the samples.
+        :param signals: Signal name, prefix or list of them.
         """
+        if not isinstance(signals, list):
+            signals = [signals]
+
+        if isinstance(index, int):
+            if index < 0:
+                index += self.current_size
+            index = slice(index, index + 1)
+        index = slice(*index.indices(self.current_size))
+
+        fields = self._getSignalFields(signals)
+        if not fields:
+            return {}
+
+        with self.lock:
+            records = self.dataset.fields(fields)[index]
+        return self.extractSignalArrays(records, signals)
+
+    def extractSignalArrays(self, records: np.ndarray, signals) -> dict:
+        """
+        Converts an array of records into a dictionary of signal arrays, in the same format as getSignals.
+        """
+        result = {}
+        for s in signals:
+            fields = self._getSignalFields([s])
+            if fields == [s]:
+                result[s] = records[s]
+            elif fields:
+                result[s] = unflatten_dict_baseline({field[len(s) + 1:]: records[field] for field in fields})
+        return result
+
+    def extractSignals(self, records: np.ndarray, signals):
+        """
+        Converts an array of records into a dictionary of signals.
+
+        For each signal, the result holds a list with one entry per record:
+          - A direct match returns the value.
+          - A prefix (e.g., 'subdict1.subdict2') returns an unflattened nested dict of all matching fields.
+
+        The records can contain all fields of the logger's dtype or only the ones needed for the signals.
+        """
+        mapping = {s: self._getSignalFields([s]) for s in signals}
+        result = {s: [] for s in signals}
+        for rec in records:
+            for s in signals:
+                if mapping[s] == [s]:
+                    result[s].append(rec[s])
+                else:
+                    subdict = {field[len(s) + 1:]: rec[field] for field in mapping[s]}
+                    result[s].append(unflatten_dict_baseline(subdict))
+        return result
+
+    def close(self, timeout=10.0):
+        """
+        Writes all pending samples and closes the HDF5 file.
+
+        In asynchronous mode, the writer thread gets up to timeout seconds to write the pending samples. If it does
+        not finish in time, the samples that are still queued are dropped and counted in dropped_samples. A write that
+        is in progress is still waited for, since the file is closed under the lock.
+        """
+        if self._writer_thread is not None:
+            deadline = time.monotonic() + timeout
+            # The queue may be full, so wait for the writer to make space instead of blocking on the put. Nothing
+            # takes the sentinel anymore if the writer has stopped
+            while self._writer_thread.is_alive():
+                try:
+                    self._queue.put(None, timeout=min(0.1, max(0.0, deadline - time.monotonic())))
+                    break
+                except queue.Full:
+                    if time.monotonic() >= deadline:
+                        self._dropQueued()
+                        logger.warning(f"Writer of {self.filename} did not finish in time, dropped the queued samples "
+                                       f"({self.dropped_samples} in total)")
+
+            self._writer_thread.join(timeout=max(0.0, deadline - time.monotonic()))
+            self._writer_thread = None
+
         with self.lock:
             if self.file:
+                self._flush()
                 self.file.close()
                 self.file = None
                 self.dataset = None
 
+    # --- Writing --- #
+
+    def _write(self, records_array):
+        if self._writer_thread is None:
+            with self.lock:
+                self._writeRecords(records_array)
+                self._flush()  # Ensure data is written to disk.
+            return
+
+        try:
+            # Copy, since the caller may reuse the memory of the array
+            self._queue.put_nowait(np.array(records_array, copy=True))
+        except queue.Full:
+            self.dropped_samples += len(records_array)
+            logger.warning(f"Write queue of {self.filename} is full, dropped {len(records_array)} samples "
+                           f"({self.dropped_samples} in total)")
+
+    def _writeRecords(self, records_array):
+        """
+        Writes the records at the end of the dataset. The dataset is grown in steps of the chunk size, so between two
+        flushes it is only resized once every chunk_size samples. Must be called with the lock held.
+        """
+        new_size = self.current_size + len(records_array)
+        if new_size > self.dataset.shape[0]:
+            num_chunks = -(-new_size // self.chunk_size)
+            self.dataset.resize((num_chunks * self.chunk_size,))
+        self.dataset[self.current_size:new_size] = records_array
+        self.current_size = new_size
+
+    def _flush(self):
+        """
+        Removes the preallocated space at the end of the dataset and flushes the file, so that a file that was not
+        closed (e.g. after a crash) only contains written samples. The number of samples is also stored in the
+        'num_samples' attribute. Must be called with the lock held.
+        """
+        if self.dataset.shape[0] != self.current_size:
+            self.dataset.resize((self.current_size,))
+        self.dataset.attrs['num_samples'] = self.current_size
+        self.file.flush()
+
+    def _dropQueued(self):
+        """
+        Removes all batches from the write queue and counts their samples as dropped.
+        """
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, np.ndarray):
+                self.dropped_samples += len(item)
+
+    def _writerTask(self):
+        pending = []
+        pending_samples = 0
+        batch_start_time = None
+        last_flush_time = time.monotonic()
+        unflushed = False
+        running = True
+
+        while running:
+            now = time.monotonic()
+            deadlines = [last_flush_time + self.flush_interval] if unflushed else []
+            if batch_start_time is not None:
+                deadlines.append(batch_start_time + self.max_batch_time)
+            timeout = max(0.0, min(deadlines) - now) if deadlines else None
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            sync_event = None
+            if item is None:
+                running = False
+            elif isinstance(item, threading.Event):
+                sync_event = item
+            elif item is not False:
+                pending.append(item)
+                pending_samples += len(item)
+                if batch_start_time is None:
+                    batch_start_time = time.monotonic()
+
+            try:
+                now = time.monotonic()
+                if pending and (not running or sync_event is not None or pending_samples >= self.max_batch_samples
+                                or now - batch_start_time >= self.max_batch_time):
+                    with self.lock:
+                        self._writeRecords(np.concatenate(pending) if len(pending) > 1 else pending[0])
+                    pending = []
+                    pending_samples = 0
+                    batch_start_time = None
+                    unflushed = True
+
+                if unflushed and (not running or sync_event is not None
+                                  or now - last_flush_time >= self.flush_interval):
+                    with self.lock:
+                        self._flush()
+                    last_flush_time = now
+                    unflushed = False
+            except Exception as e:
+                # Keep the thread alive, so later samples and syncs are still handled. The failed batch is dropped
+                self.write_errors += 1
+                self.dropped_samples += pending_samples
+                logger.error(f"Error writing to {self.filename}: {e}")
+                pending = []
+                pending_samples = 0
+                batch_start_time = None
+                last_flush_time = time.monotonic()
+                unflushed = False
+            finally:
+                if sync_event is not None:
+                    sync_event.set()
+
     # --- Helper functions for converting between flattened dicts and records --- #
 
+    def _getSignalFields(self, signals) -> list:
+        """
+        Returns the dtype fields that are needed for the given signals. A signal is either a field name or a prefix
+        of several fields. The expansion of each signal is cached, since the dtype does not change after init().
+        """
+        dtype_fields = self.dtype.names
+        actual_fields = []
+        for s in signals:
+            matched = self._signal_fields_cache.get(s)
+            if matched is None:
+                if s in dtype_fields:
+                    matched = [s]
+                else:
+                    matched = [field for field in dtype_fields if field.startswith(s + '.')]
+                self._signal_fields_cache[s] = matched
+            actual_fields.extend(field for field in matched if field not in actual_fields)
+        return actual_fields
+
     def _dict_to_record(self, flat_dict):
         """
         Converts a flattened dict into a record tuple that matches self.dtype.
@@ -398,4 +655,8 @@ if __name__ == "__main__":
     batch_nested = logger.getSampleBatch(slice(0, 5), signals=['nested.subdict1.subdict2'])
     print("Batch nested.subdict1.subdict2:", batch_nested)
 
+    print("\nTesting getSignals with a field and a prefix:")
+    signal_arrays = logger.getSignals(slice(0, 5), signals=['timestamp', 'nested.subdict1.subdict2'])
+    print("Signals:", signal_arrays)
+
     logger.close()
@@ -62,15 +62,27 @@ class BILBO_Serial_Communication:
     def writeValue(self, module: int = 0, address: (int, list) = None, value=None, type=ctypes.c_uint8):
         self.interface.write(module, address, value, type)
 
+    # ------------------------------------------------------------------------------------------------------------------
+    def writeValues(self, writes: list[dict]):
+        self.interface.writeMany(writes)
+
     # ------------------------------------------------------------------------------------------------------------------
     def readValue(self, address: int, module: int = 0, type=ctypes.c_uint8):
         return self.interface.read(address, module, type)
 
+    # ------------------------------------------------------------------------------------------------------------------
+    def readValues(self, reads: list[dict], timeout=0.5) -> list:
+        return self.interface.readMany(reads, timeout)
+
     # ------------------------------------------------------------------------------------------------------------------
     def executeFunction(self, address, module: int = 0, data=None, input_type: CType = None, output_type=None,
                         timeout=1):
         return self.interface.function(address, module, data, input_type, output_type, timeout)
 
+    # ------------------------------------------------------------------------------------------------------------------
+    def executeFunctionAsync(self, address, module: int = 0, data=None, input_type: CType = None, output_type=None):
+        return self.interface.functionAsync(address, module, data, input_type, output_type)
+
     # ------------------------------------------------------------------------------------------------------------------
     def readTick(self):
         tick = self.interface.read(module=addresses.TWIPR_AddressTables.REGISTER_TABLE_GENERAL,
@@ -7,7 +7,7 @@ from core.utils.callbacks import callback_definition, CallbackContainer
 from core.utils.dataclass_utils import from_dict
 # from utils.exit import ExitHandler
 from robot.lowlevel.stm32_sample import bilbo_ll_sample_struct, BILBO_LL_Sample
-from core.utils.ctypes_utils import bytes_to_value
+from core.utils.ctypes_utils import bytes_to_value, bytes_to_array, StructArray
 from robot.lowlevel.stm32_sample import SAMPLE_BUFFER_LL_SIZE
 from hardware.hardware.gpio import GPIO_Input, InterruptFlank, PullupPulldown
 from core.utils.time import precise_sleep
@@ -38,9 +38,19 @@ class BILBO_SPI_Interface:
 
     _startSampleListening: bool
 
-    def __init__(self, interface: SPI_Interface, sample_notification_pin):
+    numpy_samples: bool
+
+    def __init__(self, interface: SPI_Interface, sample_notification_pin, numpy_samples: bool = True):
+        """
+        :param interface: SPI interface connected to the STM32
+        :param sample_notification_pin: GPIO pin signaling that a new sample batch is ready
+        :param numpy_samples: If True, sample batches are mapped directly onto a NumPy structured array and handed
+                              to the rx_samples callbacks as a StructArray. Dictionaries are only built for samples
+                              that a consumer actually accesses. If False, every sample is decoded into a dict.
+        """
         self.interface = interface
         self.sample_notification_pin = sample_notification_pin
+        self.numpy_samples = numpy_samples
         self.callbacks = BILBO_SPI_Callbacks()
 
         self.gpio_input = None
@@ -116,7 +126,7 @@ class BILBO_SPI_Interface:
     # ------------------------------------------------------------------------------------------------------------------
 
     # ------------------------------------------------------------------------------------------------------------------
-    def _readSamples(self) -> (list[dict], BILBO_LL_Sample):
+    def _readSamples(self) -> ((list[dict], StructArray), BILBO_LL_Sample):
         data_rx_bytes = bytearray(SAMPLE_BUFFER_LL_SIZE * sizeof(bilbo_ll_sample_struct))
         with self.lock:
             self._sendCommand(BILBO_SPI_Command_Type.READ_SAMPLE, 0)
@@ -124,6 +134,12 @@ class BILBO_SPI_Interface:
             self.interface.readinto(data_rx_bytes, start=0,
                                     end=SAMPLE_BUFFER_LL_SIZE * sizeof(bilbo_ll_sample_struct))
 
+        if self.numpy_samples:
+            # The buffer is freshly allocated for every batch, so the array can share its memory
+            samples = StructArray(bytes_to_array(data_rx_bytes, bilbo_ll_sample_struct, count=SAMPLE_BUFFER_LL_SIZE))
+            latest_sample = from_dict(BILBO_LL_Sample, samples[-1])
+            return samples, latest_sample
+
         samples = []
         for i in range(0, SAMPLE_BUFFER_LL_SIZE):
             sample = bytes_to_value(
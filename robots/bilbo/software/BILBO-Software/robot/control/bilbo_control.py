@@ -655,24 +655,38 @@ class BILBO_Control:
             tic_theta_limit=config.statefeedback.tic.theta_threshold
         )
 
-        success = self._comm.serial.executeFunction(
+        # Set the configuration, the maximum wheel speed and read back the configuration in one burst. The STM32
+        # handles the messages in order, so the read back returns the new configuration
+        set_request = self._comm.serial.executeFunctionAsync(
             module=addresses.TWIPR_AddressTables.REGISTER_TABLE_GENERAL,
             address=addresses.TWIPR_ControlAddresses.SET_CONFIG,
             data=control_config,
             input_type=bilbo_control_configuration_ll_t,
             output_type=ctypes.c_bool,
-            timeout=1
         )
 
+        self._setMaxWheelSpeed_LL(speed=config.safety.max_speed)
+
+        read_request = None
+        if verify:
+            read_request = self._comm.serial.executeFunctionAsync(
+                module=addresses.TWIPR_AddressTables.REGISTER_TABLE_GENERAL,
+                address=addresses.TWIPR_ControlAddresses.ADDRESS_CONTROL_READ_CONFIG,
+                data=None,
+                output_type=bilbo_control_configuration_ll_t
+            )
+
+        success = set_request.wait(timeout=1)
+
         if success is None or not success:
             logger.warning("Failed to set control configuration")
+            if read_request is not None:
+                read_request.cancel()
             return False
 
-        self._setMaxWheelSpeed_LL(speed=config.safety.max_speed)
-
         if verify:
             # Read back configuration from low-level module
-            config_ll = self._readControlConfig_LL()
+            config_ll = read_request.wait(timeout=1)
 
             if config_ll is None:
                 return False
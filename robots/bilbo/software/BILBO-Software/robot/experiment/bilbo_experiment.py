@@ -301,7 +301,8 @@ class BILBO_ExperimentHandler:
             output_signals = self.logging.getData(
                 signals=signals,
                 index_start=start_tick,
-                index_end=end_tick
+                index_end=end_tick,
+                as_arrays=True
             )
 
         output_data = {
@@ -2,6 +2,9 @@ from collections import deque
 from copy import copy
 from datetime import datetime
 import threading
+import warnings
+
+import numpy as np
 
 # === OWN PACKAGES =====================================================================================================
 from robot.communication.bilbo_communication import BILBO_Communication
@@ -13,7 +16,7 @@ from robot.logging.bilbo_sample import BILBO_Sample
 from robot.lowlevel.stm32_sample import BILBO_LL_Sample, SAMPLE_BUFFER_LL_SIZE
 from robot.sensors.bilbo_sensors import BILBO_Sensors
 from core.utils.callbacks import callback_definition, CallbackContainer
-from core.utils.dict_utils import copy_dict, optimized_deepcopy
+from core.utils.dict_utils import optimized_deepcopy, cache_dict_paths_for_flatten, optimized_flatten_dict
 from core.utils.events import EventListener
 from core.utils.csv_utils import CSVLogger
 from paths import experiments_path
@@ -21,6 +24,7 @@ from core.utils.dataclass_utils import from_dict, asdict_optimized
 from core.utils.time import PerformanceTimer, TimeoutTimer
 from core.utils.logging_utils import Logger
 from core.utils.h5 import H5PyDictLogger
+from core.utils.exit import register_exit_callback
 
 logger = Logger("Logging")
 logger.setLevel('DEBUG')
@@ -44,13 +48,12 @@ class BILBO_Logging:
     general_sample_collect_function: callable
 
     sample: BILBO_Sample
-    _sample_buffer: (None, list[dict])
+    _sample_buffer: (None, np.ndarray)
 
     _h5Logger: H5PyDictLogger
 
     SAMPLE_BUFFER_SIZE = 1 * 60 * 100
 
-    _sample_buffer_ll: list[dict]
     _csvLogger: CSVLogger
 
     _rx_stm32_event_listener: EventListener
@@ -74,9 +77,13 @@ class BILBO_Logging:
         self.comm.spi.callbacks.rx_samples.register(self._stm32samples_callback)
         self.sample = BILBO_Sample()
 
+        # The stream schema takes the field types from the sample dataclasses instead of the first sample
+        self.comm.wifi.interface.stream_sample_type = BILBO_Sample
+
         self._sample_timeout_timer = TimeoutTimer(timeout_time=1, timeout_callback=self._sample_timeout_callback)
 
-        self._h5Logger = H5PyDictLogger(filename='log.h5')
+        # Samples are written to the SD card by the writer thread of the logger, so update() never blocks on file I/O
+        self._h5Logger = H5PyDictLogger(filename='log.h5', asynchronous=True)
         self._csvLogger = CSVLogger()
         self._num_samples = 0
         self.sample_index = None
@@ -84,13 +91,16 @@ class BILBO_Logging:
         self._sample_buffer = None
         self._index_sample_buffer = 0
         self._first_sample_received = False
-        self._dict_cache = None
-        self._dict_cache_ll = None
+        self._flatten_cache = None
+        self._flatten_cache_ll = None
+        self._fields_hl = None
+        self._fields_ll = None
         self._sample_deepcopy_cache = None
-        self._sample_buffer_ll = []
         self._lock = threading.Lock()  # Lock to ensure thread-safe access to the ring buffer.
         self._samples_queue = deque()  # Queue for low-level sample batches.
 
+        register_exit_callback(self.close)
+
     # === METHODS ======================================================================================================
     def init(self) -> None:
         self._build_sample_buffer()
@@ -122,29 +132,33 @@ class BILBO_Logging:
 
     # ------------------------------------------------------------------------------------------------------------------
     def getData(self, index_start: int = None, index_end: int = None, signals=None, hdf5_only: bool = True,
-                deepcopy: bool = False) -> (list, dict):
+                deepcopy: bool = None, as_arrays: bool = False) -> (list, dict):
         """
-        Retrieves a list of logged samples between index_start and index_end.
+        Retrieves the logged samples between index_start and index_end.
         This function checks whether the requested samples are in the local ring buffer or in the HDF5 file.
-        The global sample count is tracked by self._num_samples.
-        The local ring buffer holds the most recent samples corresponding to indices from
-        (self._num_samples - len(self._sample_buffer)) to (self._num_samples - 1) if the buffer is full.
-        If the buffer is not full, samples are stored sequentially in the beginning of the list.
+        The global sample count is tracked by self._num_samples. Since samples are written into the ring buffer
+        sequentially, the sample with global index i is stored at position i % SAMPLE_BUFFER_SIZE and the buffer
+        holds the samples from (self._num_samples - SAMPLE_BUFFER_SIZE) to (self._num_samples - 1).
 
         Parameters:
             index_start (int): Starting global sample index.
             index_end (int): Ending global sample index.
+            signals: Signal name, prefix or list of them. If given, a dict of signals is returned, otherwise a
+                     structured array of the samples.
             hdf5_only (bool): If True, only read samples from the H5Py logger.
-            deepcopy (bool): If True, deep copy samples retrieved from the local ring buffer.
+            deepcopy (bool): Deprecated and ignored. The returned samples never share memory with the ring buffer.
+            as_arrays (bool): If True and signals are given, each signal is returned as one NumPy array over all
+                              requested samples (see H5PyDictLogger.getSignals) instead of a list of values.
         """
+        if deepcopy is not None:
+            warnings.warn("The deepcopy argument of getData is deprecated and ignored. The returned samples are always "
+                          "a copy", DeprecationWarning, stacklevel=2)
 
         if signals is not None and not isinstance(signals, list):
             signals = [signals]
 
         with self._lock:
             total_samples = self._num_samples
-            if total_samples == 0:
-                return []
             # Default indices if not provided.
             if index_start is None:
                 index_start = 0
@@ -153,50 +167,48 @@ class BILBO_Logging:
             if index_start < 0:
                 index_start = 0
 
+        if index_start >= index_end:
+            return self._formatRecords(self._emptyRecords(), signals, as_arrays)
+
+        # Make sure that all samples up to now are written to the file
+        if hdf5_only or index_start < total_samples - self.SAMPLE_BUFFER_SIZE:
+            if not self._h5Logger.sync():
+                logger.warning("HDF5 file is not up to date, samples may be missing")
+
         # If hdf5_only is requested, return all samples from H5.
         if hdf5_only:
+            if as_arrays and signals is not None:
+                return self._h5Logger.getSignals(slice(index_start, index_end), signals=signals)
             samples = self._h5Logger.getSampleBatch(slice(index_start, index_end), signals=signals)
             return samples
 
-        raise Exception("HDF5 only mode supported yet.")
-        # with self._lock:
-        #     buffer_size = len(self._sample_buffer)
-        #     result = []
-        #
-        #     # Determine the global index corresponding to the first sample in the ring buffer.
-        #     if total_samples < buffer_size:
-        #         ring_buffer_start_index = 0  # All samples are in the buffer sequentially.
-        #     else:
-        #         ring_buffer_start_index = total_samples - buffer_size
-        #
-        #     # Fetch older samples from HDF5 if needed.
-        #     if index_start < ring_buffer_start_index:
-        #         h5_end = min(index_end, ring_buffer_start_index)
-        #         with self._h5Logger.lock:
-        #             h5_data = self._h5Logger.dataset[index_start:h5_end]
-        #         h5_samples = self._h5Logger.record_to_dict(h5_data)
-        #         result.extend(h5_samples)
-        #
-        #     # Fetch samples from the local ring buffer if the requested range includes recent samples.
-        #     if index_end > ring_buffer_start_index:
-        #         for i in range(max(index_start, ring_buffer_start_index), index_end):
-        #             if total_samples < buffer_size:
-        #                 # Buffer not full: direct mapping.
-        #                 local_idx = i
-        #             else:
-        #                 # Buffer is full: map global index to local index using circular indexing.
-        #                 local_idx = (self._index_sample_buffer + (i - ring_buffer_start_index)) % buffer_size
-        #             if deepcopy:
-        #                 result.append(optimized_deepcopy(self._sample_buffer[local_idx], self._sample_deepcopy_cache))
-        #             else:
-        #                 result.append(self._sample_buffer[local_idx])
-        #     return result
+        with self._lock:
+            ring_buffer_start_index = max(0, self._num_samples - self.SAMPLE_BUFFER_SIZE)
+            records = []
+            # Fetch samples from the local ring buffer if the requested range includes recent samples.
+            if index_end > ring_buffer_start_index:
+                ring_start = max(index_start, ring_buffer_start_index)
+                # The ring buffer is overwritten by update(), so the caller gets a copy of the rows
+                records.append(self._sample_buffer[self._bufferRows(ring_start, index_end - ring_start)].copy())
+
+        # Fetch older samples from HDF5 if needed.
+        if index_start < ring_buffer_start_index:
+            h5_end = min(index_end, ring_buffer_start_index)
+            records.insert(0, self._h5Logger.getSampleBatch(slice(index_start, h5_end)))
+
+        records = np.concatenate(records) if len(records) > 1 else records[0]
+        return self._formatRecords(records, signals, as_arrays)
 
     # ------------------------------------------------------------------------------------------------------------------
     def stopFileLogging(self):
         self._csvLogger.close()
         logger.debug("Stop file logging")
 
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self, *args, **kwargs):
+        self._csvLogger.close()
+        self._h5Logger.close()
+
     # ------------------------------------------------------------------------------------------------------------------
     def update(self) -> None:
 
@@ -210,6 +222,7 @@ class BILBO_Logging:
         if self.comm.wifi.connected:
             self.comm.wifi.sendStream(sample)
 
+        flat_sample = None
 
         batches = 0
         # Process all available low-level sample batches from the queue.
@@ -220,30 +233,32 @@ class BILBO_Logging:
             except IndexError:
                 break
 
-            for i in range(0, SAMPLE_BUFFER_LL_SIZE):
-                self._dict_cache = copy_dict(dict_from=sample,
-                                             dict_to=self._sample_buffer[self._index_sample_buffer],
-                                             structure_cache=self._dict_cache)
-                self._sample_buffer[self._index_sample_buffer]['general']['tick'] = sample['general']['tick'] + i
-                self._sample_buffer[self._index_sample_buffer]['general']['time'] = (sample['general']['tick'] + i) * \
-                                                                                    sample['general']['sample_time_ll']
+            if flat_sample is None:
+                flat_sample = optimized_flatten_dict(sample, self._flatten_cache)
+
+            with self._lock:
+                rows = self._bufferRows(self._num_samples, SAMPLE_BUFFER_LL_SIZE)
+                self._writeSampleToBuffer(rows, flat_sample)
+                self._writeBatchToBuffer(rows, batch)
 
-                self._dict_cache_ll = copy_dict(dict_from=batch[i],
-                                                dict_to=self._sample_buffer[self._index_sample_buffer]['lowlevel'],
-                                                structure_cache=self._dict_cache_ll)
+                ticks = sample['general']['tick'] + np.arange(SAMPLE_BUFFER_LL_SIZE)
+                self._sample_buffer['general.tick'][rows] = ticks
+                self._sample_buffer['general.time'][rows] = ticks * sample['general']['sample_time_ll']
 
-                self._index_sample_buffer = (self._index_sample_buffer + 1) % len(self._sample_buffer)
+                records = self._sample_buffer[rows]
+                self._index_sample_buffer = (self._num_samples + SAMPLE_BUFFER_LL_SIZE) % self.SAMPLE_BUFFER_SIZE
 
             # --------------------------------------------------------------------------------------------------------------
-            self._h5Logger.appendSamples(self._get_last_samples(SAMPLE_BUFFER_LL_SIZE))
+            self._h5Logger.appendSamples(records)
 
             # --------------------------------------------------------------------------------------------------------------
             if self._csvLogger.is_open:
-                self._csvLogger.log_event(self._get_last_samples(SAMPLE_BUFFER_LL_SIZE))
+                self._csvLogger.log_event(records)
 
+            ll_tick = int(records['lowlevel.general.tick'][-1])
             if self.sample_index is None:
                 self._sample_timeout_timer.start()
-                self.sample_index = from_dict(BILBO_Sample, self._sample_buffer[self._index_sample_buffer - 1]).lowlevel.general.tick
+                self.sample_index = ll_tick
 
                 # Check if the sample index started at 0
                 if self.sample_index != SAMPLE_BUFFER_LL_SIZE - 1:
@@ -253,15 +268,17 @@ class BILBO_Logging:
             else:
                 self.sample_index += SAMPLE_BUFFER_LL_SIZE
 
-            if self.sample_index != from_dict(BILBO_Sample, self._sample_buffer[self._index_sample_buffer - 1]).lowlevel.general.tick:
-                logger.warning(f"Sample index mismatch: HL: {self.sample_index} != LL: {from_dict(BILBO_Sample, self._sample_buffer[self._index_sample_buffer - 1]).lowlevel.general.tick}")
+            if self.sample_index != ll_tick:
+                logger.warning(f"Sample index mismatch: HL: {self.sample_index} != LL: {ll_tick}")
 
-            self._num_samples += SAMPLE_BUFFER_LL_SIZE
+            with self._lock:
+                self._num_samples += SAMPLE_BUFFER_LL_SIZE
 
             if self._num_samples % 2000 == 0:
                 logger.debug(f"Samples collected: {self._num_samples}")
 
-        self.sample = from_dict(BILBO_Sample, self._sample_buffer[self._index_sample_buffer - 1])
+        if batches > 0:
+            self.sample = from_dict(BILBO_Sample, self._h5Logger.record_to_dict(records[-1]))
 
         elapsed_time = timer.stop()
 
@@ -299,22 +316,84 @@ class BILBO_Logging:
         sample['lowlevel'] = asdict_optimized(BILBO_LL_Sample())
 
         _, self._sample_deepcopy_cache = optimized_deepcopy(sample)
-        self._sample_buffer = [optimized_deepcopy(sample, self._sample_deepcopy_cache) for _ in
-                               range(self.SAMPLE_BUFFER_SIZE)]
-
-        _ = from_dict(BILBO_Sample, self._sample_buffer[0])
+        _ = from_dict(BILBO_Sample, sample)
 
         self._h5Logger.init(sample)
         self._h5Logger.start('w')
 
+        # The ring buffer uses the flat record layout of the HDF5 file, so slices of it can be written directly
+        self._sample_buffer = np.zeros(self.SAMPLE_BUFFER_SIZE, dtype=self._h5Logger.dtype)
+
+        del sample['lowlevel']
+        _, self._flatten_cache = cache_dict_paths_for_flatten(sample, sep='.')
+        self._fields_hl = list(self._flatten_cache.keys())
+
+        # Map the flat low-level fields to their path in the STM32 sample struct
+        self._fields_ll = []
+        for field in self._sample_buffer.dtype.names:
+            if field.startswith('lowlevel.'):
+                self._fields_ll.append((field, field.split('.')[1:]))
+
     # ------------------------------------------------------------------------------------------------------------------
-    def _get_last_samples(self, n: int) -> list:
-        start = self._index_sample_buffer - n
-        if start < 0:
-            # Take the tail of the list and then the beginning
-            return self._sample_buffer[start:] + self._sample_buffer[:self._index_sample_buffer]
-        else:
-            return self._sample_buffer[start:self._index_sample_buffer]
+    def _bufferRows(self, index: int, n: int) -> (slice, np.ndarray):
+        """
+        Returns the rows of the ring buffer for n consecutive samples starting at the global sample index.
+        """
+        start = index % self.SAMPLE_BUFFER_SIZE
+        if start + n <= self.SAMPLE_BUFFER_SIZE:
+            return slice(start, start + n)
+        return (start + np.arange(n)) % self.SAMPLE_BUFFER_SIZE
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _emptyRecords(self) -> np.ndarray:
+        """
+        Returns an array without samples, with the record layout of the ring buffer if it exists already.
+        """
+        if self._sample_buffer is None:
+            return np.empty(0)
+        return np.empty(0, dtype=self._sample_buffer.dtype)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _formatRecords(self, records: np.ndarray, signals, as_arrays: bool) -> (np.ndarray, dict):
+        """
+        Converts the records into the return value of getData
+        """
+        if signals is not None and records.dtype.names is not None:
+            if as_arrays:
+                return self._h5Logger.extractSignalArrays(records, signals)
+            return self._h5Logger.extractSignals(records, signals)
+        if signals is not None:
+            # No samples were logged yet, so the fields of the signals are unknown
+            return {signal: np.empty(0) if as_arrays else [] for signal in signals}
+        return records
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _writeSampleToBuffer(self, rows, flat_sample: dict):
+        for field in self._fields_hl:
+            self._sample_buffer[field][rows] = flat_sample[field]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _writeBatchToBuffer(self, rows, batch):
+        array = getattr(batch, 'array', None)
+
+        # Batches decoded into dicts are flattened sample by sample
+        if array is None:
+            if self._flatten_cache_ll is None:
+                _, self._flatten_cache_ll = cache_dict_paths_for_flatten(batch[0], parent_key='lowlevel', sep='.')
+            flat_batch = [optimized_flatten_dict(ll_sample, self._flatten_cache_ll) for ll_sample in batch]
+            for field, _ in self._fields_ll:
+                if field in self._flatten_cache_ll:
+                    self._sample_buffer[field][rows] = [flat_ll_sample[field] for flat_ll_sample in flat_batch]
+            return
+
+        for field, path in self._fields_ll:
+            column = array
+            for key in path:
+                if column.dtype.names is None or key not in column.dtype.names:
+                    break
+                column = column[key]
+            else:
+                self._sample_buffer[field][rows] = column
 
     # ------------------------------------------------------------------------------------------------------------------
     def _get_value_by_path(self, sample: dict, path: str):
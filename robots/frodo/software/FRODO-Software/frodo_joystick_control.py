@@ -106,8 +106,7 @@ if __name__ == '__main__':
     frodo.start()
     joystick_control.start()
 
-    streamer = VideoStreamer()
-    streamer.image_fetcher = frodo.sensors.aruco_detector.getOverlayFrame
+    streamer = VideoStreamer(frame_bus=frodo.sensors.aruco_detector.frame_bus)
     streamer.start()
 
     while True:
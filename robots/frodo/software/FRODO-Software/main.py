@@ -13,8 +13,7 @@ def main():
 
 
     frodo.control.setMode(FRODO_Control_Mode.NAVIGATION)
-    streamer = VideoStreamer()
-    streamer.image_fetcher = frodo.sensors.aruco_detector.getOverlayFrame
+    streamer = VideoStreamer(frame_bus=frodo.sensors.aruco_detector.frame_bus)
     streamer.start()
 
 
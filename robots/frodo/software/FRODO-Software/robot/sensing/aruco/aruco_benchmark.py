@@ -0,0 +1,150 @@
+"""
+Benchmark of the ArUco detection with synthetic frames.
+
+Renders moving cv2.aruco markers onto a textured background and measures the per-frame detection latency of the
+full-frame detection and of the region-of-interest tracking (ArucoRoiTracker) at the calibrated camera resolutions.
+Runs without a camera, so it can be used on the robot and on a development machine.
+"""
+import dataclasses
+import math
+import time
+
+import cv2
+import cv2.aruco as arc
+import numpy as np
+
+from robot.sensing.aruco.aruco_tracking import ArucoRoiTracker, getDetectorParameters
+
+# ======================================================================================================================
+RESOLUTIONS = [(960, 540), (1280, 720)]  # Resolutions with camera calibrations
+
+
+@dataclasses.dataclass
+class ArucoBenchmarkResult:
+    resolution: tuple
+    num_frames: int
+    num_markers: int
+    full_frame_times: np.ndarray  # Detection time per frame in s
+    tracking_times: np.ndarray
+    full_frame_detections: int  # Number of detected markers over all frames
+    tracking_detections: int
+    full_searches: int  # Full-frame searches of the tracker
+
+    @property
+    def speedup(self) -> float:
+        return float(np.mean(self.full_frame_times) / np.mean(self.tracking_times))
+
+    def print(self):
+        print(f"{self.resolution[0]}x{self.resolution[1]}, {self.num_markers} markers, {self.num_frames} frames")
+        for name, times, detections in [('Full frame', self.full_frame_times, self.full_frame_detections),
+                                        ('Tracking', self.tracking_times, self.tracking_detections)]:
+            print(f"  {name:<12} mean: {np.mean(times) * 1000:6.2f} ms   median: {np.median(times) * 1000:6.2f} ms   "
+                  f"p95: {np.percentile(times, 95) * 1000:6.2f} ms   "
+                  f"detections: {detections}/{self.num_frames * self.num_markers}")
+        print(f"  Speedup: {self.speedup:.2f}   Full searches of the tracker: {self.full_searches}/{self.num_frames}")
+
+
+# ======================================================================================================================
+def generateFrames(resolution: tuple, num_frames: int, marker_ids: list, marker_size: int,
+                   dictionary: arc.Dictionary, speed: float = 4.0, seed: int = 0):
+    """
+    Yields BGR frames with the markers moving across a textured background. The markers move with constant velocity,
+    rotate slowly and bounce off the image borders
+
+    :param marker_size: Side length of the markers in px
+    :param speed: Speed of the markers in px per frame
+    """
+    width, height = resolution
+    rng = np.random.default_rng(seed)
+
+    background = rng.integers(0, 255, (height // 8, width // 8), dtype=np.uint8)
+    background = cv2.resize(background, (width, height), interpolation=cv2.INTER_CUBIC)
+    background = cv2.normalize(background, None, 70, 180, cv2.NORM_MINMAX)
+
+    # Markers with a white quiet zone
+    border = marker_size // 4
+    patch_size = marker_size + 2 * border
+    patches = [cv2.copyMakeBorder(arc.generateImageMarker(dictionary, marker_id, marker_size), border, border,
+                                  border, border, cv2.BORDER_CONSTANT, value=255) for marker_id in marker_ids]
+    mask = np.full((patch_size, patch_size), 255, dtype=np.uint8)
+
+    # Space the markers around the frame, so they don't overlap at the start
+    extent = int(patch_size * math.sqrt(2)) + 2
+    positions = np.array([[extent + (i + 0.5) * (width - 2 * extent) / len(marker_ids),
+                           rng.uniform(extent, height - extent)] for i in range(len(marker_ids))])
+    directions = rng.uniform(0, 2 * np.pi, len(marker_ids))
+    velocities = speed * np.stack([np.cos(directions), np.sin(directions)], axis=1)
+    angles = rng.uniform(0, 360, len(marker_ids))
+    angular_velocities = rng.uniform(-2, 2, len(marker_ids))
+
+    for _ in range(num_frames):
+        frame = background.copy()
+        for i, patch in enumerate(patches):
+            rotation = cv2.getRotationMatrix2D((patch_size / 2, patch_size / 2), angles[i], 1.0)
+            rotation[:, 2] += extent / 2 - patch_size / 2
+            rotated = cv2.warpAffine(patch, rotation, (extent, extent), borderValue=0)
+            rotated_mask = cv2.warpAffine(mask, rotation, (extent, extent), borderValue=0)
+
+            x0 = int(positions[i, 0] - extent / 2)
+            y0 = int(positions[i, 1] - extent / 2)
+            region = frame[y0:y0 + extent, x0:x0 + extent]
+            np.copyto(region, rotated, where=rotated_mask > 127)
+
+        noise = rng.normal(0, 4, frame.shape)
+        frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+        yield cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+        positions += velocities
+        angles += angular_velocities
+        for axis, limit in [(0, width), (1, height)]:
+            outside = (positions[:, axis] < extent / 2) | (positions[:, axis] > limit - extent / 2)
+            velocities[outside, axis] *= -1
+            positions[:, axis] = np.clip(positions[:, axis], extent / 2, limit - extent / 2)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def benchmarkDetection(resolution: tuple, num_frames: int = 100, num_markers: int = 4, marker_size: int = None,
+                       full_search_interval: int = 10, Ts: float = 0.1,
+                       aruco_dict: int = arc.DICT_4X4_100) -> ArucoBenchmarkResult:
+    """
+    :param marker_size: Side length of the markers in px. Defaults to 6 % of the image width, which is about the size of
+        an 8 cm marker at 1 m distance
+    :param Ts: Time between two frames, used for the motion prediction of the tracker
+    """
+    if marker_size is None:
+        marker_size = int(0.06 * resolution[0])
+
+    dictionary = arc.getPredefinedDictionary(aruco_dict)
+    detector = arc.ArucoDetector(dictionary, getDetectorParameters())
+    tracker = ArucoRoiTracker(arc.ArucoDetector(dictionary, getDetectorParameters()),
+                              full_search_interval=full_search_interval)
+
+    full_frame_times = []
+    tracking_times = []
+    full_frame_detections = 0
+    tracking_detections = 0
+
+    frames = generateFrames(resolution, num_frames, list(range(num_markers)), marker_size, dictionary)
+    for i, frame in enumerate(frames):
+        start = time.perf_counter()
+        _, ids, _ = detector.detectMarkers(frame)
+        full_frame_times.append(time.perf_counter() - start)
+        full_frame_detections += 0 if ids is None else len(ids)
+
+        start = time.perf_counter()
+        _, ids, _ = tracker.detectMarkers(frame, timestamp=i * Ts)
+        tracking_times.append(time.perf_counter() - start)
+        tracking_detections += 0 if ids is None else len(ids)
+
+    return ArucoBenchmarkResult(resolution=resolution, num_frames=num_frames, num_markers=num_markers,
+                                full_frame_times=np.asarray(full_frame_times),
+                                tracking_times=np.asarray(tracking_times),
+                                full_frame_detections=full_frame_detections,
+                                tracking_detections=tracking_detections,
+                                full_searches=tracker.full_searches)
+
+
+# ======================================================================================================================
+if __name__ == '__main__':
+    for resolution in RESOLUTIONS:
+        benchmarkDetection(resolution, num_frames=200, num_markers=4).print()
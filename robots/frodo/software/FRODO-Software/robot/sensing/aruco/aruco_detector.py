@@ -7,8 +7,10 @@ import numpy as np
 
 # === LOCAL IMPORTS ====================================================================================================
 from robot.sensing.camera.pycamera import PyCamera, PyCameraType
+from robot.sensing.camera.frame_bus import FrameBus, LatestSlot
 from robot.utilities.video_streamer.video_streamer import VideoStreamer
 from robot.sensing.aruco.calibration.calibration import CameraCalibrationData, ArucoCalibration
+from robot.sensing.aruco.aruco_tracking import ArucoRoiTracker, getDetectorParameters
 from utils.callbacks import callback_handler, CallbackContainer
 from utils.events import ConditionEvent, event_handler
 from utils.logging_utils import Logger
@@ -37,15 +39,63 @@ class ArucoMeasurement:
     rotation_vec: np.array
     translation_vec: np.array
     distance: float
+    timestamp: float = 0  # Capture time of the frame (time.monotonic())
+    frame_index: int = 0
+
+
+@dataclasses.dataclass
+class PipelineStageStats:
+    frames: int = 0  # Number of processed frames
+    dropped: int = 0  # Number of frames that were replaced by a newer frame before this stage took them
+    latency: float = 0  # Latency of the last frame in s
+    mean_latency: float = 0  # Exponential moving average of the latency in s
+    max_latency: float = 0
+
+    def update(self, latency: float, smoothing: float = 0.1):
+        self.frames += 1
+        self.latency = latency
+        self.mean_latency = latency if self.frames == 1 else (1 - smoothing) * self.mean_latency + smoothing * latency
+        self.max_latency = max(self.max_latency, latency)
+
+
+@dataclasses.dataclass
+class ArucoPipelineStats:
+    capture: PipelineStageStats = dataclasses.field(default_factory=PipelineStageStats)
+    detect: PipelineStageStats = dataclasses.field(default_factory=PipelineStageStats)
+    annotate: PipelineStageStats = dataclasses.field(default_factory=PipelineStageStats)
+    measurement: PipelineStageStats = dataclasses.field(default_factory=PipelineStageStats)  # Capture to measurement
+
+
+@dataclasses.dataclass
+class _CapturedFrame:
+    frame: np.ndarray
+    timestamp: float  # Capture time (time.monotonic())
+    index: int
+    marker_corners: tuple = ()
+    marker_ids: (np.ndarray, None) = None
 
 
 # === ArucoDetector ====================================================================================================
 class ArucoDetector:
+    """
+    Detects ArUco markers in a pipeline of three threads:
+
+    - capture: Takes a camera frame every Ts and hands it to the detection
+    - detect: Detects the markers in the newest frame and publishes the measurements
+    - annotate: Draws the detected markers into the frame and publishes it on the frame bus
+
+    The stages are connected by single-slot handoffs. A stage that is too slow skips to the newest frame instead of
+    delaying the stages before it, the skipped frames are counted in stats.
+    """
     camera: PyCamera
     measurements: list[ArucoMeasurement]
     callbacks: ArucoDetector_Callbacks
     events: ArucoDetector_Events
     calibration_data: CameraCalibrationData
+    frame_bus: FrameBus  # Overlay frames for the video streamer
+    roi_tracker: (ArucoRoiTracker, None)  # Only searches around the previous detections, None if tracking is disabled
+
+    stats: ArucoPipelineStats
 
     Ts: float
     loop_time: float
@@ -53,12 +103,23 @@ class ArucoDetector:
     timer: IntervalTimer
     _exit: bool = False
 
-    _overlay_frame_lock = threading.Lock()
-    frame_out: np.array = None
+    _detect_slot: LatestSlot
+    _annotate_slot: LatestSlot
+    _threads: list[threading.Thread]
 
     def __init__(self, camera_version: PyCameraType = PyCameraType.V3, image_resolution: tuple = None,
                  aruco_dict: int = arc.DICT_4X4_100,
-                 marker_size: float = 0.08, run_in_thread: bool = True, Ts: float = 0.1):
+                 marker_size: float = 0.08, run_in_thread: bool = True, Ts: float = 0.1,
+                 stream_resolution: tuple = None, stream_quality: int = 80,
+                 tracking: bool = False, full_search_interval: int = 10):
+        """
+        :param image_resolution: Resolution of the camera frames used for the detection
+        :param stream_resolution: Resolution of the overlay frames for the video streamer, None for image_resolution
+        :param stream_quality: JPEG quality of the overlay frames
+        :param tracking: Only search the regions around the previous detections and the full frame every
+            full_search_interval frames or if a marker is lost
+        :param full_search_interval: Number of frames between full-frame searches in tracking mode
+        """
 
         self.Ts = Ts
         # init program parameters
@@ -68,15 +129,7 @@ class ArucoDetector:
         # Init Aruco Detector
         self.marker_size = marker_size
         self.dictionary = arc.getPredefinedDictionary(aruco_dict)
-        self.detector_params = arc.DetectorParameters()
-
-        self.detector_params.adaptiveThreshWinSizeMin = 3
-        self.detector_params.adaptiveThreshWinSizeMax = 23
-        self.detector_params.adaptiveThreshWinSizeStep = 10
-        self.detector_params.minMarkerPerimeterRate = 0.03
-        self.detector_params.maxMarkerPerimeterRate = 4.0
-        self.detector_params.polygonalApproxAccuracyRate = 0.03
-
+        self.detector_params = getDetectorParameters()
         self.detector = arc.ArucoDetector(self.dictionary, self.detector_params)
 
         # Initialize the camera
@@ -90,8 +143,21 @@ class ArucoDetector:
             raise Exception(
                 f"No Calibration Data found for Camera Version {camera_version} and Resolution {image_resolution}")
 
+        self.roi_tracker = None
+        if tracking:
+            self.roi_tracker = ArucoRoiTracker(self.detector, full_search_interval=full_search_interval,
+                                               camera_matrix=self.calibration_data.camera_matrix)
+
+        self.frame_bus = FrameBus(stream_resolution=stream_resolution, jpeg_quality=stream_quality)
+
         # init tasks
-        self.task = threading.Thread(target=self._task)
+        self.stats = ArucoPipelineStats()
+        self._detect_slot = LatestSlot()
+        self._annotate_slot = LatestSlot()
+        self._threads = [threading.Thread(target=self._captureTask, name='aruco_capture'),
+                         threading.Thread(target=self._detectTask, name='aruco_detect'),
+                         threading.Thread(target=self._annotateTask, name='aruco_annotate')]
+        self.measurements = []
         self.exit = ExitHandler()
         self.exit.register(self.close)
         self.timer = IntervalTimer(self.Ts, catch_race_condition=False)
@@ -103,80 +169,107 @@ class ArucoDetector:
     def start(self):
         """start Aruco Detector, activate configured features"""
         self.camera.start()
-        self.task.start()
+        for thread in self._threads:
+            thread.start()
         logger.info("Aruco Detector started!")
 
     # ------------------------------------------------------------------------------------------------------------------
     def close(self, *args, **kwargs):
         logger.info("Close Aruco Detector")
         self._exit = True
-        self.task.join()
+        self._detect_slot.close()
+        self._annotate_slot.close()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join()
 
     # ------------------------------------------------------------------------------------------------------------------
     def getOverlayFrame(self):
-        with self._overlay_frame_lock:
-            if self.frame_out is not None:
-                return self.camera.getImageBufferBytes(self.frame_out)
-            else:
-                return None
+        """
+        Returns the newest overlay frame as JPEG. Each frame is only encoded once, no matter how often it is requested
+        """
+        return self.frame_bus.getJpeg()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setYawRate(self, yaw_rate: float):
+        """
+        Yaw rate of the robot in rad/s, used to predict the marker regions in tracking mode
+        """
+        if self.roi_tracker is not None:
+            self.roi_tracker.setYawRate(yaw_rate)
 
     # ------------------------------------------------------------------------------------------------------------------
-    def _task(self):
-        first_run = True  # Detect the first run, because it takes longer
+    def _captureTask(self):
+        frame_index = 0
         self.timer.reset()
         while not self._exit:
-
-            # time1 = time.perf_counter()
-            # Reset the measurement
-            self.measurements = []
-
-            # Capture a camera frame
+            start = time.monotonic()
             frame = self.camera.takeFrame()
+            timestamp = time.monotonic()
+            frame_index += 1
+            self.stats.capture.update(timestamp - start)
 
-            # Copy the frame to not mess with the original frame
+            self._detect_slot.put(_CapturedFrame(frame=frame, timestamp=timestamp, index=frame_index))
+            self.stats.detect.dropped = self._detect_slot.dropped
+
+            self.loop_time = self.timer.time
+            self.timer.sleep_until_next()
 
-            frame_out = np.copy(frame)
+    # ------------------------------------------------------------------------------------------------------------------
+    def _detectTask(self):
+        while not self._exit:
+            captured = self._detect_slot.take()
+            if captured is None:
+                continue
+            start = time.monotonic()
 
             # Run Aruco Detection
-            # time_11 = time.perf_counter()
-            marker_corners, marker_ids, rejected_candidates = self.detector.detectMarkers(frame)
-            # print(f"Aruco Detection took {((time.perf_counter() - time_11) * 1000):.2f} ms")
+            if self.roi_tracker is not None:
+                marker_corners, marker_ids, _ = self.roi_tracker.detectMarkers(captured.frame, captured.timestamp)
+            else:
+                marker_corners, marker_ids, _ = self.detector.detectMarkers(captured.frame)
 
+            measurements = []
             # Check if Marker IDs have been detected
-            if marker_ids is not [] and marker_ids is not None:
-
-                # Generate an overlay frame with detected markers
-                frame_out = arc.drawDetectedMarkers(frame_out, marker_corners, marker_ids)
-
+            if marker_ids is not None and len(marker_ids) > 0:
                 # Run Aruco Measurement
                 rotation_vec, translation_vec, objpts = cv2.aruco.estimatePoseSingleMarkers(marker_corners,
                                                                                             self.marker_size,
                                                                                             self.calibration_data.camera_matrix,
                                                                                             self.calibration_data.dist_coeff)
                 for i, marker_id in enumerate(marker_ids):
-                    self.measurements.append(self._processMeasurement(marker_id, translation_vec[i], rotation_vec[i]))
-
-            else:
-                # No markers have been detected
-                ...
-
-            with self._overlay_frame_lock:
-                self.frame_out = frame_out
+                    measurements.append(self._processMeasurement(marker_id, translation_vec[i], rotation_vec[i],
+                                                                 captured.timestamp, captured.index))
 
+            self.measurements = measurements
             # self.callbacks.new_measurement.call(self.measurements)
             self.events.new_measurement.set(self.measurements)
 
-            # print(f"Aruco took {((time.perf_counter() - time1) * 1000):.2f} ms")
-            self.loop_time = self.timer.time
+            end = time.monotonic()
+            self.stats.detect.update(end - start)
+            self.stats.measurement.update(end - captured.timestamp)
 
-            if not first_run and self.loop_time > self.Ts:
-                ...
-                # logger.debug(f"Aruco Detector loop took longer than Ts: {self.loop_time:.2f} > {self.Ts:.2f}")
+            # The overlay is drawn by the annotate stage, so it does not delay the next detection
+            captured.marker_corners = marker_corners
+            captured.marker_ids = marker_ids
+            self._annotate_slot.put(captured)
+            self.stats.annotate.dropped = self._annotate_slot.dropped
 
-            if first_run:
-                first_run = False
+    # ------------------------------------------------------------------------------------------------------------------
+    def _annotateTask(self):
+        while not self._exit:
+            captured = self._annotate_slot.take()
+            if captured is None:
+                continue
+            start = time.monotonic()
 
-            self.timer.sleep_until_next()
+            # Draw the detected markers into the frame. The detection is done, so the frame can be changed
+            if captured.marker_ids is not None and len(captured.marker_ids) > 0:
+                arc.drawDetectedMarkers(captured.frame, captured.marker_corners, captured.marker_ids)
+
+            # Copies the frame into the ring buffer of the frame bus
+            self.frame_bus.publish(captured.frame)
+            self.stats.annotate.update(time.monotonic() - start)
 
     # ------------------------------------------------------------------------------------------------------------------
     def _captureImage(self):
@@ -190,10 +283,12 @@ class ArucoDetector:
     @staticmethod
     def _processMeasurement(marker_id: int,
                             translation_vec: np.ndarray,
-                            rotation_vec: np.ndarray) -> ArucoMeasurement:
+                            rotation_vec: np.ndarray,
+                            timestamp: float = 0,
+                            frame_index: int = 0) -> ArucoMeasurement:
 
         distance = float(np.linalg.norm(translation_vec))
-        return ArucoMeasurement(marker_id, rotation_vec, translation_vec, distance)
+        return ArucoMeasurement(marker_id, rotation_vec, translation_vec, distance, timestamp, frame_index)
 
 
 # ======================================================================================================================
@@ -216,8 +311,7 @@ if __name__ == '__main__':
     arc_detector.callbacks.new_measurement.register(print_measurements)
     arc_detector.start()
 
-    streamer = VideoStreamer()
-    streamer.image_fetcher = arc_detector.getOverlayFrame
+    streamer = VideoStreamer(frame_bus=arc_detector.frame_bus)
     streamer.start()
 
     while True:
@@ -0,0 +1,241 @@
+"""
+Region-of-interest tracking for the ArUco detection.
+
+Instead of searching the full camera frame every cycle, the regions of the markers are predicted from the previous
+detections (constant velocity in the image, optionally shifted by the yaw rate of the robot) and the detection only
+runs in padded crops around them. A full-frame search is done every `full_search_interval` frames to find new markers,
+and immediately whenever a tracked marker is not found in its region.
+"""
+import dataclasses
+import math
+import time
+
+import cv2.aruco as arc
+import numpy as np
+
+
+# ======================================================================================================================
+def getDetectorParameters() -> arc.DetectorParameters:
+    """
+    Detection parameters used by the FRODO ArUco detection
+    """
+    detector_params = arc.DetectorParameters()
+    detector_params.adaptiveThreshWinSizeMin = 3
+    detector_params.adaptiveThreshWinSizeMax = 23
+    detector_params.adaptiveThreshWinSizeStep = 10
+    detector_params.minMarkerPerimeterRate = 0.03
+    detector_params.maxMarkerPerimeterRate = 4.0
+    detector_params.polygonalApproxAccuracyRate = 0.03
+    return detector_params
+
+
+# ======================================================================================================================
+@dataclasses.dataclass
+class TrackedMarker:
+    marker_id: int
+    corners: np.ndarray  # (4, 2) image corners of the last detection
+    velocity: np.ndarray  # (2,) image velocity of the marker in px/s
+    time: float  # Time of the last detection
+    yaw_rate: float  # Yaw rate of the robot at the last detection, its effect is already part of the velocity
+    missed: int = 0  # Number of frames since the last detection
+
+
+# ======================================================================================================================
+class ArucoRoiTracker:
+    detector: arc.ArucoDetector
+    full_search_interval: int  # Number of frames between full-frame searches. 0 searches the full frame every frame
+    padding: float  # Padding of the regions relative to the marker size
+    min_padding: int  # Minimum padding of the regions in px
+    max_roi_fraction: float  # Search the full frame if the regions cover more than this fraction of it
+    max_missed: int  # Number of frames a marker is still searched in its predicted region after it was missed
+    camera_matrix: (np.ndarray, None)  # Needed to convert the yaw rate into an image shift
+
+    markers: dict[int, TrackedMarker]
+    yaw_rate: float
+
+    full_searches: int
+    roi_searches: int
+    lost_searches: int  # Region searches that lost a marker and fell back to a full-frame search
+
+    _frames_since_full_search: int
+
+    def __init__(self, detector: arc.ArucoDetector, full_search_interval: int = 10, padding: float = 0.5,
+                 min_padding: int = 16, max_roi_fraction: float = 0.5, max_missed: int = 3,
+                 camera_matrix: np.ndarray = None):
+        self.detector = detector
+        self.full_search_interval = full_search_interval
+        self.padding = padding
+        self.min_padding = min_padding
+        self.max_roi_fraction = max_roi_fraction
+        self.max_missed = max_missed
+        self.camera_matrix = camera_matrix
+
+        self.markers = {}
+        self.yaw_rate = 0.0
+
+        self.full_searches = 0
+        self.roi_searches = 0
+        self.lost_searches = 0
+
+        self._frames_since_full_search = 0
+
+    # === METHODS ======================================================================================================
+    def detectMarkers(self, frame: np.ndarray, timestamp: float = None) -> tuple:
+        """
+        Detects the markers in the frame. Same return values as cv2.aruco.ArucoDetector.detectMarkers, except that the
+        rejected candidates are only returned by full-frame searches
+
+        :param timestamp: Capture time of the frame (time.monotonic()), the time of the call if not given
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        result = None
+        if self._frames_since_full_search < self.full_search_interval:
+            regions = self._predictRegions(frame.shape, timestamp)
+            if regions is not None:
+                result = self._detectInRegions(frame, regions)
+                if result is None:
+                    self.lost_searches += 1
+
+        if result is None:
+            result = self._detectFullFrame(frame)
+        else:
+            self._frames_since_full_search += 1
+
+        corners, ids, _ = result
+        self._updateMarkers(corners, ids, timestamp)
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setYawRate(self, yaw_rate: float):
+        """
+        Yaw rate of the robot in rad/s. Changes of the yaw rate since the last detection of a marker shift its predicted
+        region horizontally, before they show up in the image velocity of the marker
+        """
+        self.yaw_rate = yaw_rate
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def reset(self):
+        """
+        Forgets all tracked markers, the next frame is searched completely
+        """
+        self.markers = {}
+
+    # === PRIVATE METHODS ==============================================================================================
+    def _detectFullFrame(self, frame: np.ndarray) -> tuple:
+        self.full_searches += 1
+        self._frames_since_full_search = 0
+        return self.detector.detectMarkers(frame)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _detectInRegions(self, frame: np.ndarray, regions: list) -> (tuple, None):
+        """
+        Runs the detection in each region. Returns None if one of the markers that were found in the last frame was not
+        found again
+        """
+        self.roi_searches += 1
+        marker_corners = []
+        marker_ids = []
+
+        for x0, y0, x1, y1 in regions:
+            corners, ids, _ = self.detector.detectMarkers(frame[y0:y1, x0:x1])
+            if ids is None:
+                continue
+            offset = np.array([x0, y0], dtype=np.float32)
+            for marker_corners_roi, marker_id in zip(corners, ids):
+                if int(marker_id[0]) in marker_ids:
+                    continue
+                marker_corners.append(marker_corners_roi + offset)
+                marker_ids.append(int(marker_id[0]))
+
+        for marker in self.markers.values():
+            if marker.missed == 0 and marker.marker_id not in marker_ids:
+                return None
+
+        if len(marker_ids) == 0:
+            return (), None, ()
+        return tuple(marker_corners), np.array(marker_ids, dtype=np.int32).reshape(-1, 1), ()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _predictRegions(self, frame_shape: tuple, timestamp: float) -> (list, None):
+        """
+        Returns the merged (x0, y0, x1, y1) search regions of the tracked markers, or None if the full frame should be
+        searched
+        """
+        if len(self.markers) == 0:
+            return None
+
+        height, width = frame_shape[:2]
+        regions = []
+        for marker in self.markers.values():
+            dt = timestamp - marker.time
+            corners = marker.corners + marker.velocity * dt
+            corners[:, 0] += self._yawShift(self.yaw_rate - marker.yaw_rate, dt)
+
+            x_min, y_min = corners.min(axis=0)
+            x_max, y_max = corners.max(axis=0)
+            # The prediction gets more uncertain with every missed frame
+            padding = max(self.min_padding, self.padding * max(x_max - x_min, y_max - y_min)) * (1 + marker.missed)
+
+            x0 = max(int(x_min - padding), 0)
+            y0 = max(int(y_min - padding), 0)
+            x1 = min(int(math.ceil(x_max + padding)), width)
+            y1 = min(int(math.ceil(y_max + padding)), height)
+            if x1 - x0 <= 2 * self.min_padding or y1 - y0 <= 2 * self.min_padding:
+                # The marker is predicted to have left the frame
+                return None
+            regions.append((x0, y0, x1, y1))
+
+        regions = self._mergeRegions(regions)
+        area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions)
+        if area > self.max_roi_fraction * width * height:
+            return None
+        return regions
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _yawShift(self, yaw_rate_change: float, dt: float) -> float:
+        if self.camera_matrix is None or yaw_rate_change == 0:
+            return 0.0
+        # A rotation to the left (positive yaw) moves the scene to the right in the image
+        return float(self.camera_matrix[0, 0] * math.tan(yaw_rate_change * dt))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _updateMarkers(self, corners: tuple, ids: (np.ndarray, None), timestamp: float):
+        # Missed markers are kept for a few frames, their regions are searched without forcing a full-frame search
+        markers = {marker_id: dataclasses.replace(marker, missed=marker.missed + 1)
+                   for marker_id, marker in self.markers.items() if marker.missed < self.max_missed}
+        if ids is not None:
+            for marker_corners, marker_id in zip(corners, ids):
+                marker_id = int(marker_id[0])
+                marker_corners = np.asarray(marker_corners, dtype=np.float32).reshape(4, 2)
+                velocity = np.zeros(2, dtype=np.float32)
+
+                previous = self.markers.get(marker_id)
+                if previous is not None and timestamp > previous.time:
+                    velocity = (marker_corners.mean(axis=0) - previous.corners.mean(axis=0)) / (timestamp - previous.time)
+
+                markers[marker_id] = TrackedMarker(marker_id=marker_id, corners=marker_corners, velocity=velocity,
+                                                   time=timestamp, yaw_rate=self.yaw_rate)
+        self.markers = markers
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def _mergeRegions(regions: list) -> list:
+        """
+        Merges overlapping regions, so no part of the frame is searched twice
+        """
+        merged = True
+        while merged and len(regions) > 1:
+            merged = False
+            for i in range(len(regions)):
+                for j in range(i + 1, len(regions)):
+                    a, b = regions[i], regions[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        regions[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                        del regions[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return regions
@@ -0,0 +1,201 @@
+import threading
+
+import cv2
+import numpy as np
+
+from utils.logging_utils import Logger
+
+# ======================================================================================================================
+logger = Logger("FrameBus")
+logger.setLevel('INFO')
+
+
+# ======================================================================================================================
+class FrameBus:
+    """
+    Hands the newest camera frame to any number of viewers.
+
+    Published frames are copied (and scaled to the stream resolution) into a ring of preallocated buffers, so the
+    producer never has to allocate or wait for the viewers. Each frame is JPEG-encoded at most once, by the first viewer
+    that asks for it, and all other viewers get the cached bytes. Viewers wait on a condition variable for the next
+    frame instead of polling.
+    """
+    stream_resolution: tuple  # (width, height) of the streamed frames, None to keep the resolution of the camera
+    jpeg_quality: int
+    frame_index: int  # Number of published frames, 0 if no frame has been published yet
+
+    _buffers: list
+    _buffer_index: int
+    _encoding_index: (int, None)  # Buffer that is being encoded, it is not overwritten until the encoding is done
+    _condition: threading.Condition
+    _encode_lock: threading.Lock
+    _jpeg: bytes
+    _jpeg_index: int
+
+    def __init__(self, stream_resolution: tuple = None, jpeg_quality: int = 80, num_buffers: int = 3):
+        """
+        :param stream_resolution: (width, height) of the streamed frames, independent of the detection resolution
+        :param jpeg_quality: JPEG quality of the streamed frames (0-100)
+        :param num_buffers: Size of the frame ring. The newest frame and the frame that is being encoded are never
+            overwritten, so at least 3 buffers are needed
+        """
+        assert num_buffers >= 3
+        self.stream_resolution = stream_resolution
+        self.jpeg_quality = jpeg_quality
+        self.frame_index = 0
+
+        self._buffers = [None] * num_buffers
+        self._buffer_index = 0
+        self._encoding_index = None
+        self._condition = threading.Condition()
+        self._encode_lock = threading.Lock()
+        self._jpeg = None
+        self._jpeg_index = 0
+
+    # === METHODS ======================================================================================================
+    def publish(self, frame: np.ndarray):
+        """
+        Copies the frame into the next ring buffer and wakes up all waiting viewers. The buffer that is being encoded
+        is skipped. An encoding that starts during the copy takes the newest frame, which is never the copy target
+        """
+        with self._condition:
+            buffer_index = (self._buffer_index + 1) % len(self._buffers)
+            if buffer_index == self._encoding_index:
+                buffer_index = (buffer_index + 1) % len(self._buffers)
+        buffer = self._buffers[buffer_index]
+
+        if self.stream_resolution is not None and (frame.shape[1], frame.shape[0]) != tuple(self.stream_resolution):
+            shape = (self.stream_resolution[1], self.stream_resolution[0]) + frame.shape[2:]
+            if buffer is None or buffer.shape != shape or buffer.dtype != frame.dtype:
+                buffer = np.empty(shape, dtype=frame.dtype)
+            cv2.resize(frame, tuple(self.stream_resolution), dst=buffer, interpolation=cv2.INTER_AREA)
+        else:
+            if buffer is None or buffer.shape != frame.shape or buffer.dtype != frame.dtype:
+                buffer = np.empty_like(frame)
+            np.copyto(buffer, frame)
+
+        self._buffers[buffer_index] = buffer
+
+        with self._condition:
+            self._buffer_index = buffer_index
+            self.frame_index += 1
+            self._condition.notify_all()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def getFrame(self) -> (np.ndarray, None):
+        """
+        Returns the newest frame. The buffer is reused by later frames, so it must be copied if it is kept
+        """
+        if self.frame_index == 0:
+            return None
+        return self._buffers[self._buffer_index]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def getJpeg(self) -> (bytes, None):
+        """
+        Returns the newest frame as JPEG. The frame is only encoded if it has not been encoded before
+        """
+        return self._encode()[1]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def waitForJpeg(self, last_index: int, timeout: float = None) -> tuple[int, (bytes, None)]:
+        """
+        Waits until a frame newer than last_index has been published and returns it as JPEG
+
+        :param last_index: Index of the last frame the viewer received, 0 for none
+        :param timeout: Maximum time to wait in s
+        :return: (index, jpeg) of the newest frame, (last_index, None) on timeout
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.frame_index > last_index, timeout=timeout):
+                return last_index, None
+        return self._encode()
+
+    # === PRIVATE METHODS ==============================================================================================
+    def _encode(self) -> tuple[int, (bytes, None)]:
+        with self._encode_lock:
+            with self._condition:
+                frame_index = self.frame_index
+                buffer_index = self._buffer_index
+                if frame_index != 0 and self._jpeg_index != frame_index:
+                    # Keeps publish() from overwriting the buffer during the encoding
+                    self._encoding_index = buffer_index
+
+            if frame_index == 0:
+                return 0, None
+
+            if self._jpeg_index != frame_index:
+                try:
+                    success, buffer = cv2.imencode('.jpg', self._buffers[buffer_index],
+                                                   [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                finally:
+                    with self._condition:
+                        self._encoding_index = None
+                if not success:
+                    logger.warning("Could not encode frame")
+                    return frame_index, None
+                self._jpeg = buffer.tobytes()
+                self._jpeg_index = frame_index
+
+            return self._jpeg_index, self._jpeg
+
+
+# ======================================================================================================================
+class LatestSlot:
+    """
+    Single-slot handoff between two pipeline stages. put() replaces an item that has not been taken yet, so the
+    producer never waits and the consumer always gets the newest item. Replaced items are counted as dropped.
+    """
+    dropped: int  # Number of items that were replaced before they were taken
+
+    _condition: threading.Condition
+    _item: object
+    _has_item: bool
+    _closed: bool
+
+    def __init__(self):
+        self.dropped = 0
+        self._condition = threading.Condition()
+        self._item = None
+        self._has_item = False
+        self._closed = False
+
+    # === METHODS ======================================================================================================
+    def put(self, item) -> bool:
+        """
+        :return: False if an item that had not been taken yet was replaced
+        """
+        with self._condition:
+            replaced = self._has_item
+            if replaced:
+                self.dropped += 1
+            self._item = item
+            self._has_item = True
+            self._condition.notify()
+        return not replaced
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def take(self, timeout: float = None):
+        """
+        Waits for the next item and removes it from the slot
+
+        :return: The item, or None on timeout or if the slot has been closed
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._has_item or self._closed, timeout=timeout):
+                return None
+            if not self._has_item:
+                return None
+            item = self._item
+            self._item = None
+            self._has_item = False
+            return item
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        """
+        Wakes up the consumer, take() returns None from now on once the slot is empty
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
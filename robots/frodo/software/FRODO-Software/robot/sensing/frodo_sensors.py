@@ -1,7 +1,7 @@
 import copy
 import dataclasses
-import math
 import threading
+from typing import Callable
 import qmt
 import numpy as np
 
@@ -10,7 +10,7 @@ from robot.definitions import FRODO_Model
 from robot.lowlevel.frodo_ll_messages import FRODO_LL_SAMPLE
 from robot.sensing.aruco.aruco_detector import ArucoDetector, ArucoMeasurement
 from robot.sensing.camera.pycamera import PyCameraType
-from robot.utilities.orientation import is_mostly_z_axis
+from robot.utilities.orientation import mostly_z_axis_mask
 from utils.events import EventListener
 
 
@@ -21,6 +21,19 @@ class FRODO_ArucoMeasurement_processed:
     tvec_uncertainty: float
     psi: float
     psi_uncertainty: float
+    timestamp: float = 0  # Capture time of the camera frame (time.monotonic())
+
+
+def dummy_aruco_uncertainty(positions: np.ndarray, psi: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Placeholder uncertainty model for the ArUco measurements. Uncertainty models are called with the measurements of all
+    markers of a frame at once
+
+    :param positions: (N, 2) planar marker positions in the robot frame
+    :param psi: (N,) yaw angles of the markers
+    :return: (tvec_uncertainty, psi_uncertainty), both (N,)
+    """
+    return 2 * np.linalg.norm(positions, axis=1), 2 * psi
 
 
 @dataclasses.dataclass
@@ -40,10 +53,18 @@ class FRODO_Sensors:
     data: FRODO_SensorsData
 
     frodo_model: FRODO_Model
+    uncertainty_model: Callable[[np.ndarray, np.ndarray], tuple[np.ndarray, np.ndarray]]
     _data_lock = threading.Lock()
 
-    def __init__(self, communication: FRODO_Communication):
+    _q_CE_ME_matrix: np.ndarray
+
+    def __init__(self, communication: FRODO_Communication, uncertainty_model: Callable = dummy_aruco_uncertainty):
+        """
+        :param uncertainty_model: Returns the uncertainties of the processed ArUco measurements, see
+            dummy_aruco_uncertainty
+        """
         self.communication = communication
+        self.uncertainty_model = uncertainty_model
 
         self.communication.callbacks.rx_stm32_sample.register(self._stm32_samples_callback)
 
@@ -58,6 +79,18 @@ class FRODO_Sensors:
         self.data = FRODO_SensorsData()
         self.frodo_model = FRODO_Model()
 
+        # Constant rotations between the OpenCV frames of the camera and marker and the FRODO frames
+        q_ME_M = qmt.qmult(qmt.quatFromAngleAxis(angle=np.deg2rad(90), axis=np.asarray([0, 0, 1])),
+                           qmt.quatFromAngleAxis(angle=np.deg2rad(90), axis=np.asarray([1, 0, 0])))
+
+        q_CE_C = qmt.qmult(qmt.quatFromAngleAxis(angle=np.deg2rad(-90), axis=np.asarray([1, 0, 0])),
+                           qmt.quatFromAngleAxis(angle=np.deg2rad(90), axis=np.asarray([0, 1, 0])))
+
+        # q_CE_ME = q_CE_C * q_camera_marker * inv(q_ME_M) is linear in q_camera_marker, so it is a single matrix
+        # product for all markers: q_CE_ME = q_camera_marker @ _q_CE_ME_matrix.T
+        self._q_CE_ME_matrix = np.stack([qmt.qmult(qmt.qmult(q_CE_C, basis), qmt.qinv(q_ME_M))
+                                         for basis in np.eye(4)], axis=1)
+
     # ------------------------------------------------------------------------------------------------------------------
     def init(self):
         ...
@@ -75,61 +108,53 @@ class FRODO_Sensors:
 
     # ------------------------------------------------------------------------------------------------------------------
     def _process_aruco_measurements(self, measurements: list[ArucoMeasurement]):
+        """
+        Transforms the ArUco measurements of a frame into planar poses in the robot frame. All markers are processed
+        together with array operations
+        """
         aruco_measurements = []
 
-        for measurement in measurements:
-            aruco_id = measurement.marker_id[0]
-            # transform the position vector into 2D coordinates
-
-            x_pos = measurement.translation_vec[0][2] + self.frodo_model.vec_origin_to_camera[0]
-            y_pos = -measurement.translation_vec[0][0]
+        if len(measurements) > 0:
+            ids = [int(measurement.marker_id[0]) for measurement in measurements]
+            translation_vecs = np.asarray([measurement.translation_vec for measurement in measurements],
+                                          dtype=np.float64).reshape(-1, 3)
+            rotation_vecs = np.asarray([measurement.rotation_vec for measurement in measurements],
+                                       dtype=np.float64).reshape(-1, 3)
 
-            pos_vector = np.asarray([x_pos, y_pos],
-                                    dtype=np.float32)
+            # transform the position vectors into 2D coordinates
+            positions = np.stack([translation_vecs[:, 2] + self.frodo_model.vec_origin_to_camera[0],
+                                  -translation_vecs[:, 0]], axis=1).astype(np.float32)
 
-            # Transform the rotation vector:
-            angle = np.linalg.norm(measurement.rotation_vec)
-            axis = measurement.rotation_vec / angle
+            # Transform the rotation vectors
+            angles = np.linalg.norm(rotation_vecs, axis=1)
+            axes = rotation_vecs / np.where(angles > 0, angles, 1)[:, np.newaxis]
+            q_camera_marker = np.concatenate([np.cos(angles / 2)[:, np.newaxis],
+                                              np.sin(angles / 2)[:, np.newaxis] * axes], axis=1)
 
-            q_camera_marker = qmt.quatFromAngleAxis(angle, axis)
+            q_CE_ME = q_camera_marker @ self._q_CE_ME_matrix.T
 
-            q_ME_M = qmt.qmult(qmt.quatFromAngleAxis(angle=np.deg2rad(90), axis=np.asarray([0, 0, 1])),
-                               qmt.quatFromAngleAxis(angle=np.deg2rad(90), axis=np.asarray([1, 0, 0])))
+            vector_norms = np.linalg.norm(q_CE_ME[:, 1:], axis=1)
+            axes = q_CE_ME[:, 1:] / np.where(vector_norms > np.finfo(np.float64).eps, vector_norms, 1)[:, np.newaxis]
+            angles = qmt.wrapToPi(2 * np.arctan2(vector_norms, q_CE_ME[:, 0]))
 
-            q_CE_C = qmt.qmult(qmt.quatFromAngleAxis(angle=np.deg2rad(-90), axis=np.asarray([1, 0, 0])),
-                               qmt.quatFromAngleAxis(angle=np.deg2rad(90), axis=np.asarray([0, 1, 0])))
+            # Only keep the markers whose rotation is mostly around the z-axis
+            valid = mostly_z_axis_mask(axes)
+            positions = positions[valid]
+            psi = qmt.wrapToPi(-angles[valid] + np.deg2rad(180))
 
-            q_CE_ME = qmt.qmult(q1=qmt.qmult(q1=q_CE_C, q2=q_camera_marker),
-                                q2=qmt.qinv(q_ME_M))
+            tvec_uncertainty, psi_uncertainty = self.uncertainty_model(positions, psi)
 
-            axis = qmt.quatAxis(q_CE_ME).squeeze()
-            angle = qmt.quatAngle(q_CE_ME)
-
-            # Check if the axis is mostly around the z-axis
-            if not is_mostly_z_axis(axis):
-                continue
-
-            psi = qmt.wrapToPi(-angle + np.deg2rad(180))[0]
-
-            tvec_uncertainty, psi_uncertainty = FRODO_Sensors._dummy_uncertainty(pos_vector, psi)
-
-            measurement_processed = FRODO_ArucoMeasurement_processed(id=aruco_id,
-                                                                     translation_vec=pos_vector,
-                                                                     tvec_uncertainty=tvec_uncertainty,
-                                                                     psi=psi,
-                                                                     psi_uncertainty=psi_uncertainty)
-            aruco_measurements.append(measurement_processed)
+            for i, index in enumerate(np.flatnonzero(valid)):
+                aruco_measurements.append(FRODO_ArucoMeasurement_processed(id=ids[index],
+                                                                           translation_vec=positions[i],
+                                                                           tvec_uncertainty=float(tvec_uncertainty[i]),
+                                                                           psi=float(psi[i]),
+                                                                           psi_uncertainty=float(psi_uncertainty[i]),
+                                                                           timestamp=measurements[index].timestamp))
 
         with self._data_lock:
             self.data.aruco_measurements = aruco_measurements
 
-    # ------------------------------------------------------------------------------------------------------------------
-    @staticmethod
-    def _dummy_uncertainty(tvec, psi):
-        norm = math.sqrt(tvec[0]**2 + tvec[1]**2)
-        return 2*norm, 2*psi
-
-
     # ------------------------------------------------------------------------------------------------------------------
     def _arucoMeasurement_callback(self, measurements, *args, **kwargs):
         # Process the aruco measurements to transform it to the robots geometry
@@ -20,4 +20,23 @@ def is_mostly_z_axis(rotation_vector, threshold=0.2):
     xy_magnitude = np.linalg.norm(rotation_vector[:2])  # Magnitude of x and y components
     z_magnitude = abs(rotation_vector[2])  # Absolute value of z component
 
-    return xy_magnitude < threshold * z_magnitude
\ No newline at end of file
+    return xy_magnitude < threshold * z_magnitude
+
+
+def mostly_z_axis_mask(rotation_axes, threshold=0.2):
+    """
+    Vectorized version of is_mostly_z_axis.
+
+    Parameters:
+        rotation_axes (np.ndarray): (N, 3) array of rotation vectors.
+        threshold (float): A value defining how small x and y should be relative to z to consider it mostly z-axis.
+
+    Returns:
+        np.ndarray: (N,) boolean mask, True for the vectors that are mostly around the z-axis.
+    """
+    rotation_axes = np.asarray(rotation_axes).reshape(-1, 3)
+
+    xy_magnitude = np.linalg.norm(rotation_axes[:, :2], axis=1)
+    z_magnitude = np.abs(rotation_axes[:, 2])
+
+    return xy_magnitude < threshold * z_magnitude
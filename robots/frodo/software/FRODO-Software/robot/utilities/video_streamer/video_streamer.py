@@ -22,6 +22,7 @@ from flask import Flask, render_template, Response
 from utils.files import relativeToFullPath
 from utils.network import getInterfaceIP
 from utils.logging_utils import Logger
+from robot.sensing.camera.frame_bus import FrameBus
 
 
 # ================================
@@ -56,10 +57,15 @@ class VideoStreamer:
     """
     _thread: threading.Thread  # Thread for running the Flask server
     image_fetcher: callable = None  # Callable function to fetch images
+    frame_bus: FrameBus = None  # Frame bus to stream from. Used instead of image_fetcher if set
 
-    def __init__(self):
+    fetch_interval: float = 0.05  # Time between two calls of image_fetcher in s
+    frame_timeout: float = 1  # Maximum time to wait for a new frame of the frame bus in s
+
+    def __init__(self, frame_bus: FrameBus = None):
         """Initialize the VideoStreamer class."""
         self._thread = threading.Thread(target=self.task, daemon=True)
+        self.frame_bus = frame_bus
 
     def start(self):
         """Start the video streamer thread."""
@@ -82,13 +88,26 @@ class VideoStreamer:
         # ================================
         def send_frames():
             """Generator function to continuously yield video frames."""
+            if self.frame_bus is not None:
+                yield from send_frame_bus_frames()
+                return
+
             while True:
                 image_buffer = self.image_fetcher()
+                if image_buffer is not None:
+                    yield (b'--frame\r\n'
+                           b'Content-Type: image/jpeg\r\n\r\n' + image_buffer + b'\r\n')
+                time.sleep(self.fetch_interval)
+
+        def send_frame_bus_frames():
+            """Yields every new frame of the frame bus. All viewers share the same encoded frame."""
+            frame_index = 0
+            while True:
+                frame_index, image_buffer = self.frame_bus.waitForJpeg(frame_index, timeout=self.frame_timeout)
                 if image_buffer is None:
                     continue
                 yield (b'--frame\r\n'
                        b'Content-Type: image/jpeg\r\n\r\n' + image_buffer + b'\r\n')
-                time.sleep(0.05)
 
         @app.route('/')
         def index():
@@ -0,0 +1,48 @@
+"""
+CRC8 of the TCP base protocol. Run from the RobotManager directory:
+    python -m pytest _tests/misc/test_crc8.py
+"""
+import random
+
+import pytest
+
+from core.communication.wifi.tcp.protocols.tcp_base_protocol import TCP_Base_Message, TCP_Base_Protocol, crc8
+
+
+def crc8_reference(data: bytes) -> int:
+    # Bitwise CRC-8 with the polynomial 0x07 and the initial value 0x00
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def test_check_value():
+    assert crc8(b'123456789') == 0xF4
+    assert crc8(b'') == 0x00
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 100, 127, 128, 255, 1000, 10000])
+def test_matches_reference(size):
+    rng = random.Random(size)
+    data = bytes(rng.getrandbits(8) for _ in range(size))
+    assert crc8(data) == crc8_reference(data)
+    assert crc8(bytearray(data)) == crc8_reference(data)
+    assert crc8(memoryview(data)[1:]) == crc8_reference(data[1:])
+
+
+def test_protocol_checks_crc():
+    msg = TCP_Base_Message()
+    msg.source = '127.0.0.1'
+    msg.address = '127.0.0.2'
+    msg.data_protocol_id = 1
+    msg.data = b'payload of the message'
+
+    buffer = TCP_Base_Protocol.encode(msg)
+    assert buffer[-2] == crc8_reference(msg.data)
+    assert TCP_Base_Protocol.check(buffer)
+
+    buffer[TCP_Base_Protocol.idx_payload] ^= 0x01
+    assert not TCP_Base_Protocol.check(buffer)
@@ -0,0 +1,138 @@
+"""
+Tests for the separating axis test of the cuboids and the collision broad phase.
+
+Run from the RobotManager directory: python -m pytest _tests/simulation/test_collision.py
+"""
+import itertools
+
+import numpy as np
+import pytest
+from scipy.optimize import linprog
+from scipy.spatial.transform import Rotation
+
+from extensions.simulation.src.core.physics import (CollisionBroadPhase, CuboidPhysics, CuboidPrimitive,
+                                                    collisionCuboidCuboid)
+
+
+# ======================================================================================================================
+def reference_overlap(cuboid1: CuboidPrimitive, cuboid2: CuboidPrimitive) -> float:
+    """
+    Smallest growth of both cuboids so that they share a point, found with a linear program. The cuboids intersect if
+    it is <= 0.
+    """
+    A = []
+    b = []
+    for cuboid in (cuboid1, cuboid2):
+        half_size = np.asarray(cuboid.size, dtype=float) / 2
+        # |R^T (x - p)| <= h + s
+        for sign in (1, -1):
+            R_T = sign * np.asarray(cuboid.orientation).T
+            A.extend(np.hstack((R_T, -np.ones((3, 1)))))
+            b.extend(half_size + R_T @ np.asarray(cuboid.position, dtype=float))
+    result = linprog(c=[0, 0, 0, 1], A_ub=np.asarray(A), b_ub=np.asarray(b), bounds=[(None, None)] * 4)
+    assert result.success
+    return result.x[3]
+
+
+def random_cuboid(rng: np.random.Generator, spread: float = 1.0) -> CuboidPrimitive:
+    return CuboidPrimitive(size=list(rng.uniform(0.1, 1.0, 3)),
+                           position=rng.uniform(-spread, spread, 3),
+                           orientation=Rotation.random(random_state=rng).as_matrix())
+
+
+def random_body(rng: np.random.Generator, spread: float) -> CuboidPhysics:
+    body = CuboidPhysics(*rng.uniform(0.1, 0.5, 3), position=rng.uniform(-spread, spread, 3),
+                         orientation=Rotation.random(random_state=rng).as_matrix())
+    body._calcProximitySphere()
+    return body
+
+
+# ======================================================================================================================
+def test_cuboid_cuboid_matches_reference():
+    rng = np.random.default_rng(0)
+    checked = 0
+    collisions = 0
+    while checked < 500:
+        cuboid1 = random_cuboid(rng)
+        cuboid2 = random_cuboid(rng)
+        overlap = reference_overlap(cuboid1, cuboid2)
+        # Nearly touching cuboids depend on the tolerances of both methods
+        if abs(overlap) < 1e-6:
+            continue
+        assert collisionCuboidCuboid(cuboid1, cuboid2) == (overlap < 0)
+        checked += 1
+        collisions += overlap < 0
+
+    # Both outcomes have to be covered
+    assert 50 < collisions < 450
+
+
+def test_cuboid_cuboid_edge_to_edge():
+    # Two cubes rotated by 45 degrees around the x and the y axis, so that the upper edge of the first one crosses the
+    # lower edge of the second one. The projections on all face normals overlap, only the cross product of the two
+    # edges separates them
+    orientation1 = Rotation.from_euler('x', 45, degrees=True).as_matrix()
+    orientation2 = Rotation.from_euler('y', 45, degrees=True).as_matrix()
+    distance = 2 * np.sqrt(2)
+    cuboid1 = CuboidPrimitive(size=[2, 2, 2], position=np.zeros(3), orientation=orientation1)
+
+    separated = CuboidPrimitive(size=[2, 2, 2], position=np.array([0, 0, distance + 0.01]), orientation=orientation2)
+    touching = CuboidPrimitive(size=[2, 2, 2], position=np.array([0, 0, distance - 0.01]), orientation=orientation2)
+
+    assert reference_overlap(cuboid1, separated) > 0
+    assert not collisionCuboidCuboid(cuboid1, separated)
+    assert reference_overlap(cuboid1, touching) < 0
+    assert collisionCuboidCuboid(cuboid1, touching)
+
+
+def test_parallel_cuboids():
+    orientation = Rotation.from_euler('z', 30, degrees=True).as_matrix()
+    cuboid1 = CuboidPrimitive(size=[1, 1, 1], position=np.zeros(3), orientation=orientation)
+    cuboid2 = CuboidPrimitive(size=[1, 1, 1], position=orientation @ np.array([0.99, 0, 0]), orientation=orientation)
+    cuboid3 = CuboidPrimitive(size=[1, 1, 1], position=orientation @ np.array([1.01, 0, 0]), orientation=orientation)
+
+    assert collisionCuboidCuboid(cuboid1, cuboid2)
+    assert not collisionCuboidCuboid(cuboid1, cuboid3)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+@pytest.mark.parametrize('unbounded', [0, 3])
+def test_broad_phase_matches_all_pairs(unbounded):
+    rng = np.random.default_rng(1)
+    bodies = [random_body(rng, spread=2.0) for _ in range(40)]
+    # Bodies without a proximity sphere are checked against all other bodies
+    for body in bodies[:unbounded]:
+        body.proximity_sphere.radius = -1
+
+    broad_phase = CollisionBroadPhase()
+    for body in bodies:
+        broad_phase.add(body)
+
+    expected = set()
+    for a, b in itertools.combinations(range(len(bodies)), 2):
+        if collisionCuboidCuboid(bodies[a].bounding_objects['cuboid'], bodies[b].bounding_objects['cuboid']):
+            expected.add(frozenset((a, b)))
+    assert expected
+
+    # The second check reuses the sort order of the first one
+    for _ in range(2):
+        pairs = broad_phase.collisionCheck()
+        assert {frozenset((bodies.index(a), bodies.index(b))) for a, b in pairs} == expected
+
+    colliding = set(itertools.chain.from_iterable(expected))
+    for index, body in enumerate(bodies):
+        assert body.collision.collision_state == (index in colliding)
+
+
+def test_broad_phase_owner():
+    rng = np.random.default_rng(2)
+    body1 = random_body(rng, spread=0)
+    body2 = random_body(rng, spread=0)
+
+    broad_phase = CollisionBroadPhase()
+    broad_phase.add(body1, owner='first')
+    broad_phase.add(body2, owner='second')
+
+    assert broad_phase.collisionCheck() == [('first', 'second')]
+    broad_phase.remove(body2)
+    assert broad_phase.collisionCheck() == []
@@ -0,0 +1,328 @@
+"""
+Benchmark of the centralized FRODO estimators on synthetic swarms.
+
+Every variant runs headless on the same scenarios (see scenarios.py) and is rated by the latency of its update step,
+the memory it allocates during an update and its estimation error (RMSE and NEES). Variants that fail are reported with
+their error instead of stopping the benchmark.
+
+Run from the RobotManager directory:
+    python -m applications.FRODO.algorithm.benchmark.benchmark [results.json] [baseline.json]
+
+With a baseline from an earlier run, all runs whose median latency grew by more than REGRESSION_TOLERANCE are listed.
+"""
+import contextlib
+import dataclasses
+import importlib
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from applications.FRODO.algorithm.benchmark.scenarios import Scenario, ScenarioConfig, generate_scenario, wrap_to_pi, \
+    TOPOLOGIES
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+@dataclasses.dataclass
+class EstimatorVariant:
+    name: str
+    module: str
+    kwargs: dict = dataclasses.field(default_factory=dict)
+    max_agents: int = None  # Larger swarms are skipped for variants that do not scale
+
+
+VARIANTS = [
+    EstimatorVariant('centralized_ekf', 'applications.FRODO.algorithm.centralized_ekf'),
+    EstimatorVariant('centralized_ekf_sparse', 'applications.FRODO.algorithm.centralized_ekf', {'engine': 'sparse'}),
+    EstimatorVariant('centralized_ekf_nullspace', 'applications.FRODO.algorithm.centralized_ekf_nullspace'),
+    # Runs an observability analysis in every step, which takes about 0.5 s per step for 20 agents
+    EstimatorVariant('centralized_ekf_direct_state_measurement',
+                     'applications.FRODO.algorithm.centralized_ekf_direct_state_measurement', max_agents=20),
+    EstimatorVariant('centralized_ekf_old', 'applications.FRODO.algorithm.centralized_ekf_old'),
+    # centralized_ekf_sincos is not benchmarked: it is unfinished and cannot be initialized with any agent state.
+    # init() passes the state to augmentAgentState, which only accepts (x, y, psi), but then copies it unchanged into
+    # the AGENT_STATE_DIM = 4 slots of the (x, y, sin(psi), cos(psi)) state, and the rest of the filter still uses
+    # 3 states per agent
+    EstimatorVariant('ekf_relative_states_with_subgraphs',
+                     'applications.FRODO.algorithm.ekf_relative_states_with_subgraphs'),
+]
+
+SIZES = [5, 10, 20, 50]
+STEPS = 50
+MEMORY_STEPS = 3
+REGRESSION_TOLERANCE = 1.5
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+@dataclasses.dataclass
+class BenchmarkResult:
+    variant: str
+    topology: str
+    num_agents: int
+    steps: int  # Completed steps
+    latency_mean_ms: float = math.nan
+    latency_median_ms: float = math.nan
+    latency_p95_ms: float = math.nan
+    latency_max_ms: float = math.nan
+    peak_memory_mb: float = math.nan  # Peak of the memory allocated during one update
+    rmse_position: float = math.nan
+    rmse_psi: float = math.nan
+    final_rmse_position: float = math.nan
+    final_rmse_psi: float = math.nan
+    nees: float = math.nan  # Mean normalized estimation error squared per agent, 3 for a consistent estimator
+    error: str = ''
+
+
+# ======================================================================================================================
+class EstimatorRun:
+    """
+    Feeds a scenario into one estimator variant, using the VisionAgent and VisionAgentMeasurement classes of its module
+    """
+
+    def __init__(self, variant: EstimatorVariant, scenario: Scenario):
+        self.variant = variant
+        self.scenario = scenario
+        self.module = importlib.import_module(variant.module)
+        if hasattr(self.module, 'logger'):
+            self.module.logger.setLevel('WARNING')
+        self.algorithm = self.module.CentralizedLocationAlgorithm(Ts=scenario.config.Ts, **variant.kwargs)
+        self.agents = self._buildAgents()
+        self.agent_list = list(self.agents.values())
+        self.algorithm.init(self.agents)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def step(self, k: int) -> float:
+        """
+        Runs one update of the estimator with the inputs and measurements of step k
+        :return: Duration of the update in s
+        """
+        for i, agent in enumerate(self.agent_list):
+            agent.input = self.scenario.inputs[k, i].copy()
+            agent.measurements = []
+
+        for (source, target), z in zip(self.scenario.edges[k], self.scenario.measurements[k]):
+            self.agent_list[source].measurements.append(self.module.VisionAgentMeasurement(
+                source=self.agent_list[source].id,
+                source_index=source,
+                target=self.agent_list[target].id,
+                target_index=target,
+                measurement=z.copy(),
+                measurement_covariance=self.scenario.measurement_covariance.copy(),
+            ))
+
+        start = time.perf_counter()
+        self.algorithm.update()
+        return time.perf_counter() - start
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def estimate(self):
+        states = np.array([np.asarray(agent.state, dtype=float)[:3] for agent in self.agent_list])
+        covariances = np.array([np.asarray(agent.state_covariance, dtype=float)[:3, :3] for agent in self.agent_list])
+        return states, covariances
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _buildAgents(self):
+        fields = {field.name for field in dataclasses.fields(self.module.VisionAgent)}
+        agents = {}
+        for i in range(self.scenario.num_agents):
+            kwargs = {
+                'id': f"agent_{i}",
+                'index': i,
+                'state': self.scenario.initial_states[i].copy(),
+                'state_covariance': self.scenario.initial_covariances[i].copy(),
+                'input': np.zeros(2),
+                'input_covariance': np.zeros((2, 2)),
+                'measurements': [],
+                # Only used by the variant with relative states. Agent 0 is the anchor and the root of all agents
+                'is_graph_root': i == 0,
+                'graph_root_index': 0,
+                'graph_root': None,
+            }
+            agents[kwargs['id']] = self.module.VisionAgent(**{key: kwargs[key] for key in kwargs if key in fields})
+
+        if 'graph_root' in fields:
+            root = agents['agent_0']
+            for agent in agents.values():
+                agent.graph_root = root
+        return agents
+
+
+# ======================================================================================================================
+def run_variant(variant: EstimatorVariant, scenario: Scenario, memory_steps: int = MEMORY_STEPS) -> BenchmarkResult:
+    result = BenchmarkResult(variant=variant.name, topology=scenario.config.topology,
+                             num_agents=scenario.num_agents, steps=0)
+
+    latencies = []
+    position_errors = []
+    psi_errors = []
+    nees = []
+
+    # The variants print their state regularly, which is not wanted here
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            run = EstimatorRun(variant, scenario)
+            for k in range(scenario.steps):
+                latencies.append(run.step(k))
+                result.steps += 1
+
+                states, covariances = run.estimate()
+                error = states - scenario.true_states[k + 1]
+                error[:, 2] = wrap_to_pi(error[:, 2])
+                position_errors.append(np.sum(error[:, :2] ** 2, axis=1))
+                psi_errors.append(error[:, 2] ** 2)
+                nees.append(_nees(error, covariances))
+
+            result.peak_memory_mb = _peakMemory(variant, scenario, memory_steps) / 1e6
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+
+    if len(latencies) > 0:
+        latencies = np.asarray(latencies) * 1e3
+        result.latency_mean_ms = float(np.mean(latencies))
+        result.latency_median_ms = float(np.median(latencies))
+        result.latency_p95_ms = float(np.percentile(latencies, 95))
+        result.latency_max_ms = float(np.max(latencies))
+
+        result.rmse_position = float(np.sqrt(np.mean(position_errors)))
+        result.rmse_psi = float(np.sqrt(np.mean(psi_errors)))
+        result.final_rmse_position = float(np.sqrt(np.mean(position_errors[-1])))
+        result.final_rmse_psi = float(np.sqrt(np.mean(psi_errors[-1])))
+        finite = np.concatenate(nees)
+        finite = finite[np.isfinite(finite)]
+        result.nees = float(np.mean(finite)) if len(finite) > 0 else math.nan
+
+    return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _nees(error: np.ndarray, covariances: np.ndarray) -> np.ndarray:
+    nees = np.full(len(error), math.nan)
+    for i, (e, P) in enumerate(zip(error, covariances)):
+        try:
+            nees[i] = e @ np.linalg.solve(P, e)
+        except np.linalg.LinAlgError:
+            pass
+    return nees
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _peakMemory(variant: EstimatorVariant, scenario: Scenario, steps: int) -> int:
+    """
+    Peak of the memory allocated during one update, measured in a separate run since tracemalloc slows down the
+    estimators
+    """
+    run = EstimatorRun(variant, scenario)
+    peak = 0
+    tracemalloc.start()
+    try:
+        for k in range(min(steps, scenario.steps)):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            run.step(k)
+            _, step_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, step_peak - baseline)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+# ======================================================================================================================
+def run_benchmark(variants: list[EstimatorVariant] = None, topologies: list[str] = None, sizes: list[int] = None,
+                  steps: int = STEPS, seed: int = 0, verbose: bool = True) -> list[BenchmarkResult]:
+    variants = variants if variants is not None else VARIANTS
+    topologies = topologies if topologies is not None else TOPOLOGIES
+    sizes = sizes if sizes is not None else SIZES
+
+    results = []
+    for topology in topologies:
+        for num_agents in sizes:
+            scenario = generate_scenario(ScenarioConfig(topology=topology, num_agents=num_agents, steps=steps,
+                                                        seed=seed))
+            for variant in variants:
+                if variant.max_agents is not None and num_agents > variant.max_agents:
+                    result = BenchmarkResult(variant=variant.name, topology=topology, num_agents=num_agents, steps=0,
+                                             error=f"skipped, more than {variant.max_agents} agents")
+                else:
+                    result = run_variant(variant, scenario)
+                results.append(result)
+                if verbose:
+                    print(format_result(result))
+    return results
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+TABLE_HEADER = (f"{'variant':<42} | {'topology':<10} | {'N':>4} | {'median ms':>9} | {'p95 ms':>9} | {'mem MB':>7} | "
+                f"{'RMSE pos':>9} | {'RMSE psi':>9} | {'NEES':>9} | error")
+
+
+def format_result(result: BenchmarkResult) -> str:
+    return (f"{result.variant:<42} | {result.topology:<10} | {result.num_agents:>4} | "
+            f"{result.latency_median_ms:>9.2f} | {result.latency_p95_ms:>9.2f} | {result.peak_memory_mb:>7.2f} | "
+            f"{result.rmse_position:>9.3g} | {result.rmse_psi:>9.3g} | {result.nees:>9.3g} | {result.error}")
+
+
+def print_table(results: list[BenchmarkResult]):
+    print(TABLE_HEADER)
+    for result in results:
+        print(format_result(result))
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def save_json(results: list[BenchmarkResult], path: str):
+    data = []
+    for result in results:
+        entry = dataclasses.asdict(result)
+        # JSON has no NaN
+        data.append({key: None if isinstance(value, float) and not math.isfinite(value) else value
+                     for key, value in entry.items()})
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=2)
+
+
+def load_json(path: str) -> list[BenchmarkResult]:
+    with open(path) as file:
+        data = json.load(file)
+    return [BenchmarkResult(**{key: math.nan if value is None else value for key, value in entry.items()})
+            for entry in data]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def find_regressions(results: list[BenchmarkResult], baseline: list[BenchmarkResult],
+                     tolerance: float = REGRESSION_TOLERANCE) -> list[tuple[BenchmarkResult, BenchmarkResult]]:
+    """
+    Runs that got slower than tolerance times the baseline or failed although they passed in the baseline
+    :return: Pairs of the (result, baseline result)
+    """
+    baseline = {(result.variant, result.topology, result.num_agents): result for result in baseline}
+    regressions = []
+    for result in results:
+        reference = baseline.get((result.variant, result.topology, result.num_agents))
+        if reference is None or reference.error:
+            continue
+        if result.error or result.latency_median_ms > tolerance * reference.latency_median_ms:
+            regressions.append((result, reference))
+    return regressions
+
+
+# ======================================================================================================================
+def main():
+    print(TABLE_HEADER)
+    results = run_benchmark()
+
+    if len(sys.argv) > 1:
+        save_json(results, sys.argv[1])
+
+    if len(sys.argv) > 2:
+        regressions = find_regressions(results, load_json(sys.argv[2]))
+        print(f"\n{len(regressions)} regressions compared to {sys.argv[2]}")
+        for result, reference in regressions:
+            print(f"{result.variant} ({result.topology}, N={result.num_agents}): "
+                  f"{reference.latency_median_ms:.2f} ms -> {result.latency_median_ms:.2f} ms {result.error}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+import dataclasses
+import math
+
+import numpy as np
+
+TOPOLOGIES = ['circle', 'two_groups', 'random', 'changing']
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+@dataclasses.dataclass
+class ScenarioConfig:
+    topology: str = 'circle'  # One of TOPOLOGIES
+    num_agents: int = 10
+    steps: int = 50
+    Ts: float = 0.1
+    radius: float = 2.0  # Radius of the formation for 'circle' and 'two_groups', half the arena size otherwise
+    velocity: float = 0.2
+    degree: int = 2  # Measurements per agent for 'random' and 'changing'
+    change_interval: int = 10  # Steps between new measurement graphs for 'changing'
+    measurement_std: tuple = (0.02, 0.02, 0.01)
+    initial_std: tuple = (0.3, 0.3, 0.2)  # Error of the initial guess of all agents except the anchor
+    anchor_std: float = 1e-3  # Agent 0 is the anchor with a known initial state
+    seed: int = 0
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+@dataclasses.dataclass
+class Scenario:
+    config: ScenarioConfig
+    true_states: np.ndarray  # (steps + 1, N, 3), the state after step k is true_states[k + 1]
+    inputs: np.ndarray  # (steps, N, 2)
+    initial_states: np.ndarray  # (N, 3) initial guesses of the estimator
+    initial_covariances: np.ndarray  # (N, 3, 3)
+    edges: list[list[tuple[int, int]]]  # (source, target) of the measurements in each step
+    measurements: list[np.ndarray]  # (num_edges, 3) measurements in each step, taken after the motion of the step
+    measurement_covariance: np.ndarray  # (3, 3)
+
+    @property
+    def num_agents(self):
+        return self.config.num_agents
+
+    @property
+    def steps(self):
+        return self.config.steps
+
+
+# ======================================================================================================================
+def relative_measurement(source_states: np.ndarray, target_states: np.ndarray) -> np.ndarray:
+    """
+    Position of the targets in the frame of the sources and the relative heading, same model as the FRODO vision
+    measurements
+    """
+    cos_psi = np.cos(source_states[:, 2])
+    sin_psi = np.sin(source_states[:, 2])
+    dx = target_states[:, 0] - source_states[:, 0]
+    dy = target_states[:, 1] - source_states[:, 1]
+    return np.stack((
+        cos_psi * dx + sin_psi * dy,
+        -sin_psi * dx + cos_psi * dy,
+        wrap_to_pi(target_states[:, 2] - source_states[:, 2])
+    ), axis=1)
+
+
+def wrap_to_pi(angle):
+    return (angle + np.pi) % (2 * np.pi) - np.pi
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _ring_edges(members: list[int]) -> list[tuple[int, int]]:
+    if len(members) < 2:
+        return []
+    return [(members[i], members[(i + 1) % len(members)]) for i in range(len(members))]
+
+
+def _random_edges(num_agents: int, degree: int, rng: np.random.Generator) -> list[tuple[int, int]]:
+    edges = []
+    degree = min(degree, num_agents - 1)
+    for source in range(num_agents):
+        others = np.delete(np.arange(num_agents), source)
+        edges.extend((source, int(target)) for target in rng.choice(others, size=degree, replace=False))
+    return edges
+
+
+def _circle_formation(num_agents: int, center, radius: float, velocity: float):
+    angles = 2 * math.pi * np.arange(num_agents) / max(num_agents, 1)
+    states = np.stack((
+        center[0] + radius * np.cos(angles),
+        center[1] + radius * np.sin(angles),
+        wrap_to_pi(angles + math.pi / 2)
+    ), axis=1)
+    # All agents drive on the circle, so the formation rotates but keeps its shape
+    inputs = np.tile([velocity, velocity / radius], (num_agents, 1))
+    return states, inputs
+
+
+# ======================================================================================================================
+def generate_scenario(config: ScenarioConfig) -> Scenario:
+    """
+    Simulates a swarm of unicycle agents and the relative measurements between them.
+
+    - circle: All agents on one circle, each agent measures the next one
+    - two_groups: Two separate circles without measurements between them. Only the first group contains the anchor
+    - random: Random initial states and inputs, a fixed random measurement graph
+    - changing: Like random, but the measurement graph is drawn again every change_interval steps
+    """
+    assert config.topology in TOPOLOGIES, f"Unknown topology {config.topology}"
+    rng = np.random.default_rng(config.seed)
+    n = config.num_agents
+
+    if config.topology == 'circle':
+        states, inputs = _circle_formation(n, (0, 0), config.radius, config.velocity)
+        graph = _ring_edges(list(range(n)))
+    elif config.topology == 'two_groups':
+        group_1 = list(range(n // 2 + n % 2))
+        group_2 = list(range(len(group_1), n))
+        states_1, inputs_1 = _circle_formation(len(group_1), (-1.5 * config.radius, 0), config.radius,
+                                               config.velocity)
+        states_2, inputs_2 = _circle_formation(len(group_2), (1.5 * config.radius, 0), config.radius,
+                                               config.velocity)
+        states = np.concatenate((states_1, states_2))
+        inputs = np.concatenate((inputs_1, inputs_2))
+        graph = _ring_edges(group_1) + _ring_edges(group_2)
+    else:
+        states = np.column_stack((rng.uniform(-config.radius, config.radius, (n, 2)),
+                                  rng.uniform(-math.pi, math.pi, n)))
+        inputs = np.column_stack((rng.uniform(0, config.velocity, n), rng.uniform(-0.5, 0.5, n)))
+        graph = _random_edges(n, config.degree, rng)
+
+    # Ground truth with the same motion model as the estimators
+    true_states = np.zeros((config.steps + 1, n, 3))
+    true_states[0] = states
+    for k in range(config.steps):
+        x = true_states[k]
+        true_states[k + 1, :, 0] = x[:, 0] + config.Ts * inputs[:, 0] * np.cos(x[:, 2])
+        true_states[k + 1, :, 1] = x[:, 1] + config.Ts * inputs[:, 0] * np.sin(x[:, 2])
+        true_states[k + 1, :, 2] = wrap_to_pi(x[:, 2] + config.Ts * inputs[:, 1])
+
+    # Measurements
+    measurement_std = np.asarray(config.measurement_std, dtype=float)
+    edges = []
+    measurements = []
+    for k in range(config.steps):
+        if config.topology == 'changing' and k > 0 and k % config.change_interval == 0:
+            graph = _random_edges(n, config.degree, rng)
+        edges.append(list(graph))
+
+        if len(graph) == 0:
+            measurements.append(np.zeros((0, 3)))
+            continue
+        source, target = np.array(graph).T
+        z = relative_measurement(true_states[k + 1, source], true_states[k + 1, target])
+        z += rng.normal(size=z.shape) * measurement_std
+        z[:, 2] = wrap_to_pi(z[:, 2])
+        measurements.append(z)
+
+    # Initial guesses with an error that matches their covariance
+    initial_std = np.tile(np.asarray(config.initial_std, dtype=float), (n, 1))
+    initial_std[0] = config.anchor_std
+    initial_states = true_states[0] + rng.normal(size=(n, 3)) * initial_std
+    initial_states[:, 2] = wrap_to_pi(initial_states[:, 2])
+    initial_covariances = np.array([np.diag(std ** 2) for std in initial_std])
+
+    return Scenario(
+        config=config,
+        true_states=true_states,
+        inputs=np.repeat(inputs[np.newaxis], config.steps, axis=0),
+        initial_states=initial_states,
+        initial_covariances=initial_covariances,
+        edges=edges,
+        measurements=measurements,
+        measurement_covariance=np.diag(measurement_std ** 2),
+    )
@@ -2,6 +2,7 @@ import dataclasses
 import math
 import numpy as np
 import qmt
+import scipy.linalg
 
 from core.utils.logging_utils import Logger
 
@@ -42,8 +43,22 @@ class CentralizedLocationAlgorithm:
 
     step: int = 0
 
-    def __init__(self, Ts):
+    engine: str
+    measurement_batch_size: int
+
+    def __init__(self, Ts, engine: str = 'dense', measurement_batch_size: int = 16):
+        """
+        Args:
+            Ts: Sample time
+            engine: 'dense' builds the full Jacobians and inverts the innovation covariance. 'sparse' uses the block
+                structure of the Jacobians, Cholesky solves and updates the covariance in place. Both give the same
+                estimate up to numerical precision, 'sparse' scales to large swarms
+            measurement_batch_size: Number of measurements that are fused at once by the 'sparse' engine
+        """
+        assert engine in ['dense', 'sparse']
         self.Ts = Ts
+        self.engine = engine
+        self.measurement_batch_size = measurement_batch_size
 
     def init(self, agents: dict[str, VisionAgent]):
         self.agents = agents
@@ -64,6 +79,35 @@ class CentralizedLocationAlgorithm:
 
     # ------------------------------------------------------------------------------------------------------------------
     def update(self):
+        if self.engine == 'sparse':
+            new_state, new_covariance = self.update_sparse()
+        else:
+            new_state, new_covariance = self.update_dense()
+
+        # Wrap all angles
+        new_state[2::3] = (new_state[2::3] + np.pi) % (2 * np.pi) - np.pi
+
+        self.state = new_state
+        self.state_covariance = new_covariance
+
+        # Write the state back to the agents
+        for i in range(len(self.agents)):
+            agent = self.getAgentByIndex(i)
+            if agent is None:
+                raise ValueError(f"Agent with index {i} does not exist.")
+            agent.state = self.state[i * 3:(i + 1) * 3]
+            agent.state_covariance = self.state_covariance[i * 3:(i + 1) * 3, i * 3:(i + 1) * 3]
+
+        self.step += 1
+
+        if (self.step % 10) == 0 or self.step == 1:
+            print("--------------------------------")
+            print(f"Step: {self.step}")
+            for agent in self.agents.values():
+                print(f"{agent.id}: \t x: {agent.state[0]:.1f} \t y: {agent.state[1]:.1f} \t psi: {agent.state[2]:.1f} \t Cov: {np.linalg.norm(agent.state_covariance, 'fro'):.1f}")
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def update_dense(self):
 
         # STEP 1: PREDICTION
         x_hat_pre, P_hat_pre = self.prediction()
@@ -104,31 +148,167 @@ class CentralizedLocationAlgorithm:
             new_state = x_hat_pre
             new_covariance = P_hat_pre
 
-        # Wrap all angles
-        for i in range(len(new_state)):
-            if i % 3 == 2:
-                new_state[i] = qmt.wrapToPi(new_state[i])
-            else:
-                continue
+        return new_state, new_covariance
 
-        self.state = new_state
-        self.state_covariance = new_covariance
+    # ------------------------------------------------------------------------------------------------------------------
+    def update_sparse(self):
+        """
+        Same update as update_dense, using the block structure of the problem. The dynamics Jacobian is block diagonal
+        and each measurement only depends on the source and the target agent, so the full Jacobians are never built.
+        The measurements are fused sequentially in batches of measurement_batch_size with Cholesky solves, which gives
+        the same result as the joint update since the measurement noise is uncorrelated between measurements.
 
-        # Write the state back to the agents
-        for i in range(len(self.agents)):
-            agent = self.getAgentByIndex(i)
-            if agent is None:
-                raise ValueError(f"Agent with index {i} does not exist.")
-            agent.state = self.state[i * 3:(i + 1) * 3]
-            agent.state_covariance = self.state_covariance[i * 3:(i + 1) * 3, i * 3:(i + 1) * 3]
+        Returns:
+            The new state and state covariance
+        """
+        agents = sorted(self.agents.values(), key=lambda agent: agent.index)
+        states = np.array([agent.state for agent in agents], dtype=float).reshape(-1, 3)
+        inputs = np.array([agent.input for agent in agents], dtype=float).reshape(-1, 2)
 
-        self.step += 1
+        # STEP 1: PREDICTION
+        x_hat_pre, P = self.prediction_sparse(states, inputs)
 
-        if (self.step % 10) == 0 or self.step == 1:
-            print("--------------------------------")
-            print(f"Step: {self.step}")
-            for agent in self.agents.values():
-                print(f"{agent.id}: \t x: {agent.state[0]:.1f} \t y: {agent.state[1]:.1f} \t psi: {agent.state[2]:.1f} \t Cov: {np.linalg.norm(agent.state_covariance, 'fro'):.1f}")
+        # STEP 2: EXTRACT MEASUREMENTS
+        measurements = self.getMeasurements()
+        if len(measurements) == 0:
+            return x_hat_pre, P
+
+        # STEP 3: LINEARIZE ALL MEASUREMENTS
+        source = np.array([measurement.source_index for measurement in measurements])
+        target = np.array([measurement.target_index for measurement in measurements])
+        H_source, H_target, y_est = self.measurementModel_sparse(states[source], states[target])
+        y = np.array([np.asarray(measurement.measurement, dtype=float).reshape(3) for measurement in measurements])
+        W = np.array([np.diag(np.eye(3) * measurement.measurement_covariance) for measurement in measurements])
+
+        diff = y - y_est
+        diff[:, 2] = (diff[:, 2] + np.pi) % (2 * np.pi) - np.pi
+
+        # STEP 4: SEQUENTIAL UPDATE
+        x = x_hat_pre.copy()
+        for start in range(0, len(measurements), self.measurement_batch_size):
+            batch = slice(start, start + self.measurement_batch_size)
+            self.correction_sparse(x, x_hat_pre, P, source[batch], target[batch], H_source[batch], H_target[batch],
+                                   diff[batch], W[batch])
+
+        # Keep the covariance symmetric
+        P += P.T
+        P *= 0.5
+
+        return x, P
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def prediction_sparse(self, states: np.ndarray, inputs: np.ndarray):
+        """
+        Prediction of the full system. The covariance is propagated in place, using that the Jacobian of each agent is
+        the identity except for the derivative of the position by the heading
+
+        Args:
+            states: (N, 3) states of the agents
+            inputs: (N, 2) inputs of the agents
+
+        Returns:
+            The predicted state and the predicted state covariance
+        """
+        x_hat = np.empty_like(states)
+        x_hat[:, 0] = states[:, 0] + self.Ts * inputs[:, 0] * np.cos(states[:, 2])
+        x_hat[:, 1] = states[:, 1] + self.Ts * inputs[:, 0] * np.sin(states[:, 2])
+        x_hat[:, 2] = states[:, 2] + self.Ts * inputs[:, 1]
+
+        # P = F P F^T with F = I + the entries of jacobianAgent in the third column
+        dx_dpsi = -self.Ts * inputs[:, 0] * np.sin(states[:, 2])
+        dy_dpsi = self.Ts * inputs[:, 0] * np.cos(states[:, 2])
+
+        P = self.state_covariance.copy()
+        P[0::3, :] += dx_dpsi[:, np.newaxis] * P[2::3, :]
+        P[1::3, :] += dy_dpsi[:, np.newaxis] * P[2::3, :]
+        P[:, 0::3] += dx_dpsi[np.newaxis, :] * P[:, 2::3]
+        P[:, 1::3] += dy_dpsi[np.newaxis, :] * P[:, 2::3]
+
+        P[np.diag_indices_from(P)] += 1e-10
+
+        return x_hat.reshape(-1), P
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def measurementModel_sparse(source_states: np.ndarray, target_states: np.ndarray):
+        """
+        Predicted measurements and the Jacobian blocks of the source and target agent for all measurements, see
+        measurementPredictionAgent and measurementJacobianAgents
+
+        Args:
+            source_states: (M, 3) states of the measuring agents
+            target_states: (M, 3) states of the measured agents
+
+        Returns:
+            (M, 3, 3) Jacobians by the source states, (M, 3, 3) Jacobians by the target states and the (M, 3)
+            predicted measurements
+        """
+        cos_psi = np.cos(source_states[:, 2])
+        sin_psi = np.sin(source_states[:, 2])
+        dx = target_states[:, 0] - source_states[:, 0]
+        dy = target_states[:, 1] - source_states[:, 1]
+
+        y_est = np.stack((
+            cos_psi * dx + sin_psi * dy,
+            -sin_psi * dx + cos_psi * dy,
+            (target_states[:, 2] - source_states[:, 2] + np.pi) % (2 * np.pi) - np.pi
+        ), axis=1)
+
+        H_target = np.zeros((len(source_states), 3, 3))
+        H_target[:, 0, 0] = cos_psi
+        H_target[:, 0, 1] = sin_psi
+        H_target[:, 1, 0] = -sin_psi
+        H_target[:, 1, 1] = cos_psi
+        H_target[:, 2, 2] = 1
+
+        H_source = -H_target
+        H_source[:, 0, 2] = -sin_psi * dx + cos_psi * dy
+        H_source[:, 1, 2] = -cos_psi * dx - sin_psi * dy
+
+        return H_source, H_target, y_est
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def correction_sparse(x: np.ndarray, x_hat_pre: np.ndarray, P: np.ndarray, source: np.ndarray, target: np.ndarray,
+                          H_source: np.ndarray, H_target: np.ndarray, diff: np.ndarray, W: np.ndarray):
+        """
+        Fuses a batch of measurements into the state and the covariance, both are updated in place. The measurement
+        Jacobian of the batch only has entries in the columns of the involved agents.
+
+        Args:
+            x: State after the previous batches
+            x_hat_pre: Predicted state. The measurements were linearized around it, so the innovation is corrected by
+                the change of the state from previous batches
+            P: State covariance after the previous batches
+            source: (B,) indices of the measuring agents
+            target: (B,) indices of the measured agents
+            H_source: (B, 3, 3) Jacobians by the source states
+            H_target: (B, 3, 3) Jacobians by the target states
+            diff: (B, 3) difference of the measurements and the predicted measurements
+            W: (B, 3) measurement variances
+        """
+        num = len(source)
+
+        # Compact Jacobian over the state entries of all involved agents
+        agents, positions = np.unique(np.concatenate((source, target)), return_inverse=True)
+        columns = (3 * agents[:, np.newaxis] + np.arange(3)).reshape(-1)
+        H = np.zeros((num, 3, len(agents), 3))
+        H[np.arange(num), :, positions[:num], :] = H_source
+        H[np.arange(num), :, positions[num:], :] = H_target
+        H = H.reshape(3 * num, 3 * len(agents))
+
+        PHt = P[:, columns] @ H.T
+        S = H @ PHt[columns, :]
+        S[np.diag_indices_from(S)] += W.reshape(-1)
+
+        innovation = diff.reshape(-1) - H @ (x[columns] - x_hat_pre[columns])
+
+        # K = P H^T S^-1, so K^T = S^-1 H P and P - K S K^T = P - P H^T K^T
+        cholesky = scipy.linalg.cho_factor(S)
+        Kt = scipy.linalg.cho_solve(cholesky, PHt.T)
+
+        x += Kt.T @ innovation
+        P -= PHt @ Kt
 
     # ------------------------------------------------------------------------------------------------------------------
     def predictionAgent(self, state: np.ndarray, input: np.ndarray):
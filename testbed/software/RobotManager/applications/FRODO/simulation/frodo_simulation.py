@@ -4,10 +4,10 @@ import math
 import time
 
 import numpy as np
-import qmt
 
 import extensions.simulation.src.core as core
-from applications.FRODO.simulation.frodo_simulation_utils import frodo_virtual_agent_colors, is_in_fov
+from applications.FRODO.simulation.frodo_simulation_utils import frodo_virtual_agent_colors, \
+    compute_relative_measurements
 from applications.FRODO.utilities.web_gui.FRODO_Web_Interface import FRODO_Web_Interface, Group
 from extensions.simulation.src.core.environment import BASE_ENVIRONMENT_ACTIONS
 from extensions.simulation.src.objects.base_environment import BaseEnvironment
@@ -24,10 +24,17 @@ class FRODO_ENVIRONMENT_ACTIONS(enum.StrEnum):
 
 # ======================================================================================================================
 class FrodoEnvironment(BaseEnvironment):
+    measurement_kdtree: bool
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, measurement_kdtree: bool = False, **kwargs):
+        """
+        :param measurement_kdtree: Only check agents within the largest view range for measurements, found with a
+                                   KD-tree. Faster for large swarms
+        """
         super().__init__(*args, **kwargs)
 
+        self.measurement_kdtree = measurement_kdtree
+
         self.logger = Logger('FRODO ENV')
         self.logger.setLevel('INFO')
 
@@ -56,6 +63,13 @@ class FrodoEnvironment(BaseEnvironment):
     def action_measurement(self):
         self.logger.debug(f"{self.scheduling.tick}: Action Frodo Measurement")
 
+        # Generate the measurements of all vision agents at once. Runs before the measurement actions of the agents
+        agents = list(self.agents.values())
+        observers = [agent for agent in agents if isinstance(agent, FRODO_VisionAgent)]
+        measurements = generateMeasurements(observers, agents, use_kdtree=self.measurement_kdtree)
+        for observer in observers:
+            observer.measurements = measurements[observer.agent_id]
+
     def action_frodo_communication(self):
         self.logger.debug(f"{self.scheduling.tick}: Action Frodo Communication")
 
@@ -72,6 +86,37 @@ class FRODO_Agent_Measurement:
     psi: float
 
 
+def generateMeasurements(observers: list['FRODO_VisionAgent'], agents: list,
+                         use_kdtree: bool = False) -> dict[str, dict[str, FRODO_Agent_Measurement]]:
+    """
+    Measurements of all observers to the other agents in their field of view
+    :param observers: Vision agents that generate measurements
+    :param agents: All agents that can be measured
+    :param use_kdtree: See compute_relative_measurements
+    :return: Measurements of each observer, by the agent id of the measured agent
+    """
+    configurations = [agent.configuration for agent in agents]
+    positions = np.array([configuration['pos'].value for configuration in configurations], dtype=float)
+    psis = np.array([configuration['psi'].value for configuration in configurations], dtype=float)
+
+    index = {agent.agent_id: i for i, agent in enumerate(agents)}
+    observer_index, other_index, vec, psi = compute_relative_measurements(
+        positions=positions,
+        psis=psis,
+        observers=[index[observer.agent_id] for observer in observers],
+        fovs=[observer.fov for observer in observers],
+        view_ranges=[observer.view_range for observer in observers],
+        use_kdtree=use_kdtree
+    )
+
+    measurements = {observer.agent_id: {} for observer in observers}
+    for i, j, vec_i, psi_i in zip(observer_index, other_index, vec, psi):
+        other_id = agents[j].agent_id
+        measurements[agents[i].agent_id][other_id] = FRODO_Agent_Measurement(agent_id=other_id, vec=vec_i,
+                                                                             psi=float(psi_i))
+    return measurements
+
+
 class FRODO_VisionAgent(FRODO_DynamicAgent):
     fov: float
     view_range: float
@@ -82,6 +127,7 @@ class FRODO_VisionAgent(FRODO_DynamicAgent):
 
         self.fov = math.radians(fov_deg)
         self.view_range = view_range
+        self.measurements = {}
 
         self.logger = Logger(self.agent_id)
         self.logger.setLevel('INFO')
@@ -108,45 +154,12 @@ class FRODO_VisionAgent(FRODO_DynamicAgent):
     def action_measurement(self):
         self.logger.debug(f"{self.scheduling.tick}: ({self.agent_id}) Action Frodo Measurement")
 
-        # Loop over other agents in environment
-        other_agents = {
-            agent_id: other_agent
-            for agent_id, other_agent in self.env.agents.items()
-            if self.agent_id != other_agent.agent_id
-        }
-
-        self.measurements = {}
-
-        for agent_id, other_agent in other_agents.items():
-            ...
-            in_fov = is_in_fov(pos=self.configuration['pos'].value,
-                               psi=self.configuration['psi'].value,
-                               fov=self.fov,
-                               radius=self.view_range,
-                               other_agent_pos=other_agent.configuration['pos'].value)
-
-            if in_fov:
-
-                vec = other_agent.configuration['pos'].value - self.configuration['pos'].value
-                psi = qmt.wrapToPi(other_agent.configuration['psi'].value - self.configuration['psi'].value)
-
-                # Transform vec into agent's coordinate system
-                own_psi = self.configuration['psi'].value
-
-                R = np.array([
-                    [math.cos(own_psi), math.sin(own_psi)],
-                    [-math.sin(own_psi), math.cos(own_psi)]
-                ])
-
-                vec_transformed = R @ vec
-
-                measurement = FRODO_Agent_Measurement(
-                    agent_id=other_agent.agent_id,
-                    vec=vec_transformed,
-                    psi=psi
-                )
+        # The FrodoEnvironment generates the measurements of all agents at once
+        if isinstance(self.env, FrodoEnvironment):
+            return
 
-                self.measurements[other_agent.agent_id] = measurement
+        measurements = generateMeasurements([self], list(self.env.agents.values()))
+        self.measurements = measurements[self.agent_id]
 
     def action_frodo_communication(self):
         self.logger.debug(f"{self.scheduling.tick}: ({self.agent_id}) Action Frodo Communication")
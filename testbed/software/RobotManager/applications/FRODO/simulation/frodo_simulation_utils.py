@@ -34,3 +34,71 @@ def is_in_fov(pos, psi, fov, radius, other_agent_pos):
         return True
     else:
         return False
+
+
+def compute_relative_measurements(positions, psis, observers, fovs, view_ranges, use_kdtree=False):
+    """
+    Computes the measurements of all observers to all other agents in their field of view in one pass. Uses the same
+    field of view test as is_in_fov.
+
+    :param positions: (n, 2) positions of all agents
+    :param psis: (n,) headings of all agents
+    :param observers: (m,) indices of the observing agents
+    :param fovs: (m,) field of view of each observer in rad
+    :param view_ranges: (m,) view range of each observer
+    :param use_kdtree: Only check pairs that are closer than the largest view range, found with a KD-tree. Faster for
+                       large swarms where each agent only sees a few others
+    :return: Indices of the observers and the observed agents, the vectors to the observed agents in the frame of the
+             observer (k, 2) and the headings of the observed agents relative to the observer (k,)
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    psis = np.asarray(psis, dtype=float)
+    observers = np.asarray(observers, dtype=int)
+    fovs = np.asarray(fovs, dtype=float)
+    view_ranges = np.asarray(view_ranges, dtype=float)
+
+    if len(observers) == 0 or len(positions) < 2:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros((0, 2)), np.zeros(0)
+
+    if use_kdtree:
+        from scipy.spatial import cKDTree
+        pairs = cKDTree(positions).query_pairs(r=float(np.max(view_ranges)), output_type='ndarray')
+        pairs = np.concatenate((pairs, pairs[:, ::-1]))
+        observer_slot = np.full(len(positions), -1)
+        observer_slot[observers] = np.arange(len(observers))
+        pairs = pairs[observer_slot[pairs[:, 0]] >= 0]
+        slot = observer_slot[pairs[:, 0]]
+        observer_index, other_index = pairs[:, 0], pairs[:, 1]
+    else:
+        slot, other_index = np.nonzero(observers[:, np.newaxis] != np.arange(len(positions))[np.newaxis, :])
+        observer_index = observers[slot]
+
+    vec = positions[other_index] - positions[observer_index]
+    psi = psis[observer_index]
+    alpha = fovs[slot] / 2
+
+    # Borders of the field of view, see get_fov_vectors
+    v1 = np.stack((np.cos(psi + alpha), np.sin(psi + alpha)), axis=1)
+    v2 = np.stack((np.cos(psi - alpha), np.sin(psi - alpha)), axis=1)
+
+    def cross(a, b):
+        return a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+
+    cross_12 = cross(v1, v2)
+    in_fov = ((cross(v1, vec) * cross_12 >= 0) & (cross(v2, vec) * -cross_12 >= 0) &
+              (np.linalg.norm(vec, axis=1) <= view_ranges[slot]))
+
+    observer_index = observer_index[in_fov]
+    other_index = other_index[in_fov]
+    vec = vec[in_fov]
+    psi = psi[in_fov]
+
+    # Rotate the vectors into the frame of the observer
+    cos_psi = np.cos(psi)
+    sin_psi = np.sin(psi)
+    vec_local = np.stack((cos_psi * vec[:, 0] + sin_psi * vec[:, 1], -sin_psi * vec[:, 0] + cos_psi * vec[:, 1]),
+                         axis=1)
+
+    psi_relative = (psis[other_index] - psi + np.pi) % (2 * np.pi) - np.pi
+
+    return observer_index, other_index, vec_local, psi_relative
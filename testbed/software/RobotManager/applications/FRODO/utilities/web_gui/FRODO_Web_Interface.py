@@ -5,6 +5,7 @@ import time
 import webbrowser
 
 from core.utils.exit import register_exit_callback
+from core.utils.orientation.plot_2d.dynamic.scene_sync import TrackedElement, SceneEntry, SceneSync
 from core.utils.websockets.websockets import SyncWebsocketServer
 
 from dataclasses import dataclass, field, fields
@@ -37,7 +38,7 @@ def asdict_no_parent(obj):
 # -----------------------------------------------------------------------------
 
 @dataclass
-class PlottableElement:
+class PlottableElement(TrackedElement):
     id: str = ''
     parent: Optional["Group"] = field(default=None, repr=False, compare=False)
 
@@ -132,6 +133,25 @@ class Circle(PlottableElement):
     linecolor: Optional[List[float]] = None
 
 
+ELEMENT_KINDS = ["points", "agents", "visionagents", "vectors", "coordinate_systems", "lines", "rectangles", "circles"]
+
+
+def element_to_dict(element: PlottableElement) -> dict:
+    # Always ensure a leading "/" for references.
+    def process_ref(ref):
+        if isinstance(ref, str) and not ref.startswith('/'):
+            return '/' + ref
+        return ref
+
+    element_dict = {**asdict_no_parent(element), "fullPath": element.fullPath}
+    if isinstance(element, Line):
+        element_dict["start"] = process_ref(element._start_element.fullPath
+                                            if element._start_element is not None else element.start)
+        element_dict["end"] = process_ref(element._end_element.fullPath
+                                          if element._end_element is not None else element.end)
+    return element_dict
+
+
 # -----------------------------------------------------------------------------
 # Group Container with add functions, helper methods, and a to_dict method.
 # -----------------------------------------------------------------------------
@@ -149,6 +169,9 @@ class Group(PlottableElement):
     groups: Dict[str, "Group"] = field(default_factory=dict)
     name: str = ''  # For display purposes.
 
+    _untracked_fields = ('parent', 'points', 'agents', 'visionagents', 'vectors', 'coordinate_systems', 'lines',
+                         'rectangles', 'circles', 'groups')
+
     def __post_init__(self):
         self.name = self.id
 
@@ -299,33 +322,29 @@ class Group(PlottableElement):
             self.groups[group.id] = group
             return group
 
+    def header_dict(self) -> dict:
+        return {"id": self.id, "name": self.name, "fullPath": self.fullPath}
+
     def to_dict(self) -> dict:
-        # Always ensure a leading "/" for references.
-        def process_ref(ref):
-            if isinstance(ref, str) and not ref.startswith('/'):
-                return '/' + ref
-            return ref
-
-        group_dict = {
-            "id": self.id,
-            "name": self.name,
-            "fullPath": self.fullPath,
-            "points": {k: {**asdict_no_parent(v), "fullPath": v.fullPath} for k, v in self.points.items()},
-            "agents": {k: {**asdict_no_parent(v), "fullPath": v.fullPath} for k, v in self.agents.items()},
-            "visionagents": {k: {**asdict_no_parent(v), "fullPath": v.fullPath} for k, v in self.visionagents.items()},
-            "vectors": {k: {**asdict_no_parent(v), "fullPath": v.fullPath} for k, v in self.vectors.items()},
-            "coordinate_systems": {k: {**asdict_no_parent(v), "fullPath": v.fullPath} for k, v in self.coordinate_systems.items()},
-            "lines": {k: {**asdict_no_parent(v),
-                          "start": process_ref(v._start_element.fullPath if v._start_element is not None else v.start),
-                          "end": process_ref(v._end_element.fullPath if v._end_element is not None else v.end),
-                          "fullPath": v.fullPath}
-                      for k, v in self.lines.items()},
-            "rectangles": {k: {**asdict_no_parent(v), "fullPath": v.fullPath} for k, v in self.rectangles.items()},
-            "circles": {k: {**asdict_no_parent(v), "fullPath": v.fullPath} for k, v in self.circles.items()},
-            "groups": {k: v.to_dict() for k, v in self.groups.items()},
-        }
+        group_dict = self.header_dict()
+        for kind in ELEMENT_KINDS:
+            group_dict[kind] = {k: element_to_dict(v) for k, v in getattr(self, kind).items()}
+        group_dict["groups"] = {k: v.to_dict() for k, v in self.groups.items()}
         return group_dict
 
+    def scene_entries(self, path: tuple = ()) -> list[SceneEntry]:
+        """
+        Returns this group, its elements and all subgroups for the scene sync. path contains the ids of the parent groups
+        """
+        entries = [SceneEntry(path, "groups", self.id, self, Group.header_dict)]
+        group_path = path + (self.id,)
+        for kind in ELEMENT_KINDS:
+            for k, v in getattr(self, kind).items():
+                entries.append(SceneEntry(group_path, kind, k, v, element_to_dict))
+        for sub in self.groups.values():
+            entries.extend(sub.scene_entries(group_path))
+        return entries
+
 
 # -----------------------------------------------------------------------------
 # Dynamic2DPlotter Class
@@ -333,15 +352,24 @@ class Group(PlottableElement):
 
 class FRODO_Web_Interface:
     server: SyncWebsocketServer
+    scene_sync: SceneSync
     html_file_path: str = "./frodo_web_gui_new.html"
     _thread: threading.Thread
     _exit: bool = False
     videos: dict
 
-    def __init__(self):
+    def __init__(self, max_rate: float = 20):
+        """
+        :param max_rate: Maximum update rate of the browsers in Hz. Browsers can ask for a lower rate with a
+            {"type": "set_rate", "rate": ...} message
+        """
         self.server = SyncWebsocketServer(host="localhost", port=8000)
         self.default_group = Group(id="default")
         self.videos = {}
+        self.scene_sync = SceneSync(max_rate=max_rate)
+        self.server.callbacks.new_client.register(self._on_new_client)
+        self.server.callbacks.client_left.register(self._on_client_left)
+        self.server.callbacks.message.register(self._on_message)
         self._thread = threading.Thread(target=self._task, daemon=True)
         register_exit_callback(self.close)
 
@@ -391,11 +419,30 @@ class FRODO_Web_Interface:
         return {"groups": {self.default_group.id: self.default_group.to_dict()},
                 "videos": {k: asdict_no_parent(v) for k, v in self.videos.items()}}
 
+    def get_scene_entries(self) -> list[SceneEntry]:
+        entries = self.default_group.scene_entries()
+        entries.extend(SceneEntry((), "videos", k, v, asdict_no_parent) for k, v in self.videos.items())
+        return entries
+
+    def _on_new_client(self, client):
+        self.scene_sync.add_client(client['id'], client)
+
+    def _on_client_left(self, client):
+        self.scene_sync.remove_client(client['id'])
+
+    def _on_message(self, client, message):
+        if not isinstance(message, dict):
+            return
+        if message.get('type') == 'set_rate':
+            self.scene_sync.set_client_rate(client['id'], float(message['rate']))
+        elif message.get('type') == 'request_snapshot':
+            self.scene_sync.request_snapshot(client['id'])
+
     def _task(self):
+        # Each browser gets a snapshot when it connects and afterwards only the changes, at most with its update rate
         while not self._exit:
-            data: dict = self.get_data()
-            self.server.send(data)
-            time.sleep(0.05)
+            self.scene_sync.update(self.get_scene_entries(), self.get_data, self.server.send_to)
+            time.sleep(1 / self.scene_sync.max_rate)
 
     def _open_plotter_html(self) -> bool:
         current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -0,0 +1,135 @@
+"""
+Throughput of the TCP framing (TCP_Base_Protocol.encode and the rx buffer of TCP_Socket) compared to the previous
+list-based encoding and the slicing rx buffer. The new encoding also computes the CRC8 of the payload.
+
+Run from the RobotManager directory:
+    python -m core.communication.wifi.tcp.protocols.examples.benchmark_tcp_framing
+"""
+import os
+import time
+
+import cobs.cobs as cobs
+
+from core.communication.wifi.tcp.protocols.tcp_base_protocol import TCP_Base_Message, TCP_Base_Protocol
+from core.utils.network.network import ipv4_to_bytes
+
+MESSAGE_SIZES = [100, 1_000, 10_000, 100_000]
+STREAM_SIZE = 4_000_000
+RECV_SIZE = 8192
+DELIMITER = b'\x00'
+
+
+# ======================================================================================================================
+# Framing before the bytearray rewrite, kept here as the reference
+def legacy_encode(msg: TCP_Base_Message):
+    cls = TCP_Base_Protocol
+    buffer = [0] * (len(msg.data) + cls.protocol_overhead)
+    buffer[0] = cls.header_0
+    buffer[1] = cls.header_1
+    buffer[cls.idx_src] = ipv4_to_bytes(msg.source)
+    buffer[cls.idx_add] = ipv4_to_bytes(msg.address)
+    buffer[cls.idx_protocol] = msg.data_protocol_id
+    buffer[cls.idx_len] = len(msg.data).to_bytes(length=4, byteorder="little")
+    buffer[cls.idx_payload: cls.idx_payload + len(msg.data)] = msg.data
+    buffer[cls.offset_crc + len(msg.data)] = 0x00
+    buffer[cls.offset_footer + len(msg.data)] = cls.footer
+    return bytes(buffer)
+
+
+class LegacyReceiver:
+    def __init__(self):
+        self.rx_buffer = b''
+        self.packets = 0
+
+    def process(self, data):
+        self.rx_buffer += data
+        while True:
+            index = self.rx_buffer.find(DELIMITER)
+            if index == -1:
+                break
+            packet = self.rx_buffer[:index]
+            self.rx_buffer = self.rx_buffer[index + len(DELIMITER):]
+            packet = cobs.decode(packet)
+            TCP_Base_Protocol.decode(packet)
+            self.packets += 1
+
+
+# ======================================================================================================================
+# Same steps as TCP_Socket._processRxData
+class Receiver:
+    def __init__(self):
+        self.rx_buffer = bytearray()
+        self.rx_offset = 0
+        self.rx_search = 0
+        self.packets = 0
+
+    def process(self, data):
+        self.rx_buffer += data
+        while True:
+            index = self.rx_buffer.find(DELIMITER, self.rx_search)
+            if index == -1:
+                self.rx_search = max(self.rx_offset, len(self.rx_buffer) - len(DELIMITER) + 1)
+                break
+            packet = self.rx_buffer[self.rx_offset:index]
+            self.rx_offset = self.rx_search = index + len(DELIMITER)
+            packet = cobs.decode(packet)
+            TCP_Base_Protocol.decode(packet)
+            self.packets += 1
+
+        if self.rx_offset > 0:
+            del self.rx_buffer[:self.rx_offset]
+            self.rx_search -= self.rx_offset
+            self.rx_offset = 0
+
+
+# ======================================================================================================================
+def make_message(size: int) -> TCP_Base_Message:
+    msg = TCP_Base_Message()
+    msg.source = '192.168.0.2'
+    msg.address = '192.168.0.1'
+    msg.data_protocol_id = 2
+    msg.data = os.urandom(size)
+    return msg
+
+
+def benchmark_encode(encode, msg, num_messages):
+    start = time.perf_counter()
+    for _ in range(num_messages):
+        encode(msg)
+    return time.perf_counter() - start
+
+
+def benchmark_rx(receiver, stream, num_messages):
+    start = time.perf_counter()
+    for i in range(0, len(stream), RECV_SIZE):
+        receiver.process(stream[i:i + RECV_SIZE])
+    duration = time.perf_counter() - start
+    assert receiver.packets == num_messages
+    return duration
+
+
+def main():
+    print(f"{'size':>10} | {'path':>6} | {'legacy MB/s':>12} | {'new MB/s':>12} | {'speedup':>8}")
+    for size in MESSAGE_SIZES:
+        msg = make_message(size)
+        num_messages = max(STREAM_SIZE // size, 10)
+        total_mb = num_messages * size / 1e6
+
+        t_legacy = benchmark_encode(legacy_encode, msg, num_messages)
+        t_new = benchmark_encode(TCP_Base_Protocol.encode, msg, num_messages)
+        print(f"{size:>10} | {'encode':>6} | {total_mb / t_legacy:>12.1f} | {total_mb / t_new:>12.1f} | "
+              f"{t_legacy / t_new:>7.2f}x")
+
+        # Several messages back to back, received in chunks of RECV_SIZE like from the socket. Both receivers decode
+        # the frames with the current TCP_Base_Protocol, so the difference is the buffer handling
+        frame = cobs.encode(TCP_Base_Protocol.encode(msg)) + DELIMITER
+        stream = frame * num_messages
+
+        t_legacy = benchmark_rx(LegacyReceiver(), stream, num_messages)
+        t_new = benchmark_rx(Receiver(), stream, num_messages)
+        print(f"{size:>10} | {'rx':>6} | {total_mb / t_legacy:>12.1f} | {total_mb / t_new:>12.1f} | "
+              f"{t_legacy / t_new:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+import dataclasses
+import enum
+import struct
+import time as t
+import typing
+
+import orjson
+
+from core.communication.protocol import Protocol, Message
+from .tcp_base_protocol import TCP_Base_Protocol
+
+
+# ======================================================================================================================
+class TCP_Stream_Schema:
+    """
+    Field layout of the samples of a binary stream.
+
+    The schema is generated from the first sample and exchanged via the JSON protocol before any binary stream
+    messages are sent. Each leaf of the (nested) sample dict becomes a field with one of the following types. If a
+    sample type (a dataclass describing the sample) is given, the types are taken from its annotations, so that e.g. a
+    float field that holds 0 in the first sample is not sent as int. Fields that are not declared, or whose value does
+    not fit the declared type, get the type of their value:
+
+    |   CODE    |   TYPE                                |   ENCODING
+    |   d       |   float                               |   float64
+    |   q       |   int                                 |   int64
+    |   ?       |   bool                                |   uint8
+    |   s       |   str                                 |   uint16 length + UTF-8
+    |   j       |   anything else (lists, None, ...)    |   uint16 length + JSON
+
+    All fixed-size fields are packed little-endian in one block, followed by the variable-size fields.
+    """
+    id: int
+    fields: list
+
+    _struct: struct.Struct
+    _fixed_paths: list
+    _variable_paths: list
+    _dict_keys: list
+
+    # === INIT =========================================================================================================
+    def __init__(self, schema_id: int, fields: list):
+        """
+        :param schema_id: Identifier of the schema, sent with each stream message
+        :param fields: List of (name, code) tuples. Nested fields use '.' in the name
+        """
+        self.id = schema_id
+        self.fields = [(name, code) for name, code in fields]
+
+        self._fixed_paths = [name.split('.') for name, code in self.fields if code in 'dq?']
+        self._variable_paths = [(name.split('.'), code) for name, code in self.fields if code in 'sj']
+        self._struct = struct.Struct('<' + ''.join(code for name, code in self.fields if code in 'dq?'))
+
+        # Keys of the sample dict and of each nested dict, to detect samples with added or removed fields
+        dict_keys = {}
+        for name, code in self.fields:
+            path = name.split('.')
+            for depth in range(len(path)):
+                dict_keys.setdefault(tuple(path[:depth]), set()).add(path[depth])
+        self._dict_keys = [(list(path), keys) for path, keys in dict_keys.items()]
+
+    # === CLASS METHODS ================================================================================================
+    @classmethod
+    def fromSample(cls, sample: dict, schema_id: int, sample_type: type = None) -> 'TCP_Stream_Schema':
+        """
+        :param sample_type: Dataclass with the declared types of the sample fields. Nested dicts of the sample
+                            correspond to nested dataclasses
+        """
+        fields = []
+
+        def add_fields(value, prefix, value_type):
+            declared_types = cls._declaredTypes(value_type)
+            for key, sub_value in value.items():
+                name = f"{prefix}.{key}" if prefix else key
+                declared_type = declared_types.get(key)
+                if isinstance(sub_value, dict) and len(sub_value) > 0:
+                    add_fields(sub_value, name, declared_type)
+                else:
+                    code = cls._declaredTypeCode(declared_type, sub_value)
+                    fields.append((name, code if code is not None else cls._typeCode(sub_value)))
+
+        add_fields(sample, '', sample_type)
+        return cls(schema_id, fields)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def fromDict(cls, data: dict) -> 'TCP_Stream_Schema':
+        return cls(data['schema_id'], data['fields'])
+
+    # === METHODS ======================================================================================================
+    def toDict(self) -> dict:
+        return {
+            'schema_id': self.id,
+            'fields': [[name, code] for name, code in self.fields],
+        }
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @property
+    def size(self) -> int:
+        """
+        Size of the fixed-size part of a sample in bytes
+        """
+        return self._struct.size
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def encodeSample(self, sample: dict) -> bytes:
+        """
+        Packs a sample. Raises KeyError, TypeError or struct.error if the sample does not match the schema. Samples
+        with fields that are not in the schema do not match either, since these fields would be lost.
+        """
+        for path, keys in self._dict_keys:
+            value = sample
+            for key in path:
+                value = value[key]
+            if not isinstance(value, dict) or value.keys() != keys:
+                raise KeyError(f"Fields of {'.'.join(path) or 'the sample'} do not match the schema")
+
+        values = []
+        for path in self._fixed_paths:
+            value = sample
+            for key in path:
+                value = value[key]
+            values.append(value)
+
+        buffer = self._struct.pack(*values)
+
+        if not self._variable_paths:
+            return buffer
+
+        parts = [buffer]
+        for path, code in self._variable_paths:
+            value = sample
+            for key in path:
+                value = value[key]
+            if code == 's':
+                if not isinstance(value, str):
+                    raise TypeError(f"Field {'.'.join(path)} is not a string")
+                encoded = value.encode('utf-8')
+            else:
+                encoded = orjson.dumps(value)
+            parts.append(struct.pack('<H', len(encoded)))
+            parts.append(encoded)
+        return b''.join(parts)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def decodeSample(self, data, offset: int = 0) -> (dict, int):
+        """
+        Unpacks a sample starting at offset. Returns the nested sample dict and the offset after the sample.
+        """
+        sample = {}
+        values = self._struct.unpack_from(data, offset)
+        offset += self._struct.size
+
+        for path, value in zip(self._fixed_paths, values):
+            self._setValue(sample, path, value)
+
+        for path, code in self._variable_paths:
+            length, = struct.unpack_from('<H', data, offset)
+            offset += 2
+            encoded = bytes(data[offset:offset + length])
+            offset += length
+            if code == 's':
+                value = encoded.decode('utf-8')
+            else:
+                value = orjson.loads(encoded)
+            self._setValue(sample, path, value)
+
+        return sample, offset
+
+    # === PRIVATE METHODS ==============================================================================================
+    @staticmethod
+    def _setValue(sample: dict, path: list, value):
+        target = sample
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def _declaredTypes(sample_type) -> dict:
+        if sample_type is None or not dataclasses.is_dataclass(sample_type):
+            return {}
+        try:
+            return typing.get_type_hints(sample_type)
+        except (NameError, TypeError):
+            # Unresolvable forward references
+            return {field.name: field.type for field in dataclasses.fields(sample_type)}
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def _declaredTypeCode(declared_type, value) -> (str, None):
+        """
+        Type code of a declared field type, or None if the type is not declared, has no fixed code or does not fit the
+        value
+        """
+        if not isinstance(declared_type, type):
+            return None
+        if issubclass(declared_type, bool):
+            return '?' if isinstance(value, bool) else None
+        if issubclass(declared_type, int):
+            return 'q' if isinstance(value, int) and not isinstance(value, bool) else None
+        if issubclass(declared_type, float):
+            return 'd' if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+        if issubclass(declared_type, str):
+            return 's' if isinstance(value, str) else None
+        return None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def _typeCode(value) -> str:
+        # bool has to be checked before int, since bool is a subclass of int
+        if isinstance(value, bool):
+            return '?'
+        if isinstance(value, (int, enum.IntEnum)):
+            return 'q'
+        if isinstance(value, float):
+            return 'd'
+        if isinstance(value, str):
+            return 's'
+        return 'j'
+
+
+# ======================================================================================================================
+@dataclasses.dataclass
+class TCP_Stream_Message(Message):
+    schema: TCP_Stream_Schema = None
+    schema_id: int = 0
+    time: float = 0
+    samples: list = dataclasses.field(default_factory=list)
+
+    def __post_init__(self):
+        self.time = t.time()
+
+
+# ======================================================================================================================
+class TCP_Stream_Protocol(Protocol):
+    """
+    Compact binary encoding of stream messages. One message can hold several samples of the same schema.
+
+    |   BYTE    |   NAME            |   DESCRIPTION                 |   VALUE
+    |   0       |   SCHEMA[0]       |   Schema ID                   |
+    |   1       |   SCHEMA[1]       |   Schema ID                   |
+    |   2       |   NUM_SAMPLES     |   Number of samples           |
+    |   3-10    |   TIME            |   Time of the message         |   float64
+    |   11      |   SAMPLES         |   Packed samples              |
+    """
+    base = TCP_Base_Protocol
+    Message = TCP_Stream_Message
+    identifier = 0x03
+
+    header = struct.Struct('<HBd')
+    max_samples = 255
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def decode(cls, data: (bytes, bytearray), schemas: dict = None):
+        """
+        :param data: Payload of the base message
+        :param schemas: Known schemas by their id. If the schema of the message is not known, the samples are not
+                        decoded
+        """
+        msg = cls.Message()
+        msg.schema_id, num_samples, msg.time = cls.header.unpack_from(data, 0)
+
+        if schemas is None or msg.schema_id not in schemas:
+            return msg
+
+        msg.schema = schemas[msg.schema_id]
+        offset = cls.header.size
+        for _ in range(num_samples):
+            sample, offset = msg.schema.decodeSample(data, offset)
+            msg.samples.append(sample)
+        return msg
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def encode(cls, msg: TCP_Stream_Message, *args, **kwargs):
+        assert (msg.schema is not None)
+        assert (len(msg.samples) <= cls.max_samples)
+
+        parts = [cls.header.pack(msg.schema.id, len(msg.samples), msg.time)]
+        for sample in msg.samples:
+            # Samples can already be packed with the schema of the message
+            if isinstance(sample, (bytes, bytearray)):
+                parts.append(sample)
+            else:
+                parts.append(msg.schema.encodeSample(sample))
+        return b''.join(parts)
+
+    @classmethod
+    def check(cls, data):
+        return len(data) >= cls.header.size
+
+
+TCP_Stream_Message._protocol = TCP_Stream_Protocol  # Type: Ignore
@@ -1,3 +1,7 @@
+import collections
+import concurrent.futures
+import dataclasses
+import heapq
 import threading
 import queue
 import time
@@ -7,6 +11,7 @@ from core.communication.wifi.tcp.protocols.tcp_base_protocol import TCP_Base_Pro
 # from core.communication.wifi.tcp.protocols.tcp_handshake_protocol import TCP_Handshake_Protocol, \
 #     TCP_Handshake_Message
 from core.communication.wifi.tcp.protocols.tcp_json_protocol import TCP_JSON_Protocol, TCP_JSON_Message
+from core.communication.wifi.tcp.protocols.tcp_stream_protocol import TCP_Stream_Protocol, TCP_Stream_Schema
 from core.communication.protocol import Message
 from core.communication.wifi.tcp.tcp_socket import TCP_Socket
 from core.utils.callbacks import callback_definition, CallbackContainer
@@ -22,6 +27,17 @@ class TCPConnectionCallback:
     rx: CallbackContainer
 
 
+@dataclasses.dataclass
+class TCP_Connection_Stats:
+    queue_depth: int = 0  # Frames waiting for the rx worker
+    max_queue_depth: int = 0
+    decoded: int = 0  # Frames decoded by the rx worker or rx executor
+    decode_time: float = 0  # Decode time of the last batch of frames in s
+    total_decode_time: float = 0
+    dropped: int = 0  # Stream frames dropped because the rx queue was full
+    coalesced: int = 0  # Stream messages that were skipped because newer ones were already received
+
+
 ########################################################################################################################
 class TCP_Connection:
     rx_queue: queue.Queue
@@ -30,12 +46,28 @@ class TCP_Connection:
     callbacks: TCPConnectionCallback
     base_protocol = TCP_Base_Protocol
     protocol = TCP_JSON_Protocol
+    stream_protocol = TCP_Stream_Protocol
+
+    stream_schemas: dict[int, TCP_Stream_Schema]
 
     _events: dict[str, threading.Event]
     _thread: threading.Thread
     sent: int
     received: int
     error_packets: int
+    stats: TCP_Connection_Stats
+
+    # Frames waiting for the rx worker or rx executor as (sequence number, frame). Stream frames are kept separately, so
+    # the oldest one can be dropped without searching the queue. The sequence numbers restore the order of arrival
+    _rx_frames: collections.deque
+    _rx_stream_frames: collections.deque
+    _rx_sequence: int
+    _rx_condition: threading.Condition  # Protects the frame queues and signals new frames to the rx worker
+    _rx_stopped: bool
+    _rx_thread: threading.Thread
+    _rx_executor: concurrent.futures.Executor
+    _rx_scheduled: bool  # A drain of the rx frames is submitted to the rx executor
+    _rx_lock: threading.Lock
 
     # === INIT =========================================================================================================
     def __init__(self, client: TCP_Socket = None, config: dict = None):
@@ -44,13 +76,22 @@ class TCP_Connection:
         # Config for the TCP Device
         default_config = {
             'rx_queue': False,
+            # Decode received frames and call the callbacks in a separate worker thread instead of the socket thread
+            'rx_worker': True,
+            # Executor shared by several connections, used instead of the rx worker thread if rx_worker is False.
+            # The frames of one connection are still processed in order, by one task at a time
+            'rx_executor': None,
+            # Maximum number of frames waiting for the rx worker. If the queue is full, the oldest stream frame is
+            # dropped. Other frames (handshakes, stream schemas, events, responses, ...) are never dropped
+            'rx_worker_queue_size': 1000,
+            # If the rx worker falls behind, only deliver the newest stream message of all waiting frames
+            'coalesce_stream': False,
         }
         if config is None:
             config = {}
 
         self.config = {**default_config, **config}
 
-        self.client = client
         self.rx_queue = queue.Queue()
 
         self.callbacks = TCPConnectionCallback()
@@ -58,12 +99,28 @@ class TCP_Connection:
         self.sent = 0
         self.received = 0
         self.error_packets = 0
+        self.stats = TCP_Connection_Stats()
+
+        self.stream_schemas = {}
+        self._stream_source = None
 
         self.events = {
             'handshake': threading.Event(),
             'rx': threading.Event()
         }
 
+        self._rx_frames = collections.deque()
+        self._rx_stream_frames = collections.deque()
+        self._rx_sequence = 0
+        self._rx_condition = threading.Condition()
+        self._rx_stopped = False
+        self._rx_thread = None
+        self._rx_executor = self.config['rx_executor'] if not self.config['rx_worker'] else None
+        self._rx_scheduled = False
+        self._rx_lock = threading.Lock()
+
+        self.client = client
+
     # === PROPERTIES ===================================================================================================
     @property
     def client(self):
@@ -74,6 +131,9 @@ class TCP_Connection:
         self._client = client
         if client is not None:
             self.connected = True
+            if self.config['rx_worker'] and self._rx_thread is None:
+                self._rx_thread = threading.Thread(target=self._rxWorker, daemon=True)
+                self._rx_thread.start()
             self.client.callbacks.rx.register(self._clientRx_callback)
             self.client.callbacks.disconnected.register(self._clientDisconnect_callback)
 
@@ -136,11 +196,12 @@ class TCP_Connection:
             callback(self, message)
 
     # ------------------------------------------------------------------------------------------------------------------
-    def _processDataPacket(self, data):
+    def _processDataPacket(self, data) -> list[TCP_JSON_Message]:
         """
+        Decodes a received frame. Handshakes and stream schemas are processed directly.
 
-        :param data:
-        :return:
+        :param data: Frame received by the socket
+        :return: List of the messages to deliver to the callbacks
         """
 
         # Decode the data into a message
@@ -149,15 +210,19 @@ class TCP_Connection:
         if base_msg is None:
             # the received data package is not a valid TCP message
             self.error_packets += 1
-            return None
+            return []
 
         # The received message is valid
         self.received += 1
         self.last_contact = time.time()
 
+        # Binary stream messages are decoded into regular stream messages
+        if base_msg.data_protocol_id == self.stream_protocol.identifier:
+            return self._processStreamPacket(base_msg.data)
+
         # Check if the protocol ID uses a protocol known to the device
         if base_msg.data_protocol_id is not self.protocol.identifier:
-            return
+            return []
 
         # Decode the message
         message = self.protocol.decode(base_msg.data)  # Type: Ignore
@@ -165,11 +230,80 @@ class TCP_Connection:
         # Check if the message is a handshake event
         if message.type == 'event' and message.event == 'handshake':
             self._processIncomingHandshake(message)
-            return
+            return []
+
+        # Check if the message announces the schema of binary stream messages
+        if message.type == 'event' and message.event == 'stream_schema':
+            self._processStreamSchema(message)
+            return []
 
         # logger.debug(
         #     f" (TCP RX) Device: \"{self.name}\", Protocol: {base_msg.data_protocol_id}, data: {base_msg.data}")
 
+        return [message]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _processStreamSchema(self, message: TCP_JSON_Message):
+        """
+        Stores the schema of the binary stream messages of the device and acknowledges it, so that the device starts
+        sending binary stream messages.
+        """
+        try:
+            schema = TCP_Stream_Schema.fromDict(message.data)
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Received invalid stream schema from {self.name}")
+            return
+
+        self.stream_schemas[schema.id] = schema
+        self._stream_source = message.source
+
+        ack_message = TCP_JSON_Message()
+        ack_message.type = 'event'
+        ack_message.event = 'stream_schema_ack'
+        ack_message.address = ''
+        ack_message.source = ''
+        ack_message.data = {'schema_id': schema.id}
+        self.send(ack_message)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _processStreamPacket(self, data) -> list[TCP_JSON_Message]:
+        try:
+            stream_message = self.stream_protocol.decode(data, self.stream_schemas)
+        except Exception:
+            self.error_packets += 1
+            return []
+
+        if stream_message.schema is None:
+            logger.warning(f"Received stream message with unknown schema {stream_message.schema_id}")
+            self.error_packets += 1
+            return []
+
+        messages = []
+        for sample in stream_message.samples:
+            message = TCP_JSON_Message()
+            message.type = 'stream'
+            message.source = self._stream_source
+            message.address = 0
+            message.time = stream_message.time
+            message.data = sample
+            messages.append(message)
+        return messages
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _isStreamFrame(self, frame) -> bool:
+        """
+        Checks without decoding if a frame contains a stream message, either a binary stream message or a JSON message
+        of type 'stream'. The devices encode their JSON messages with orjson, which writes them without whitespace
+        """
+        if len(frame) <= self.base_protocol.idx_protocol:
+            return False
+        protocol_id = frame[self.base_protocol.idx_protocol]
+        if protocol_id == self.stream_protocol.identifier:
+            return True
+        return protocol_id == self.protocol.identifier and b'"type":"stream"' in frame
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _deliverMessage(self, message: TCP_JSON_Message):
         if self.config['rx_queue']:
             self.rx_queue.put_nowait(message)
 
@@ -181,20 +315,153 @@ class TCP_Connection:
     # ------------------------------------------------------------------------------------------------------------------
     def _clientRx_callback(self, *args, **kwargs):
         """
-        - callback called when the socket receives data
+        - callback called when the socket receives data. Hands the frames to the rx worker, so that decoding and the
+          callbacks do not block the socket
         :param args:
         :param kwargs:
         :return:
         """
-        # TODO: this is bad and blocks all other receiving things. This
-        #  should be in a separate thread
         while self.client.rx_queue.qsize() > 0:
             buffer = self.client.rx_queue.get_nowait()
-            self._processDataPacket(buffer)
+
+            if not self.config['rx_worker'] and self._rx_executor is None:
+                self._processFrames([buffer])
+                continue
+
+            self._queueFrame(buffer)
+
+        if self._rx_executor is not None:
+            self._scheduleRxDrain()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _queueFrame(self, frame):
+        """
+        Queues a frame for the rx worker or rx executor. If the queue is full, a stream frame makes room by dropping the
+        oldest queued stream frame, or is dropped itself if no stream frame is queued. All other frames are always queued
+        """
+        is_stream = self._isStreamFrame(frame)
+        with self._rx_condition:
+            if is_stream and self._queuedFrames() >= self.config['rx_worker_queue_size']:
+                self.stats.dropped += 1
+                if len(self._rx_stream_frames) == 0:
+                    return
+                self._rx_stream_frames.popleft()
+
+            self._rx_sequence += 1
+            (self._rx_stream_frames if is_stream else self._rx_frames).append((self._rx_sequence, frame))
+            depth = self._queuedFrames()
+            self.stats.queue_depth = depth
+            if depth > self.stats.max_queue_depth:
+                self.stats.max_queue_depth = depth
+            self._rx_condition.notify()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _queuedFrames(self) -> int:
+        return len(self._rx_frames) + len(self._rx_stream_frames)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _takeFrames(self) -> list:
+        """
+        Removes and returns all queued frames
+        """
+        with self._rx_condition:
+            return self._popFrames()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _popFrames(self) -> list:
+        """
+        Removes all queued frames and returns them in the order of arrival. Must be called with the rx condition held
+        """
+        frames = [frame for _, frame in heapq.merge(self._rx_frames, self._rx_stream_frames, key=lambda entry: entry[0])]
+        self._rx_frames.clear()
+        self._rx_stream_frames.clear()
+        self.stats.queue_depth = 0
+        return frames
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _scheduleRxDrain(self):
+        with self._rx_lock:
+            if self._rx_scheduled or self._queuedFrames() == 0:
+                return
+            self._rx_scheduled = True
+        try:
+            self._rx_executor.submit(self._rxDrain)
+        except RuntimeError:
+            # The executor is shut down
+            with self._rx_lock:
+                self._rx_scheduled = False
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _rxDrain(self):
+        """
+        Task of the rx executor. Processes the frames that are waiting and resubmits itself if new frames arrived in the
+        meantime, so that connections with a lot of traffic do not block the other connections of the executor
+        """
+        frames = self._takeFrames()
+
+        try:
+            self._processFrames(frames)
+        except Exception as e:
+            logger.error(f"Error processing received frames: {e}")
+        finally:
+            with self._rx_lock:
+                self._rx_scheduled = False
+            self._scheduleRxDrain()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _rxWorker(self):
+        while True:
+            # Take all frames that arrived since the last batch
+            with self._rx_condition:
+                while self._queuedFrames() == 0 and not self._rx_stopped:
+                    self._rx_condition.wait()
+                frames = self._popFrames()
+                stopped = self._rx_stopped
+
+            if len(frames) > 0:
+                self._processFrames(frames)
+            if stopped:
+                return
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _processFrames(self, frames: list):
+        start = time.perf_counter()
+        messages = []
+        for frame in frames:
+            messages.extend(self._processDataPacket(frame))
+        self.stats.decode_time = time.perf_counter() - start
+        self.stats.total_decode_time += self.stats.decode_time
+        self.stats.decoded += len(frames)
+
+        if self.config['coalesce_stream']:
+            messages = self._coalesceStreamMessages(messages)
+
+        for message in messages:
+            self._deliverMessage(message)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _coalesceStreamMessages(self, messages: list[TCP_JSON_Message]) -> list[TCP_JSON_Message]:
+        """
+        Keeps only the newest stream message, all other messages are kept in their order
+        """
+        stream_indexes = [i for i, message in enumerate(messages) if message.type == 'stream']
+        if len(stream_indexes) <= 1:
+            return messages
+
+        skipped = set(stream_indexes[:-1])
+        self.stats.coalesced += len(skipped)
+        return [message for i, message in enumerate(messages) if i not in skipped]
 
     # ------------------------------------------------------------------------------------------------------------------
     def _clientDisconnect_callback(self, client):
         self.connected = False
 
+        # Stop the rx worker after the remaining frames
+        if self._rx_thread is not None:
+            with self._rx_condition:
+                self._rx_stopped = True
+                self._rx_condition.notify()
+            self._rx_thread = None
+
         for callback in self.callbacks.disconnected:
             callback(self)
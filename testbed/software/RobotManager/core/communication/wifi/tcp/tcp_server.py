@@ -1,7 +1,9 @@
+import concurrent.futures
 import time
 
 import core.settings as settings
 from core.communication.wifi.tcp.tcp_socket import TCP_SocketsHandler, TCP_Socket
+from core.communication.wifi.tcp.tcp_socket_asyncio import AsyncTCP_SocketsHandler
 from core.communication.wifi.udp.protocols.udp_json_protocol import UDP_JSON_Message
 from core.communication.wifi.udp.udp import UDP, UDP_Broadcast
 import core.communication.addresses as addresses
@@ -29,17 +31,35 @@ class TCP_Server:
 
     callbacks: TCPServerCallbacks
     address: str
+    connection_config: dict
 
+    _rx_executor: concurrent.futures.ThreadPoolExecutor | None
     _unregistered_connections: list[TCP_Connection]
-    _tcp: TCP_SocketsHandler
+    _tcp: TCP_SocketsHandler | AsyncTCP_SocketsHandler
     _udp: UDP
 
     # === INIT =========================================================================================================
-    def __init__(self, address):
-
+    def __init__(self, address, connection_config: dict = None, backend: str = 'threads', rx_workers: int = 4):
+        """
+        :param address: Address of the server
+        :param connection_config: Config passed to every TCP_Connection, e.g. to enable stream coalescing
+        :param backend: 'threads' uses two threads per connection, 'asyncio' handles all connections in one event loop.
+            With 'asyncio', received messages are decoded and delivered by a thread pool shared by all connections
+            instead of an rx worker thread per connection
+        :param rx_workers: Number of threads of the shared thread pool of the 'asyncio' backend
+        """
+        assert backend in ['threads', 'asyncio']
         self.address = address
-
-        self._tcp = TCP_SocketsHandler(address=self.address)
+        self.connection_config = connection_config if connection_config is not None else {}
+
+        if backend == 'asyncio':
+            self._tcp = AsyncTCP_SocketsHandler(address=self.address)
+            self._rx_executor = concurrent.futures.ThreadPoolExecutor(max_workers=rx_workers,
+                                                                      thread_name_prefix='tcp_rx')
+            self.connection_config = {'rx_worker': False, 'rx_executor': self._rx_executor, **self.connection_config}
+        else:
+            self._tcp = TCP_SocketsHandler(address=self.address)
+            self._rx_executor = None
         self._udp = UDP(address=self.address, port=settings.UDP_PORT_ADDRESS_STREAM)
 
         self.connections = []
@@ -64,6 +84,8 @@ class TCP_Server:
     def close(self):
         self._tcp.close()
         self._udp.close()
+        if self._rx_executor is not None:
+            self._rx_executor.shutdown(wait=False)
         logger.info("TCP Server closed")
         time.sleep(0.01)
 
@@ -145,7 +167,7 @@ class TCP_Server:
     # ------------------------------------------------------------------------------------------------------------------
     def _deviceConnected_callback(self, socket: TCP_Socket, *args, **kwargs):
         # put the client into the list of unregistered tcp devices
-        unregistered_device = TCP_Connection(client=socket)
+        unregistered_device = TCP_Connection(client=socket, config=self.connection_config)
         self._unregistered_connections.append(unregistered_device)
         unregistered_device.callbacks.handshake.register(self._deviceHandshake_callback)
 
@@ -56,7 +56,9 @@ class TCP_Socket:
     _rxThread: threading.Thread
     _txThread: threading.Thread  # Thread handling the TX queue
     _faultyPackages: list
-    _rx_buffer: bytes  # Buffer for accumulating partial data
+    _rx_buffer: bytearray  # Buffer for accumulating partial data
+    _rx_offset: int  # Start of the first unprocessed packet in the buffer
+    _rx_search: int  # Position from which the buffer is searched for the next delimiter
     _last_faulty_cleanup: float
     _exit: bool  # Flag to signal shutdown
 
@@ -86,16 +88,12 @@ class TCP_Socket:
         self.rx_event = threading.Event()
 
         self._faultyPackages = []
-        self._rx_buffer = b''
+        self._rx_buffer = bytearray()
+        self._rx_offset = 0
+        self._rx_search = 0
         self._last_faulty_cleanup = time.time()
 
-        # Start the RX thread to handle incoming data.
-        self._rxThread = threading.Thread(target=self._rx_thread_fun, daemon=True)
-        self._rxThread.start()
-
-        # Start the TX thread to process outgoing messages from the tx_queue.
-        self._txThread = threading.Thread(target=self._tx_thread_fun, daemon=True)
-        self._txThread.start()
+        self._start()
 
     # -------------------------------------------------------------------------
     def send(self, data):
@@ -142,6 +140,19 @@ class TCP_Socket:
         """
         self.config = {**self.config, **config}
 
+    # -------------------------------------------------------------------------
+    def _start(self):
+        """
+        Start the RX and TX threads of the socket.
+        """
+        # Start the RX thread to handle incoming data.
+        self._rxThread = threading.Thread(target=self._rx_thread_fun, daemon=True)
+        self._rxThread.start()
+
+        # Start the TX thread to process outgoing messages from the tx_queue.
+        self._txThread = threading.Thread(target=self._tx_thread_fun, daemon=True)
+        self._txThread.start()
+
     # -------------------------------------------------------------------------
     def _rx_thread_fun(self):
         """
@@ -171,16 +182,22 @@ class TCP_Socket:
             # Process the received data, accumulating partial packets if needed.
             self._processRxData(data)
 
-            # Clean up old faulty packages approximately once per second.
-            now = time.time()
-            if int(now - self._last_faulty_cleanup) > 1:
-                self._faultyPackages = [
-                    p for p in self._faultyPackages if now < (p.timestamp + PACKAGE_TIMEOUT_TIME)
-                ]
-                if len(self._faultyPackages) > FAULTY_PACKAGES_MAX_NUMBER:
-                    logger.warning("Received %d faulty TCP packages in the last %d seconds",
-                                   FAULTY_PACKAGES_MAX_NUMBER, PACKAGE_TIMEOUT_TIME)
-                self._last_faulty_cleanup = now
+            self._cleanupFaultyPackages()
+
+    # -------------------------------------------------------------------------
+    def _cleanupFaultyPackages(self):
+        """
+        Clean up old faulty packages approximately once per second.
+        """
+        now = time.time()
+        if int(now - self._last_faulty_cleanup) > 1:
+            self._faultyPackages = [
+                p for p in self._faultyPackages if now < (p.timestamp + PACKAGE_TIMEOUT_TIME)
+            ]
+            if len(self._faultyPackages) > FAULTY_PACKAGES_MAX_NUMBER:
+                logger.warning("Received %d faulty TCP packages in the last %d seconds",
+                               FAULTY_PACKAGES_MAX_NUMBER, PACKAGE_TIMEOUT_TIME)
+            self._last_faulty_cleanup = now
 
     # -------------------------------------------------------------------------
     def _tx_thread_fun(self):
@@ -235,21 +252,26 @@ class TCP_Socket:
 
         If COBS encoding is enabled, the packet is decoded before being added
         to the receive queue.
+
+        Packets are extracted by moving a read offset through the buffer. The
+        processed part is removed once per call, and bytes that have already
+        been searched for the delimiter are not searched again.
         """
         # Append newly received data to the persistent buffer.
         self._rx_buffer += data
         delimiter = self.config.get('delimiter')
 
         while True:
-            index = self._rx_buffer.find(delimiter)
+            index = self._rx_buffer.find(delimiter, self._rx_search)
             if index == -1:
-                # No complete packet found yet; wait for more data.
+                # No complete packet found yet; wait for more data. The end
+                # of the buffer may hold the start of a delimiter.
+                self._rx_search = max(self._rx_offset, len(self._rx_buffer) - len(delimiter) + 1)
                 break
 
             # Extract one complete packet from the buffer.
-            packet = self._rx_buffer[:index]
-            # Remove the processed packet and delimiter from the buffer.
-            self._rx_buffer = self._rx_buffer[index + len(delimiter):]
+            packet = self._rx_buffer[self._rx_offset:index]
+            self._rx_offset = self._rx_search = index + len(delimiter)
 
             # If COBS encoding is enabled, attempt to decode the packet.
             if self.config.get('cobs', False):
@@ -259,9 +281,17 @@ class TCP_Socket:
                     # If decoding fails, log a faulty package and skip this packet.
                     self._faultyPackages.append(FaultyPackage(timestamp=time.time()))
                     continue
+            else:
+                packet = bytes(packet)
 
             self.rx_queue.put(packet)
 
+        # Remove the processed packets from the buffer.
+        if self._rx_offset > 0:
+            del self._rx_buffer[:self._rx_offset]
+            self._rx_search -= self._rx_offset
+            self._rx_offset = 0
+
         # Signal and invoke receive callbacks if any packets have been queued.
         if not self.rx_queue.empty():
             self.rx_event.set()
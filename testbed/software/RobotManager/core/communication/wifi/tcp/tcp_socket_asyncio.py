@@ -0,0 +1,290 @@
+"""
+Asyncio backend for the TCP sockets.
+
+All connections are handled by one asyncio event loop running in a single background thread, instead of an RX and a TX
+thread per connection. AsyncTCP_Socket and AsyncTCP_SocketsHandler have the same interface and callbacks as
+TCP_Socket and TCP_SocketsHandler, so TCP_Connection and TCP_Server work with both.
+
+Outgoing messages are coalesced: all messages that are queued until the event loop gets to the socket are written with
+a single write. The minimum TX delay is applied between these writes instead of after every message.
+
+The callbacks of the sockets and the handler are called from the event loop thread, so they must not block. TCP_Server
+creates its connections with a thread pool shared by all connections (the rx_executor of TCP_Connection), which decodes
+the received messages and calls their callbacks.
+"""
+import asyncio
+import threading
+import time
+
+from core.communication.wifi.tcp.tcp_socket import TCP_Socket, TCPSocketsHandlerCallbacks, DEFAULT_MIN_TX_DELAY, \
+    logger
+
+_event_loop: asyncio.AbstractEventLoop = None
+_event_loop_thread: threading.Thread = None
+_event_loop_lock = threading.Lock()
+
+
+def getEventLoop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the event loop shared by all asyncio sockets. The loop is started in a daemon thread on the first call.
+    """
+    global _event_loop, _event_loop_thread
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = asyncio.new_event_loop()
+            _event_loop_thread = threading.Thread(target=_event_loop.run_forever, name='tcp_asyncio', daemon=True)
+            _event_loop_thread.start()
+        return _event_loop
+
+
+class _TCP_Protocol(asyncio.Protocol):
+    """
+    Forwards the events of an asyncio transport to its AsyncTCP_Socket.
+    """
+    socket: 'AsyncTCP_Socket'
+
+    def __init__(self, handler: 'AsyncTCP_SocketsHandler'):
+        self.handler = handler
+        self.socket = None
+
+    def connection_made(self, transport):
+        self.socket = self.handler._acceptNewClient(transport)
+
+    def data_received(self, data):
+        self.socket._dataReceived(data)
+
+    def connection_lost(self, exc):
+        self.socket._connectionLost(exc)
+
+    def pause_writing(self):
+        self.socket._pauseWriting()
+
+    def resume_writing(self):
+        self.socket._resumeWriting()
+
+
+class AsyncTCP_Socket(TCP_Socket):
+    """
+    TCP socket on the shared asyncio event loop. Received data is framed like in TCP_Socket, outgoing messages are
+    collected and written together.
+    """
+    _connection: asyncio.Transport
+    _loop: asyncio.AbstractEventLoop
+    _tx_buffers: list  # Encoded messages waiting for the next write
+    _tx_lock: threading.Lock
+    _tx_scheduled: bool  # A write is scheduled on the event loop
+    _tx_paused: bool  # The transport buffer is full
+    _last_tx: float
+    _closed: bool
+
+    tx_messages: int  # Number of sent messages
+    tx_writes: int  # Number of writes to the transport, lower than tx_messages if messages were coalesced
+
+    def __init__(self, transport: asyncio.Transport, address, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        super().__init__(transport, address)
+
+    # -------------------------------------------------------------------------
+    def send(self, data):
+        """
+        Encode and queue data to be sent over the socket. Can be called from any thread.
+        """
+        data = self._prepareTxData(data)
+        with self._tx_lock:
+            if self._exit:
+                return
+            self._tx_buffers.append(data)
+            if self._tx_scheduled:
+                return
+            self._tx_scheduled = True
+        self._loop.call_soon_threadsafe(self._scheduleWrite)
+
+    # -------------------------------------------------------------------------
+    def close(self):
+        """
+        Close the connection. The disconnected callbacks are called from the event loop once the connection is closed.
+        """
+        self._exit = True
+        try:
+            self._loop.call_soon_threadsafe(self._connection.close)
+        except RuntimeError:
+            # The event loop is already closed
+            pass
+
+    # -------------------------------------------------------------------------
+    def _start(self):
+        """
+        No threads are needed, the transport is served by the event loop.
+        """
+        self._tx_buffers = []
+        self._tx_lock = threading.Lock()
+        self._tx_scheduled = False
+        self._tx_paused = False
+        self._last_tx = 0
+        self._closed = False
+        self.tx_messages = 0
+        self.tx_writes = 0
+
+    # -------------------------------------------------------------------------
+    def _scheduleWrite(self):
+        """
+        Writes the queued messages, but not earlier than min_tx_delay after the last write.
+        """
+        delay = self._last_tx + self.config.get('min_tx_delay', DEFAULT_MIN_TX_DELAY) - time.monotonic()
+        if delay > 0:
+            self._loop.call_later(delay, self._flush)
+        else:
+            self._flush()
+
+    # -------------------------------------------------------------------------
+    def _flush(self):
+        with self._tx_lock:
+            self._tx_scheduled = False
+            if self._tx_paused or self._closed:
+                # Written on resume_writing, or dropped
+                return
+            buffers = self._tx_buffers
+            self._tx_buffers = []
+
+        if len(buffers) == 0:
+            return
+
+        self._write(b''.join(buffers))
+        self.tx_messages += len(buffers)
+        self.tx_writes += 1
+        self._last_tx = time.monotonic()
+
+    # -------------------------------------------------------------------------
+    def _write(self, data):
+        """
+        Write data to the transport, which buffers it until the socket is writable.
+        """
+        try:
+            self._connection.write(data)
+        except Exception as e:
+            logger.warning("Error sending data: %s", e)
+            self.close()
+
+    # -------------------------------------------------------------------------
+    def _dataReceived(self, data):
+        self._processRxData(data)
+        self._cleanupFaultyPackages()
+
+    # -------------------------------------------------------------------------
+    def _pauseWriting(self):
+        with self._tx_lock:
+            self._tx_paused = True
+
+    # -------------------------------------------------------------------------
+    def _resumeWriting(self):
+        with self._tx_lock:
+            self._tx_paused = False
+            if self._tx_scheduled or len(self._tx_buffers) == 0:
+                return
+            self._tx_scheduled = True
+        self._scheduleWrite()
+
+    # -------------------------------------------------------------------------
+    def _connectionLost(self, exc):
+        if exc is not None:
+            logger.warning("Error in TCP connection: %s. Closing connection.", exc)
+
+        with self._tx_lock:
+            self._exit = True
+            self._closed = True
+            self._tx_buffers = []
+
+        logger.info("TCP socket %s closed", self.address)
+        for callback in self.callbacks.disconnected:
+            callback(self)
+
+
+class AsyncTCP_SocketsHandler:
+    """
+    Accepts client connections on the shared asyncio event loop and manages their AsyncTCP_Socket instances. Same
+    interface and callbacks as TCP_SocketsHandler.
+    """
+    address: str
+    port: int
+    sockets: list  # List of connected client AsyncTCP_Socket instances
+    config: dict
+    callbacks: TCPSocketsHandlerCallbacks
+    _server: asyncio.AbstractServer
+    _loop: asyncio.AbstractEventLoop
+
+    def __init__(self, address, hostname: bool = False, config: dict = None):
+        default_config = {
+            'max_clients': 100,
+            'port': 6666,
+        }
+        if config is None:
+            config = {}
+        self.config = {**default_config, **config}
+
+        self.sockets = []
+        self.address = address
+        self.port = self.config['port']
+        self.callbacks = TCPSocketsHandlerCallbacks()
+
+        self._server = None
+        self._loop = None
+
+    # -------------------------------------------------------------------------
+    def init(self):
+        pass
+
+    # -------------------------------------------------------------------------
+    def start(self):
+        """
+        Start listening for new client connections on the event loop. Errors while binding the address are raised
+        here instead of in a background thread.
+        """
+        self._loop = getEventLoop()
+        future = asyncio.run_coroutine_threadsafe(self._startServer(), self._loop)
+        try:
+            future.result()
+        except OSError as e:
+            raise Exception("Address already in use. Please wait until the address is released") from e
+
+        logger.info("Starting TCP host on %s:%d", self.address, self.port)
+
+    # -------------------------------------------------------------------------
+    def close(self):
+        """
+        Stop accepting new client connections.
+        """
+        logger.info("TCP host closed on %s:%d", self.address, self.port)
+        if self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._server = None
+
+    # -------------------------------------------------------------------------
+    def send(self):
+        pass
+
+    # -------------------------------------------------------------------------
+    async def _startServer(self):
+        self._server = await self._loop.create_server(lambda: _TCP_Protocol(self), host=self.address, port=self.port,
+                                                      reuse_address=True, backlog=self.config['max_clients'])
+        # The port is chosen by the OS if it is 0
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    # -------------------------------------------------------------------------
+    def _acceptNewClient(self, transport: asyncio.Transport) -> AsyncTCP_Socket:
+        """
+        Called from the event loop for every new connection. Creates the AsyncTCP_Socket for the transport.
+        """
+        client = AsyncTCP_Socket(transport, transport.get_extra_info('peername'), self._loop)
+        self.sockets.append(client)
+        logger.info("New client connected: %s", client.address)
+        client.callbacks.disconnected.register(self._clientClosed_callback)
+        for callback in self.callbacks.client_connected:
+            callback(client)
+        return client
+
+    # -------------------------------------------------------------------------
+    def _clientClosed_callback(self, client: AsyncTCP_Socket):
+        if client in self.sockets:
+            self.sockets.remove(client)
+        for cb in self.callbacks.client_disconnected:
+            cb(client)
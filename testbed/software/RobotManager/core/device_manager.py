@@ -4,6 +4,7 @@ import time
 from core.communication.wifi.tcp.protocols.tcp_json_protocol import TCP_JSON_Message
 from core.communication.wifi.tcp.tcp_server import TCP_Server
 from core.device import Device
+from core.stream_hub import StreamHub
 from core.utils.callbacks import callback_definition, CallbackContainer
 from core.utils.events import event_definition, ConditionEvent
 from core.utils.logging_utils import Logger
@@ -37,21 +38,28 @@ class DeviceManager:
     devices: dict[str, Device]
     callbacks: DeviceManagerCallbacks
     events: DeviceManagerEvents
+    stream_hub: StreamHub
 
     # === INIT =========================================================================================================
-    def __init__(self):
+    def __init__(self, tcp_backend: str = 'threads'):
+        """
+        :param tcp_backend: Backend of the TCP server, see TCP_Server
+        """
 
         self.devices = {}
         self.callbacks = DeviceManagerCallbacks()
         self.events = DeviceManagerEvents()
 
+        # Decodes the streams of all devices once and hands them to subscribers at their own rate
+        self.stream_hub = StreamHub()
+
         address = getValidHostIP()
         if address is None:
             logger.info("No valid IP available")
             exit()
 
         self.address = address
-        self.server = TCP_Server(address)
+        self.server = TCP_Server(address, backend=tcp_backend)
         self.server.callbacks.connected.register(self._newConnection_callback)
         self._unregistered_devices = []
 
@@ -91,6 +99,7 @@ class DeviceManager:
         self._sendSyncMessage(device)
         self.devices[device.information.device_id] = device
         self._unregistered_devices.remove(device)
+        self.stream_hub.addDevice(device)
 
         device.callbacks.stream.register(self._deviceStreamCallback)
         device.callbacks.event.register(self._deviceEventCallback)
@@ -102,11 +111,13 @@ class DeviceManager:
     def _deviceDisconnected_callback(self, device):
         logger.info(
             f'Device disconnected. Name: {device.information.device_name} ({device.information.device_class}/{device.information.device_type})')
+        self.stream_hub.removeDevice(device)
         for callback in self.callbacks.device_disconnected:
             callback(device=device)
 
     # ------------------------------------------------------------------------------------------------------------------
     def _deviceStreamCallback(self, stream, device, *args, **kwargs):
+        self.stream_hub.push(device, stream)
         for callback in self.callbacks.stream:
             callback(stream, device, *args, **kwargs)
 
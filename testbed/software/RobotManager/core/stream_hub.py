@@ -0,0 +1,296 @@
+"""
+Fan-out hub for the stream messages of all devices.
+
+Each stream message is decoded once per device type into a typed record (e.g. TWIPR_Data for BILBO) and stored as the
+latest sample of the device and in a bounded history ring. Subscribers choose how often they are called:
+
+- 'every': Every sample, for control consumers that need the full stream rate
+- 'decimate': Every n-th sample or at most `rate` samples per second, for GUI and logging consumers
+- 'poll': No callback, the subscriber fetches the newest sample with StreamSubscription.poll()
+
+The latest sample and the history are written by replacing references only, so readers never need a lock. The
+callbacks are called from the thread that received the stream message and must not block. Exceptions in a callback
+are logged and do not affect the other subscribers.
+"""
+import dataclasses
+import threading
+import time
+from typing import Any, Callable
+
+from core.communication.wifi.tcp.protocols.tcp_json_protocol import TCP_JSON_Message
+from core.device import Device
+from core.utils.logging_utils import Logger
+
+# === GLOBAL VARIABLES =================================================================================================
+logger = Logger('STREAMS')
+logger.setLevel('INFO')
+
+DEFAULT_HISTORY_SIZE = 500
+SUBSCRIPTION_MODES = ['every', 'decimate', 'poll']
+
+
+# ======================================================================================================================
+@dataclasses.dataclass(slots=True)
+class StreamSample:
+    device_id: str
+    index: int  # Number of the sample since the device was added
+    time: float  # Time of reception (time.monotonic())
+    data: Any  # Decoded record, or the raw dict if no decoder is registered for the device type
+    message: TCP_JSON_Message
+
+
+# ======================================================================================================================
+class DeviceStream:
+    """
+    Latest sample and history ring of one device.
+    """
+    device: Device
+    decoder: Callable[[dict], Any]
+    latest: (StreamSample, None)
+    samples: int
+    history_size: int
+
+    _history: list
+    _history_index: int
+
+    def __init__(self, device: Device, decoder: Callable[[dict], Any] = None, history_size: int = DEFAULT_HISTORY_SIZE):
+        self.device = device
+        self.decoder = decoder
+        self.latest = None
+        self.samples = 0
+        self.history_size = history_size
+
+        self._history = [None] * history_size
+        self._history_index = 0
+
+    # === PROPERTIES ===================================================================================================
+    @property
+    def device_id(self):
+        return self.device.information.device_id
+
+    # === METHODS ======================================================================================================
+    def push(self, message: TCP_JSON_Message) -> (StreamSample, None):
+        """
+        Decodes a stream message and stores it as the latest sample
+
+        :return: The new sample or None if the message could not be decoded
+        """
+        if self.decoder is not None:
+            try:
+                data = self.decoder(message.data)
+            except Exception as e:
+                logger.warning(f"Could not decode stream of {self.device_id}: {e}")
+                return None
+        else:
+            data = message.data
+
+        sample = StreamSample(device_id=self.device_id, index=self.samples, time=time.monotonic(), data=data,
+                              message=message)
+
+        self._history[self._history_index] = sample
+        self._history_index = (self._history_index + 1) % self.history_size
+        self.samples += 1
+        self.latest = sample
+        return sample
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def getHistory(self, num_samples: int = None) -> list[StreamSample]:
+        """
+        Returns the stored samples, oldest first
+
+        :param num_samples: Only return the newest num_samples samples
+        """
+        index = self._history_index
+        history = [sample for sample in self._history[index:] + self._history[:index] if sample is not None]
+        if num_samples is not None:
+            history = history[-num_samples:] if num_samples > 0 else []
+        return history
+
+
+# ======================================================================================================================
+class StreamSubscription:
+    """
+    Subscription to the samples of one device or of all devices (device_id=None).
+    """
+    callback: (Callable, None)
+    device_id: (str, None)
+    mode: str
+    decimation: int
+    rate: (float, None)
+
+    _counters: dict[str, int]
+    _last_delivery: dict[str, float]
+    _last_polled: dict[str, int]
+
+    def __init__(self, hub: 'StreamHub', callback: Callable = None, device_id: str = None, mode: str = 'every',
+                 decimation: int = 1, rate: float = None):
+        assert mode in SUBSCRIPTION_MODES, f"Unknown subscription mode {mode}"
+        assert mode == 'poll' or callback is not None, f"Subscriptions with mode {mode} need a callback"
+        assert decimation >= 1
+        assert rate is None or rate > 0
+
+        self.hub = hub
+        self.callback = callback
+        self.device_id = device_id
+        self.mode = mode
+        self.decimation = decimation
+        self.rate = rate
+
+        self._counters = {}
+        self._last_delivery = {}
+        self._last_polled = {}
+
+    # === METHODS ======================================================================================================
+    def poll(self) -> (StreamSample, dict[str, StreamSample], None):
+        """
+        Returns the newest sample if it has not been returned by a previous poll. Subscriptions to all devices return
+        a dict with the new samples by device ID
+        """
+        if self.device_id is not None:
+            return self._pollDevice(self.device_id)
+
+        samples = {}
+        for device_id in list(self.hub.streams.keys()):
+            sample = self._pollDevice(device_id)
+            if sample is not None:
+                samples[device_id] = sample
+        return samples
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def cancel(self):
+        self.hub.unsubscribe(self)
+
+    # === PRIVATE METHODS ==============================================================================================
+    def _pollDevice(self, device_id) -> (StreamSample, None):
+        sample = self.hub.getLatest(device_id)
+        if sample is None or self._last_polled.get(device_id) == sample.index:
+            return None
+        self._last_polled[device_id] = sample.index
+        return sample
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _deliver(self, sample: StreamSample, device: Device):
+        if self.mode == 'poll':
+            return
+
+        if self.mode == 'decimate':
+            if self.rate is not None:
+                last_delivery = self._last_delivery.get(sample.device_id)
+                if last_delivery is not None and sample.time - last_delivery < 1 / self.rate:
+                    return
+                self._last_delivery[sample.device_id] = sample.time
+            else:
+                counter = self._counters.get(sample.device_id, 0)
+                self._counters[sample.device_id] = counter + 1
+                if counter % self.decimation != 0:
+                    return
+
+        self.callback(sample, device)
+
+
+# ======================================================================================================================
+class StreamHub:
+    streams: dict[str, DeviceStream]
+    decoders: dict[str, Callable[[dict], Any]]
+    history_size: int
+
+    _subscriptions: tuple
+    _lock: threading.Lock
+
+    # === INIT =========================================================================================================
+    def __init__(self, history_size: int = DEFAULT_HISTORY_SIZE):
+        self.streams = {}
+        self.decoders = {}
+        self.history_size = history_size
+
+        # Replaced instead of modified, so push() can iterate over it without a lock
+        self._subscriptions = ()
+        self._lock = threading.Lock()
+
+    # === METHODS ======================================================================================================
+    def registerDecoder(self, device_type: str, decoder: Callable[[dict], Any]):
+        """
+        Sets the function that turns the stream data of devices of this type into a record. Applies to devices that
+        are added afterwards.
+        """
+        self.decoders[device_type] = decoder
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def addDevice(self, device: Device) -> DeviceStream:
+        stream = DeviceStream(device=device,
+                              decoder=self.decoders.get(device.information.device_type),
+                              history_size=self.history_size)
+        self.streams[device.information.device_id] = stream
+        return stream
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def removeDevice(self, device: Device):
+        """
+        Removes the stream of the device and all subscriptions to this device
+        """
+        device_id = device.information.device_id
+        stream = self.streams.get(device_id)
+        if stream is None or stream.device is not device:
+            return
+        self.streams.pop(device_id)
+
+        with self._lock:
+            self._subscriptions = tuple(subscription for subscription in self._subscriptions
+                                        if subscription.device_id != device_id)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def push(self, device: Device, message: TCP_JSON_Message) -> (StreamSample, None):
+        """
+        Decodes a stream message of a device and delivers it to the subscribers
+        """
+        stream = self.streams.get(device.information.device_id)
+        if stream is None:
+            stream = self.addDevice(device)
+
+        sample = stream.push(message)
+        if sample is None:
+            return None
+
+        for subscription in self._subscriptions:
+            if subscription.device_id is None or subscription.device_id == sample.device_id:
+                try:
+                    subscription._deliver(sample, device)
+                except Exception as e:
+                    logger.error(f"Error in stream subscriber {getattr(subscription.callback, '__qualname__', '')} "
+                                 f"for {sample.device_id}: {e}")
+        return sample
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def subscribe(self, callback: Callable = None, device_id: str = None, mode: str = 'every', decimation: int = 1,
+                  rate: float = None) -> StreamSubscription:
+        """
+        :param callback: Called with (sample, device). Not needed for mode 'poll'
+        :param device_id: Only receive the samples of this device. None for all devices
+        :param mode: 'every', 'decimate' or 'poll'
+        :param decimation: For mode 'decimate': Only deliver every n-th sample of each device
+        :param rate: For mode 'decimate': Deliver at most this many samples per second and device. Overrides decimation
+        """
+        subscription = StreamSubscription(self, callback=callback, device_id=device_id, mode=mode,
+                                          decimation=decimation, rate=rate)
+        with self._lock:
+            self._subscriptions = self._subscriptions + (subscription,)
+        return subscription
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def unsubscribe(self, subscription: StreamSubscription):
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def getLatest(self, device_id: str) -> (StreamSample, None):
+        stream = self.streams.get(device_id)
+        if stream is None:
+            return None
+        return stream.latest
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def getHistory(self, device_id: str, num_samples: int = None) -> list[StreamSample]:
+        stream = self.streams.get(device_id)
+        if stream is None:
+            return []
+        return stream.getHistory(num_samples)
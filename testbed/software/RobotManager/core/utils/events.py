@@ -507,37 +507,209 @@ class SharedResource:
         self.lock.release()
 
 
+# ======================================================================================================================
+class EventExecutor:
+    """
+    Bounded thread pool that executes the listener callbacks of all ConditionEvents.
+
+    Workers are started on demand up to max_workers. If more than queue_size callbacks are pending, the drop_policy
+    decides what happens:
+        - 'block' (default): set() blocks until there is space. If set() is called from a listener callback, the new
+                   callback is executed directly instead, since waiting for the pool from inside the pool could deadlock
+        - 'drop_oldest': the oldest pending callback is discarded
+        - 'drop_newest': the new callback is discarded
+    The drop policies have to be chosen explicitly, e.g. for an event with its own executor whose listeners only care
+    about the latest value. Discarded callbacks are counted in dropped.
+    """
+    drop_policies = ('drop_oldest', 'drop_newest', 'block')
+
+    def __init__(self, max_workers: int = 8, queue_size: int = 1000, drop_policy: str = 'block'):
+        assert (drop_policy in self.drop_policies)
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.dropped = 0
+
+        self._queue = collections.deque()
+        self._lock = Lock()
+        self._not_empty = Condition(self._lock)
+        self._not_full = Condition(self._lock)
+        self._workers = []
+        self._idle_workers = 0
+        self._local = threading.local()
+
+    def submit(self, function, *args) -> bool:
+        """
+        Queue a function to be executed by one of the workers.
+
+        :return: False if the function was dropped, True otherwise.
+        """
+        with self._lock:
+            run_inline = False
+            while len(self._queue) >= self.queue_size and not run_inline:
+                if self.drop_policy == 'drop_newest':
+                    self.dropped += 1
+                    return False
+                elif self.drop_policy == 'drop_oldest':
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif getattr(self._local, 'is_worker', False):
+                    run_inline = True
+                else:
+                    self._not_full.wait()
+
+            if not run_inline:
+                self._queue.append((function, args))
+                # Idle workers that were notified but have not taken a job yet are still counted as idle, so compare
+                # with the queue length instead of waiting for the idle count to reach 0
+                if len(self._queue) > self._idle_workers and len(self._workers) < self.max_workers:
+                    worker = threading.Thread(target=self._worker, daemon=True)
+                    self._workers.append(worker)
+                    worker.start()
+                self._not_empty.notify()
+                return True
+
+        self._run(function, args)
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    def _worker(self):
+        self._local.is_worker = True
+        while True:
+            with self._lock:
+                self._idle_workers += 1
+                while not self._queue:
+                    self._not_empty.wait()
+                self._idle_workers -= 1
+                function, args = self._queue.popleft()
+                self._not_full.notify()
+            self._run(function, args)
+
+    @staticmethod
+    def _run(function, args):
+        try:
+            function(*args)
+        except Exception as e:
+            print("Error in event executor:", e)
+
+
+# Shared executor for the listeners of all events. It never drops callbacks, its max_workers, queue_size and drop_policy
+# can be changed at runtime
+event_executor = EventExecutor()
+
+
+# ======================================================================================================================
+class _Listener:
+    """
+    Listener registered with ConditionEvent.on(). Ordered listeners queue their calls and are executed by at most one
+    worker at a time, so they receive the events in the order they were set.
+    """
+
+    def __init__(self, callback_ref, flags, once, input_resource, ordered):
+        self.callback_ref = callback_ref
+        self.flags = flags
+        self.once = once
+        self.input_resource = input_resource
+        self.ordered = ordered
+        self._pending = collections.deque()
+        self._lock = Lock()
+        self._not_full = Condition(self._lock)
+        self._running = False
+
+    def getCallback(self):
+        # Always resolve weak references to get the actual callback.
+        if isinstance(self.callback_ref, weakref.WeakMethod):
+            return self.callback_ref()
+        return self.callback_ref
+
+    def schedule(self, executor: EventExecutor, resource):
+        if not self.ordered:
+            callback = self.getCallback()
+            if callback is not None:
+                executor.submit(self._call, callback, resource)
+            return
+
+        with self._lock:
+            while len(self._pending) >= executor.queue_size:
+                if executor.drop_policy == 'drop_newest':
+                    executor.dropped += 1
+                    return
+                elif executor.drop_policy == 'drop_oldest':
+                    self._pending.popleft()
+                    executor.dropped += 1
+                elif getattr(executor._local, 'is_worker', False):
+                    # Waiting inside the pool could deadlock, the queue grows beyond its size instead
+                    break
+                else:
+                    self._not_full.wait()
+            self._pending.append(resource)
+            if self._running:
+                return
+            self._running = True
+        executor.submit(self._drain)
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._running = False
+                    return
+                resource = self._pending.popleft()
+                self._not_full.notify()
+            callback = self.getCallback()
+            if callback is not None:
+                self._call(callback, resource)
+
+    def _call(self, callback, resource):
+        try:
+            if self.input_resource:
+                callback(resource)
+            else:
+                callback()
+        except Exception as e:
+            print("Error in listener callback:", e)
+
+
+# ======================================================================================================================
 class ConditionEvent(threading.Condition):
     id: str
     resource: 'SharedResource'
     flag: any
     _parameters_def: list
 
-    def __init__(self, flags=None, history_size=10, id=None):
+    def __init__(self, flags=None, history_size=10, id=None, executor: EventExecutor = None):
         """
         :param flags: Optional list of tuples, e.g. [('param1', str), ('param2', type)]
                       which defines the allowed parameters for the event.
         :param history_size: The maximum number of historical events to store.
         :param id: Optional identifier for the event. If not provided explicitly, the event_handler
                    decorator will set the id to the attribute name.
+        :param executor: Optional executor for the listener callbacks. Defaults to the shared event_executor.
         """
         super().__init__()
         self.id = id
         self.resource = SharedResource()
         self.flag = None
+        self.executor = executor
         self._parameters_def = flags if flags is not None else []
         self._last_set_time = None
-        # List of listeners. Each listener is a tuple: (callback_ref, flags, once, input_resource)
+        # List of _Listener objects registered with on()
         self._listeners = []
+        # Waiters of waitForEvents that are notified on every set
+        self._event_waiters = []
         # Deque to store history events as tuples: (timestamp, flags)
         self._event_history = collections.deque(maxlen=history_size)
 
-    def on(self, callback, flags=None, once=False, input_resource=True):
+    def on(self, callback, flags=None, once=False, input_resource=True, ordered=False):
         """
         Register a callback to be called once the event is set and the flags match.
-        The callback will be executed in a separate oneshot thread.
-        If input_resource is True, the callback will be called with the event's resource data;
-        otherwise, it will be called without any arguments.
+        The callback will be executed by the worker threads of the event executor.
+        If input_resource is True, the callback will be called with the event's resource data at the time of the
+        set; otherwise, it will be called without any arguments.
+        If ordered is True, the calls of this callback are executed one after another in the order of the sets.
         """
         try:
             if hasattr(callback, '__self__') and callback.__self__ is not None:
@@ -548,7 +720,7 @@ class ConditionEvent(threading.Condition):
             callback_ref = callback
 
         with self:
-            self._listeners.append((callback_ref, flags, once, input_resource))
+            self._listeners.append(_Listener(callback_ref, flags, once, input_resource, ordered))
 
     def set(self, resource=None, flags=None):
         """
@@ -582,37 +754,24 @@ class ConditionEvent(threading.Condition):
             self._event_history.append((timestamp, self.flag))
             self.notify_all()
 
+            for waiter in self._event_waiters:
+                waiter.eventSet(self)
+
             # Process listeners.
             to_call = []
             remaining_listeners = []
-            for callback_ref, listener_flags, once_flag, input_resource in self._listeners:
-                if self._check_flag(listener_flags):
-                    to_call.append((callback_ref, input_resource))
-                    if not once_flag:
-                        remaining_listeners.append((callback_ref, listener_flags, once_flag, input_resource))
+            for listener in self._listeners:
+                if self._check_flag(listener.flags):
+                    to_call.append(listener)
+                    if not listener.once:
+                        remaining_listeners.append(listener)
                 else:
-                    remaining_listeners.append((callback_ref, listener_flags, once_flag, input_resource))
+                    remaining_listeners.append(listener)
             self._listeners = remaining_listeners
 
-        for callback_ref, input_resource in to_call:
-            # Always resolve weak references to get the actual callback.
-            if isinstance(callback_ref, weakref.WeakMethod):
-                callback_func = callback_ref()
-            else:
-                callback_func = callback_ref
-            if callback_func is None:
-                continue
-            threading.Thread(target=self._call_listener, args=(callback_func, input_resource)).start()
-
-    def _call_listener(self, callback, input_resource):
-        try:
-            if input_resource:
-                data = self.get_data()
-                callback(data)
-            else:
-                callback()
-        except Exception as e:
-            print("Error in listener callback:", e)
+        executor = self.executor if self.executor is not None else event_executor
+        for listener in to_call:
+            listener.schedule(executor, resource)
 
     def _check_flag(self, filter_params):
         if not filter_params:
@@ -751,6 +910,26 @@ class ConditionEvent(threading.Condition):
             self.resource.set(None)
 
 
+class _EventWaiter:
+    """
+    Waits for several events on a single condition. The events notify the waiter in set() with their lock held, so
+    the flags of the event are the ones of this set.
+    """
+
+    def __init__(self, events: list):
+        self.events = events
+        self.condition = Condition()
+        # Indexes of the triggered events in the order they were triggered
+        self.triggered = []
+
+    def eventSet(self, event: 'ConditionEvent'):
+        with self.condition:
+            for i, (ev, flags) in enumerate(self.events):
+                if ev is event and i not in self.triggered and event._check_flag(flags):
+                    self.triggered.append(i)
+            self.condition.notify_all()
+
+
 def waitForEvents(events: list, timeout=None, wait_for_all=False):
     """
     Wait for one or more events with corresponding flag conditions.
@@ -764,49 +943,39 @@ def waitForEvents(events: list, timeout=None, wait_for_all=False):
              If wait_for_all is True, returns a list of events in the same order as provided.
              Returns None if the timeout expires.
     """
-    results = []
-    lock = threading.Lock()
-    done_event = threading.Event()
-    threads = []
-    start_time = time.time()
-
     for i, value in enumerate(events):
         if isinstance(value, ConditionEvent):
             events[i] = (value, None)
 
-    def worker(ev, flags, overall_timeout):
-        remaining = overall_timeout - (time.time() - start_time) if overall_timeout is not None else None
-        if remaining is not None and remaining <= 0:
-            return
-        ret = ev.wait(timeout=remaining, flags=flags)
-        if ret:
-            with lock:
-                results.append(ev)
-            if not wait_for_all:
-                done_event.set()
-
-    # Start a thread for each event.
-    for ev, flags in events:
-        t = threading.Thread(target=worker, args=(ev, flags, timeout))
-        t.daemon = True
-        t.start()
-        threads.append(t)
+    # All events notify one waiter instead of waiting for each event in its own thread
+    waiter = _EventWaiter(events)
+    for ev, _ in events:
+        with ev:
+            ev._event_waiters.append(waiter)
+
+    def finished():
+        if wait_for_all:
+            return len(waiter.triggered) == len(events)
+        return len(waiter.triggered) > 0
+
+    try:
+        with waiter.condition:
+            waiter.condition.wait_for(finished, timeout=timeout)
+            triggered = list(waiter.triggered)
+    finally:
+        for ev, _ in events:
+            with ev:
+                if waiter in ev._event_waiters:
+                    ev._event_waiters.remove(waiter)
 
     if wait_for_all:
-        # Wait for all threads to finish, taking into account the overall timeout.
-        for t in threads:
-            remaining = timeout - (time.time() - start_time) if timeout is not None else None
-            t.join(timeout=remaining)
-        if len(results) == len(events):
-            return results
-        else:
-            return None
+        if len(triggered) == len(events):
+            return [ev for ev, _ in events]
+        return None
     else:
-        done_event.wait(timeout=timeout)
-        if results:
-            return results[0]
-        else:
-            return None
+        if triggered:
+            return events[triggered[0]][0]
+        return None
 
 
 # ======================================================================================================================
@@ -4,6 +4,7 @@ import time
 import webbrowser
 
 from core.utils.exit import register_exit_callback
+from core.utils.orientation.plot_2d.dynamic.scene_sync import TrackedElement, SceneEntry, SceneSync
 from core.utils.websockets.websockets import SyncWebsocketServer
 
 from dataclasses import dataclass, field, asdict
@@ -16,7 +17,7 @@ from typing import Optional, List, Dict, Union, Any
 # -----------------------------------------------------------------------------
 
 @dataclass
-class Point:
+class Point(TrackedElement):
     id: str  # Unique identifier (and display label) for the point.
     x: float  # X-coordinate.
     y: float  # Y-coordinate.
@@ -27,7 +28,7 @@ class Point:
 
 
 @dataclass
-class Agent:
+class Agent(TrackedElement):
     id: str  # Unique identifier for the agent.
     position: List[float]  # (x, y) position.
     psi: float  # Heading (in radians).
@@ -45,7 +46,7 @@ class VisionAgent(Agent):
 
 
 @dataclass
-class Vector:
+class Vector(TrackedElement):
     id: str  # Unique identifier for the vector.
     origin: List[float]  # Starting point.
     vec: List[float]  # Displacement vector.
@@ -54,7 +55,7 @@ class Vector:
 
 
 @dataclass
-class CoordinateSystem:
+class CoordinateSystem(TrackedElement):
     id: str  # Unique identifier.
     origin: List[float]  # Origin.
     ex: List[float]  # X-axis unit vector.
@@ -64,7 +65,7 @@ class CoordinateSystem:
 
 
 @dataclass
-class Line:
+class Line(TrackedElement):
     id: str  # Unique identifier for the line.
     start: Union[str, List[float]]  # Either a coordinate pair or a string reference.
     end: Union[str, List[float]]  # Either a coordinate pair or a string reference.
@@ -74,7 +75,7 @@ class Line:
 
 
 @dataclass
-class Rectangle:
+class Rectangle(TrackedElement):
     id: str  # Unique identifier for the rectangle.
     mid: List[float]  # Center (midpoint).
     x: float  # Width.
@@ -84,7 +85,7 @@ class Rectangle:
 
 
 @dataclass
-class Circle:
+class Circle(TrackedElement):
     id: str  # Unique identifier for the circle.
     mid: List[float]  # Center.
     diameter: float  # Diameter.
@@ -92,12 +93,15 @@ class Circle:
     linecolor: Optional[List[float]] = None  # Optional outline color.
 
 
+ELEMENT_KINDS = ["points", "agents", "visionagents", "vectors", "coordinate_systems", "lines", "rectangles", "circles"]
+
+
 # -----------------------------------------------------------------------------
 # Group Container with add functions, helper methods, and a to_dict method.
 # -----------------------------------------------------------------------------
 
 @dataclass
-class Group:
+class Group(TrackedElement):
     id: str  # Unique identifier for the group.
     fullPath: str = ""  # Full hierarchical path; set automatically if not provided.
     points: Dict[str, Point] = field(default_factory=dict)
@@ -112,6 +116,10 @@ class Group:
     parent: Optional["Group"] = None
     name: str = ''  # Name for display purposes.
 
+    # Changes of the contents are found by the scene sync itself
+    _untracked_fields = ('parent', 'points', 'agents', 'visionagents', 'vectors', 'coordinate_systems', 'lines',
+                         'rectangles', 'circles', 'groups')
+
     def __post_init__(self):
         # If fullPath is not set, use the group's id.
         self.name = self.id
@@ -304,27 +312,38 @@ class Group:
         we assume it is relative to this group and prepend the absolute path.
         """
 
+        group_dict = self.header_dict()
+        for kind in ELEMENT_KINDS:
+            to_dict = self.line_to_dict if kind == "lines" else asdict
+            group_dict[kind] = {k: to_dict(v) for k, v in getattr(self, kind).items()}
+        group_dict["groups"] = {k: v.to_dict() for k, v in self.groups.items()}
+        return group_dict
+
+    def header_dict(self) -> dict:
+        return {"id": self.id, "name": self.name, "fullPath": self.fullPath}
+
+    def line_to_dict(self, line: Line) -> dict:
         def process_ref(ref):
             if isinstance(ref, str) and not (ref.startswith('/') or ref.startswith('../')):
                 return "/" + self.fullPath + "/" + ref
             return ref
 
-        group_dict = {
-            "id": self.id,
-            "name": self.name,
-            "fullPath": self.fullPath,
-            "points": {k: asdict(v) for k, v in self.points.items()},
-            "agents": {k: asdict(v) for k, v in self.agents.items()},
-            "visionagents": {k: asdict(v) for k, v in self.visionagents.items()},
-            "vectors": {k: asdict(v) for k, v in self.vectors.items()},
-            "coordinate_systems": {k: asdict(v) for k, v in self.coordinate_systems.items()},
-            "lines": {k: {**asdict(v), "start": process_ref(v.start), "end": process_ref(v.end)}
-                      for k, v in self.lines.items()},
-            "rectangles": {k: asdict(v) for k, v in self.rectangles.items()},
-            "circles": {k: asdict(v) for k, v in self.circles.items()},
-            "groups": {k: v.to_dict() for k, v in self.groups.items()},
-        }
-        return group_dict
+        return {**asdict(line), "start": process_ref(line.start), "end": process_ref(line.end)}
+
+    def scene_entries(self, path: tuple = ()) -> List[SceneEntry]:
+        """
+        Returns this group, its elements and all subgroups for the scene sync.
+        path contains the ids of the parent groups.
+        """
+        entries = [SceneEntry(path, "groups", self.id, self, Group.header_dict)]
+        group_path = path + (self.id,)
+        for kind in ELEMENT_KINDS:
+            to_dict = self.line_to_dict if kind == "lines" else asdict
+            for k, v in getattr(self, kind).items():
+                entries.append(SceneEntry(group_path, kind, k, v, to_dict))
+        for sub in self.groups.values():
+            entries.extend(sub.scene_entries(group_path))
+        return entries
 
 
 # -----------------------------------------------------------------------------
@@ -333,15 +352,25 @@ class Group:
 
 class Dynamic2DPlotter:
     server: SyncWebsocketServer
+    scene_sync: SceneSync
     html_file_path: str = "plotter_2d.html"
     _thread: threading.Thread
     _exit: bool = False
 
-    def __init__(self):
+    def __init__(self, max_rate: float = 20):
+        """
+        :param max_rate: Maximum update rate of the browsers in Hz. Browsers can ask for a lower rate
+            with a {"type": "set_rate", "rate": ...} message.
+        """
         # Initialize the WebSocket server.
         self.server = SyncWebsocketServer(host="localhost", port=8000)
         # Create a default group for non-group elements.
         self.default_group = Group(id="default", fullPath="default")
+        # Each browser gets a snapshot when it connects and afterwards only the changes.
+        self.scene_sync = SceneSync(max_rate=max_rate)
+        self.server.callbacks.new_client.register(self._on_new_client)
+        self.server.callbacks.client_left.register(self._on_client_left)
+        self.server.callbacks.message.register(self._on_message)
         # Start the background thread that will send updates.
         self._thread = threading.Thread(target=self._task, daemon=True)
         register_exit_callback(self.close)
@@ -408,11 +437,24 @@ class Dynamic2DPlotter:
         """
         return {"groups": {self.default_group.id: self.default_group.to_dict()}}
 
+    def _on_new_client(self, client):
+        self.scene_sync.add_client(client['id'], client)
+
+    def _on_client_left(self, client):
+        self.scene_sync.remove_client(client['id'])
+
+    def _on_message(self, client, message):
+        if not isinstance(message, dict):
+            return
+        if message.get('type') == 'set_rate':
+            self.scene_sync.set_client_rate(client['id'], float(message['rate']))
+        elif message.get('type') == 'request_snapshot':
+            self.scene_sync.request_snapshot(client['id'])
+
     def _task(self):
         while not self._exit:
-            data: dict = self.get_data()
-            self.server.send(data)
-            time.sleep(0.05)
+            self.scene_sync.update(self.default_group.scene_entries(), self.get_data, self.server.send_to)
+            time.sleep(1 / self.scene_sync.max_rate)
 
     def _open_plotter_html(self) -> bool:
         """
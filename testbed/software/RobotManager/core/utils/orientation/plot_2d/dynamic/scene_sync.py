@@ -0,0 +1,216 @@
+"""
+Change tracking and delta updates for the 2D scene plotters (Dynamic2DPlotter and FRODO_Web_Interface).
+
+Scene elements record a version number for every field that changes. Each client first receives a snapshot of the
+whole scene, afterwards only the fields that changed since its last update and the elements that have been removed:
+
+    {"type": "snapshot", "groups": {...}, ...}    Same content as get_data() of the plotter
+    {"type": "diff",
+     "updates": [[group_path, kind, id, fields], ...],
+     "removals": [[group_path, kind, id], ...]}
+
+group_path is the list of group ids from the top level down to the group that contains the element, kind is the name
+of the container in the group ("points", "agents", ..., "groups"). New elements are sent with all fields.
+"""
+import copy
+import dataclasses
+import itertools
+import threading
+import time
+from typing import Any, Callable
+
+_versions = itertools.count(1)
+
+
+def next_version() -> int:
+    return next(_versions)
+
+
+# ======================================================================================================================
+class TrackedElement:
+    """
+    Base class of the scene element dataclasses. Assigning a field records a new version for it. In-place changes of
+    list and dict fields (e.g. agent.position[0] = 1.0) are found by refresh(), which the plotters call before every
+    update.
+    """
+    _untracked_fields = ('parent',)
+
+    def __setattr__(self, name, value):
+        if not name.startswith('_') and name not in self._untracked_fields:
+            self._track_assignment(name, value)
+        object.__setattr__(self, name, value)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def mark_dirty(self, *names):
+        """
+        Marks fields as changed, all fields if no names are given
+        """
+        if not names:
+            names = [f.name for f in dataclasses.fields(self)
+                     if not f.name.startswith('_') and f.name not in self._untracked_fields]
+        for name in names:
+            self._record_change(name, getattr(self, name))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def refresh(self):
+        """
+        Records changes of list and dict fields that were modified in place
+        """
+        snapshots = self.__dict__.get('_container_snapshots')
+        if not snapshots:
+            return
+        for name, snapshot in list(snapshots.items()):
+            value = getattr(self, name)
+            if value != snapshot:
+                self._record_change(name, value)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def changed_fields(self, since_version: int) -> list[str]:
+        versions = self.__dict__.get('_field_versions', {})
+        return [name for name, version in versions.items() if version > since_version]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _track_assignment(self, name, value):
+        state = self.__dict__
+        if name in state:
+            try:
+                unchanged = bool(state[name] == value)
+            except (TypeError, ValueError):
+                # e.g. numpy arrays
+                unchanged = False
+            if unchanged:
+                return
+        self._record_change(name, value)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _record_change(self, name, value):
+        state = self.__dict__
+        if '_field_versions' not in state:
+            object.__setattr__(self, '_field_versions', {})
+            object.__setattr__(self, '_container_snapshots', {})
+
+        state['_field_versions'][name] = next_version()
+        if isinstance(value, (list, dict)):
+            state['_container_snapshots'][name] = copy.deepcopy(value)
+        else:
+            state['_container_snapshots'].pop(name, None)
+
+
+# ======================================================================================================================
+@dataclasses.dataclass
+class SceneEntry:
+    path: tuple  # Group ids from the top level to the group containing the element
+    kind: str  # Container of the element in its group
+    id: str
+    element: TrackedElement
+    serialize: Callable[[Any], dict]  # Converts the element into the dict that is sent to the browser
+
+    @property
+    def key(self) -> tuple:
+        return self.path, self.kind, self.id
+
+
+# ======================================================================================================================
+class _SceneClient:
+    def __init__(self, client: Any, rate: float):
+        self.client = client
+        self.rate = rate
+        self.version = 0  # Version of the scene the client has
+        self.known = set()  # Keys of the elements the client has
+        self.last_update = 0
+        self.needs_snapshot = True
+
+
+class SceneSync:
+    """
+    Keeps track of the scene state of each client and creates the snapshot and diff messages for it.
+    """
+    max_rate: float  # Maximum update rate of the clients in Hz
+
+    def __init__(self, max_rate: float = 20):
+        self.max_rate = max_rate
+        self._clients: dict[Any, _SceneClient] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def add_client(self, client_id, client: Any = None, rate: float = None):
+        """
+        :param client: Passed to the send function of update()
+        :param rate: Update rate of this client in Hz, at most max_rate
+        """
+        with self._lock:
+            self._clients[client_id] = _SceneClient(client, min(rate or self.max_rate, self.max_rate))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def remove_client(self, client_id):
+        with self._lock:
+            self._clients.pop(client_id, None)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def set_client_rate(self, client_id, rate: float):
+        with self._lock:
+            if client_id in self._clients and rate > 0:
+                self._clients[client_id].rate = min(rate, self.max_rate)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def request_snapshot(self, client_id=None):
+        with self._lock:
+            for key, client in self._clients.items():
+                if client_id is None or key == client_id:
+                    client.needs_snapshot = True
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def update(self, entries: list[SceneEntry], get_snapshot: Callable[[], dict], send: Callable[[Any, dict], None]):
+        """
+        Sends a snapshot or diff to every client whose next update is due
+
+        :param entries: All elements of the scene
+        :param get_snapshot: Returns the whole scene, only called if a client needs a snapshot
+        :param send: Called with (client, message)
+        """
+        now = time.monotonic()
+        with self._lock:
+            due = [client for client in self._clients.values() if now - client.last_update >= 1 / client.rate]
+        if not due:
+            return
+
+        for entry in entries:
+            entry.element.refresh()
+
+        # Changes after this version are sent with the next update
+        version = next_version()
+        keys = {entry.key for entry in entries}
+        snapshot = None
+        serialized = {}
+
+        for client in due:
+            if client.needs_snapshot:
+                if snapshot is None:
+                    snapshot = {'type': 'snapshot', **get_snapshot()}
+                message = snapshot
+            else:
+                updates = []
+                for entry in entries:
+                    if entry.key in client.known:
+                        fields = entry.element.changed_fields(client.version)
+                        if not fields:
+                            continue
+                    else:
+                        fields = None
+
+                    data = serialized.get(entry.key)
+                    if data is None:
+                        data = serialized[entry.key] = entry.serialize(entry.element)
+                    if fields is not None:
+                        data = {name: data[name] for name in fields if name in data}
+                    updates.append([list(entry.path), entry.kind, entry.id, data])
+
+                removals = [[list(path), kind, id] for path, kind, id in client.known - keys]
+                message = {'type': 'diff', 'updates': updates, 'removals': removals} if updates or removals else None
+
+            client.version = version
+            client.known = keys
+            client.last_update = now
+            client.needs_snapshot = False
+            if message is not None:
+                send(client.client, message)
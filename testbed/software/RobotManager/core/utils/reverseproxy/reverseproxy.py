@@ -1,13 +1,17 @@
 import asyncio
+import collections
 import os
 import json
 import signal
+import time
 from typing import Dict
 
 from aiohttp import (
     web,
     ClientSession,
+    ClientTimeout,
     ClientConnectionError,
+    TCPConnector,
     WSMsgType,
     WSCloseCode,
 )
@@ -25,6 +29,67 @@ ROUTES_FILE = os.path.join(os.path.dirname(__file__), "routes.json")
 DYNAMIC_HOSTNAME_TO_PORT: Dict[str, int] = {}
 HOSTS_LOCK = asyncio.Lock()
 
+# One pooled client session per backend port, kept open for all requests and WebSockets
+BACKEND_SESSIONS: Dict[int, ClientSession] = {}
+BACKEND_MAX_CONNECTIONS = 100
+BACKEND_CONNECT_TIMEOUT = 5
+# No total timeout, video feeds are endless responses
+BACKEND_TIMEOUT = ClientTimeout(total=None, sock_connect=BACKEND_CONNECT_TIMEOUT)
+
+# Bodies are forwarded in chunks of this size instead of being read into memory
+CHUNK_SIZE = 64 * 1024
+
+# Headers that only apply to a single connection and are not forwarded
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+    "transfer-encoding", "upgrade",
+}
+
+_save_task: asyncio.Task = None
+_routes_changed = False
+
+
+class ProxyMetrics:
+    """
+    Counters of the proxied traffic. Latency is the time until the response headers of the backend arrived.
+    """
+
+    def __init__(self, latency_window: int = 1000):
+        self.http_requests = 0
+        self.websocket_connections = 0
+        self.active_http = 0
+        self.active_websockets = 0
+        self.errors = 0
+        self.bytes_to_backend = 0
+        self.bytes_to_client = 0
+        self.latencies = collections.deque(maxlen=latency_window)
+
+    def to_dict(self) -> dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(q):
+            if not latencies:
+                return None
+            return latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000
+
+        return {
+            "http_requests": self.http_requests,
+            "websocket_connections": self.websocket_connections,
+            "active_http": self.active_http,
+            "active_websockets": self.active_websockets,
+            "errors": self.errors,
+            "bytes_to_backend": self.bytes_to_backend,
+            "bytes_to_client": self.bytes_to_client,
+            "latency_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": latencies[-1] * 1000 if latencies else None,
+            },
+        }
+
+
+METRICS = ProxyMetrics()
+
 
 def is_valid_hostname(hostname: str) -> bool:
     return bool(hostname and "." in hostname and " " not in hostname)
@@ -34,9 +99,33 @@ def is_valid_port(port: int) -> bool:
     return isinstance(port, int) and 1 <= port <= 65535
 
 
-async def get_port_for_host(hostname: str) -> int:
-    async with HOSTS_LOCK:
-        return DYNAMIC_HOSTNAME_TO_PORT.get(hostname) or STATIC_HOSTNAME_TO_PORT.get(hostname)
+def get_port_for_host(hostname: str) -> int:
+    # Plain dict lookups, the route table is only changed on the event loop
+    return DYNAMIC_HOSTNAME_TO_PORT.get(hostname) or STATIC_HOSTNAME_TO_PORT.get(hostname)
+
+
+def get_backend_session(port: int) -> ClientSession:
+    session = BACKEND_SESSIONS.get(port)
+    if session is None or session.closed:
+        session = ClientSession(
+            connector=TCPConnector(limit=BACKEND_MAX_CONNECTIONS),
+            timeout=BACKEND_TIMEOUT,
+            # Forward compressed bodies as they are
+            auto_decompress=False,
+        )
+        BACKEND_SESSIONS[port] = session
+    return session
+
+
+async def close_backend_sessions(app: web.Application = None):
+    sessions = list(BACKEND_SESSIONS.values())
+    BACKEND_SESSIONS.clear()
+    for session in sessions:
+        await session.close()
+
+
+def forward_headers(headers) -> Dict[str, str]:
+    return {key: value for key, value in headers.items() if key.lower() not in HOP_BY_HOP_HEADERS}
 
 
 async def load_routes_from_disk():
@@ -52,16 +141,36 @@ async def load_routes_from_disk():
             print(f"⚠️ Failed to load routes from disk: {e}")
 
 
-async def save_routes_to_disk():
+def _write_routes(routes: Dict[str, int]):
     try:
-        print("💾 Attempting to save routes...")
         with open(ROUTES_FILE, "w") as f:
-            json.dump(DYNAMIC_HOSTNAME_TO_PORT, f, indent=2)
-        print(f"💾 Saved {len(DYNAMIC_HOSTNAME_TO_PORT)} routes to disk")
+            json.dump(routes, f, indent=2)
+        print(f"💾 Saved {len(routes)} routes to disk")
     except Exception as e:
         print(f"⚠️ Failed to save routes: {e}")
 
 
+async def save_routes_to_disk():
+    await asyncio.to_thread(_write_routes, dict(DYNAMIC_HOSTNAME_TO_PORT))
+
+
+async def _save_routes_task():
+    global _routes_changed
+    while _routes_changed:
+        _routes_changed = False
+        await save_routes_to_disk()
+
+
+def schedule_save_routes():
+    """
+    Saves the routes in the background. Changes made while a save is running are written by another save afterwards.
+    """
+    global _routes_changed, _save_task
+    _routes_changed = True
+    if _save_task is None or _save_task.done():
+        _save_task = asyncio.create_task(_save_routes_task())
+
+
 # Graceful shutdown handler to close all live WebSockets
 async def on_shutdown(app: web.Application):
     sockets = set(app.get("websockets", []))
@@ -73,90 +182,144 @@ async def on_shutdown(app: web.Application):
             )
         except Exception:
             pass
+    if _save_task is not None:
+        await _save_task
 
 
-async def handle_proxy(request: web.Request) -> web.StreamResponse:
-    hostname = request.headers.get("Host", "")
-    port = await get_port_for_host(hostname)
+async def proxy_websocket(request: web.Request, port: int) -> web.WebSocketResponse:
+    ws_server = web.WebSocketResponse(autoping=True, heartbeat=30)
+    await ws_server.prepare(request)
 
-    if not port:
-        return web.Response(status=502, text=f"Unknown host: {hostname}")
-
-    # WebSocket proxy
-    if request.headers.get("Upgrade", "").lower() == "websocket":
-        ws_server = web.WebSocketResponse(autoping=True, heartbeat=30)
-        await ws_server.prepare(request)
+    # Track this WebSocket for shutdown
+    request.app.setdefault("websockets", set()).add(ws_server)
+    METRICS.websocket_connections += 1
+    METRICS.active_websockets += 1
+    ws_url = f"ws://127.0.0.1:{port}{request.rel_url}"
+    try:
+        session = get_backend_session(port)
+        async with session.ws_connect(ws_url, heartbeat=30) as ws_client:
+
+            async def ws_forward(src, dst, to_client):
+                async for msg in src:
+                    if msg.type == WSMsgType.TEXT:
+                        await dst.send_str(msg.data)
+                    elif msg.type == WSMsgType.BINARY:
+                        await dst.send_bytes(msg.data)
+                    elif msg.type == WSMsgType.PING:
+                        await dst.ping()
+                        continue
+                    elif msg.type == WSMsgType.PONG:
+                        await dst.pong()
+                        continue
+                    elif msg.type == WSMsgType.CLOSE:
+                        await dst.close()
+                        return
+                    else:
+                        continue
+                    if to_client:
+                        METRICS.bytes_to_client += len(msg.data)
+                    else:
+                        METRICS.bytes_to_backend += len(msg.data)
+
+            # Run both directions, close when one finishes
+            tasks = [
+                asyncio.create_task(ws_forward(ws_server, ws_client, False)),
+                asyncio.create_task(ws_forward(ws_client, ws_server, True)),
+            ]
+            done, pending = await asyncio.wait(
+                tasks,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for t in pending:
+                t.cancel()
 
-        # Track this WebSocket for shutdown
-        request.app.setdefault("websockets", set()).add(ws_server)
-        try:
-            ws_url = f"ws://127.0.0.1:{port}{request.rel_url}"
-            async with ClientSession() as session:
-                async with session.ws_connect(ws_url, heartbeat=30) as ws_client:
-
-                    async def ws_forward(src, dst):
-                        async for msg in src:
-                            if msg.type == WSMsgType.TEXT:
-                                await dst.send_str(msg.data)
-                            elif msg.type == WSMsgType.BINARY:
-                                await dst.send_bytes(msg.data)
-                            elif msg.type == WSMsgType.PING:
-                                await dst.ping()
-                            elif msg.type == WSMsgType.PONG:
-                                await dst.pong()
-                            elif msg.type == WSMsgType.CLOSE:
-                                await dst.close()
-                                return
-                    # Run both directions, close when one finishes
-                    tasks = [
-                        asyncio.create_task(ws_forward(ws_server, ws_client)),
-                        asyncio.create_task(ws_forward(ws_client, ws_server)),
-                    ]
-                    done, pending = await asyncio.wait(
-                        tasks,
-                        return_when=asyncio.FIRST_COMPLETED,
-                    )
-                    for t in pending:
-                        t.cancel()
-
-                    # Ensure both ends close
-                    await ws_client.close()
-                    await ws_server.close()
-        except ClientConnectionError as e:
-            print(f"❌ Could not connect to backend WS at {ws_url}: {e}")
-            await ws_server.close(code=1011, message=b"Backend WS connection failed")
-        except Exception as e:
-            print(f"⚠️ Unexpected error in WS proxy: {e}")
+            # Ensure both ends close
+            await ws_client.close()
             await ws_server.close()
-        finally:
-            request.app.get("websockets", set()).discard(ws_server)
+    except ClientConnectionError as e:
+        METRICS.errors += 1
+        print(f"❌ Could not connect to backend WS at {ws_url}: {e}")
+        await ws_server.close(code=1011, message=b"Backend WS connection failed")
+    except Exception as e:
+        METRICS.errors += 1
+        print(f"⚠️ Unexpected error in WS proxy: {e}")
+        await ws_server.close()
+    finally:
+        METRICS.active_websockets -= 1
+        request.app.get("websockets", set()).discard(ws_server)
 
-        return ws_server
+    return ws_server
 
-    # Regular HTTP proxy
+
+async def _stream_request_body(request: web.Request):
+    async for chunk in request.content.iter_chunked(CHUNK_SIZE):
+        METRICS.bytes_to_backend += len(chunk)
+        yield chunk
+
+
+async def proxy_http(request: web.Request, port: int) -> web.StreamResponse:
     target_url = f"http://127.0.0.1:{port}{request.rel_url}"
+    METRICS.http_requests += 1
+    METRICS.active_http += 1
+    start = time.perf_counter()
+    response = None
     try:
-        async with ClientSession() as session:
-            async with session.request(
-                method=request.method,
-                url=target_url,
-                headers=request.headers,
-                data=await request.read(),
-            ) as resp:
-                body = await resp.read()
-                return web.Response(
-                    status=resp.status,
-                    body=body,
-                    headers=resp.headers,
-                )
-    except ClientConnectionError as e:
+        session = get_backend_session(port)
+        async with session.request(
+            method=request.method,
+            url=target_url,
+            headers=forward_headers(request.headers),
+            data=_stream_request_body(request) if request.body_exists else None,
+            allow_redirects=False,
+        ) as resp:
+            METRICS.latencies.append(time.perf_counter() - start)
+
+            # Stream the response body to the client as it arrives
+            response = web.StreamResponse(status=resp.status, reason=resp.reason,
+                                          headers=forward_headers(resp.headers))
+            await response.prepare(request)
+            async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                await response.write(chunk)
+                METRICS.bytes_to_client += len(chunk)
+            await response.write_eof()
+            return response
+    except (ClientConnectionError, asyncio.TimeoutError) as e:
+        METRICS.errors += 1
+        if response is not None:
+            # The backend closed the connection while streaming, the response is already started
+            return response
         return web.Response(
             status=502,
             text=f"Could not connect to backend HTTP server at {target_url}: {e}",
         )
+    except ConnectionResetError:
+        # The client disconnected while streaming
+        if response is not None:
+            return response
+        return web.Response(status=502, text="Connection reset")
     except Exception as e:
+        METRICS.errors += 1
         print(f"⚠️ Error handling HTTP proxy: {e}")
+        if response is not None:
+            return response
         return web.Response(status=500, text="Internal Server Error")
+    finally:
+        METRICS.active_http -= 1
+
+
+async def handle_proxy(request: web.Request) -> web.StreamResponse:
+    hostname = request.headers.get("Host", "")
+    port = get_port_for_host(hostname)
+
+    if not port:
+        return web.Response(status=502, text=f"Unknown host: {hostname}")
+
+    # WebSocket proxy
+    if request.headers.get("Upgrade", "").lower() == "websocket":
+        return await proxy_websocket(request, port)
+
+    # Regular HTTP proxy
+    return await proxy_http(request, port)
 
 
 async def register_host(request: web.Request) -> web.Response:
@@ -173,7 +336,7 @@ async def register_host(request: web.Request) -> web.Response:
     async with HOSTS_LOCK:
         DYNAMIC_HOSTNAME_TO_PORT[hostname] = port
         print(f"✅ Registered: {hostname} -> {port}")
-        await save_routes_to_disk()
+        schedule_save_routes()
 
     return web.Response(text=f"Registered {hostname} -> {port}")
 
@@ -189,16 +352,19 @@ async def unregister_host(request: web.Request) -> web.Response:
         removed = DYNAMIC_HOSTNAME_TO_PORT.pop(hostname, None)
         if removed:
             print(f"❌ Unregistered: {hostname}")
-            await save_routes_to_disk()
+            schedule_save_routes()
             return web.Response(text=f"Unregistered {hostname}")
         else:
             return web.Response(status=404, text="Hostname not found in dynamic routes")
 
 
 async def list_routes(request: web.Request) -> web.Response:
-    async with HOSTS_LOCK:
-        combined = {**STATIC_HOSTNAME_TO_PORT, **DYNAMIC_HOSTNAME_TO_PORT}
-        return web.json_response(combined)
+    combined = {**STATIC_HOSTNAME_TO_PORT, **DYNAMIC_HOSTNAME_TO_PORT}
+    return web.json_response(combined)
+
+
+async def metrics(request: web.Request) -> web.Response:
+    return web.json_response(METRICS.to_dict())
 
 
 async def static_routes(request: web.Request) -> web.Response:
@@ -348,20 +514,27 @@ async def admin_ui(request):
 """)
 
 
-async def start_reverse_proxy() -> None:
-    await load_routes_from_disk()
-
+def create_app() -> web.Application:
     app = web.Application()
     app["websockets"] = set()
     app.on_shutdown.append(on_shutdown)
+    app.on_cleanup.append(close_backend_sessions)
 
-    # Register routes
-    app.router.add_route("*", "/{tail:.*}", handle_proxy)
+    # Register routes. The catch-all proxy route has to come last, otherwise it would also match the admin routes
     app.router.add_post("/_register", register_host)
     app.router.add_post("/_unregister", unregister_host)
     app.router.add_get("/_routes", list_routes)
     app.router.add_get("/_static_routes", static_routes)
+    app.router.add_get("/_metrics", metrics)
     app.router.add_get('/admin', admin_ui)
+    app.router.add_route("*", "/{tail:.*}", handle_proxy)
+    return app
+
+
+async def start_reverse_proxy() -> None:
+    await load_routes_from_disk()
+
+    app = create_app()
 
     # Setup runner with shorter shutdown timeout
     runner = web.AppRunner(app, shutdown_timeout=5)
@@ -409,6 +582,9 @@ curl -X POST http://localhost/_unregister \
 # List all routes:
 curl http://localhost/_routes
 
+# Proxy metrics (requests, active connections, bytes, latency):
+curl http://localhost/_metrics
+
 ==========================
 💡 EXAMPLE USAGE (Python)
 ==========================
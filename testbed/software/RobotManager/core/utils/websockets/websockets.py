@@ -13,6 +13,7 @@ from core.utils.callbacks import CallbackContainer, callback_definition
 @callback_definition
 class SyncWebsocketServer_Callbacks:
     new_client: CallbackContainer
+    client_left: CallbackContainer
     message: CallbackContainer
 
 
@@ -75,6 +76,7 @@ class SyncWebsocketServer:
     def _on_client_left(self, client, server):
         if client in self.clients:
             self.clients.remove(client)  # Remove client from the list
+        self.callbacks.client_left.call(client)
 
     def _on_message_received(self, client, server, message):
         message = json.loads(message)
@@ -90,6 +92,14 @@ class SyncWebsocketServer:
         for client in self.clients:
             self.server.send_message(client, message)
 
+    def send_to(self, client, message):
+        """
+        Send a message to a single client.
+        """
+        if isinstance(message, dict):
+            message = json.dumps(message)
+        self.server.send_message(client, message)
+
     def stop(self, *args, **kwargs):
         """
         Stop the WebSocket server.
@@ -1,5 +1,6 @@
 from __future__ import annotations
 import asyncio
+import collections
 import contextlib
 import json
 import os
@@ -11,6 +12,7 @@ from abc import ABC, abstractmethod
 import re
 from typing import Optional, Callable
 import aiohttp
+import orjson
 from aiohttp import web, WSMessage, TCPConnector, ClientSession
 from aiohttp.web_request import Request
 from zeroconf import Zeroconf, ServiceInfo
@@ -1213,19 +1215,15 @@ class GraphWidget(Widget):
         }
 
     def push_value(self, value):
-        if self.app and self.app.event_loop:
-            asyncio.run_coroutine_threadsafe(self._push_value(value), self.app.event_loop)
-        else:
-            asyncio.run(self._push_value(value))
-
-    async def _push_value(self, value):
-        # Send the new data point to the client.
-        await self.app.update_widget({
-            "type": "push_value",
-            "id": self.uid,
-            "value": value,
-            'time': time.time(),
-        })
+        # Collected by the update bus and sent with all other values of the current frame. Can be called from any
+        # thread
+        if self.app:
+            self.app.update_bus.push({
+                "type": "push_value",
+                "id": self.uid,
+                "value": value,
+                'time': time.time(),
+            })
 
 
 # ======================================================================================================================
@@ -2110,7 +2108,8 @@ class Frontend:
 
     # ------------------------------------------------------------------------------------------------------------------
     async def send_json(self, message):
-        await self.websocket.send_json(message)
+        # Sent through the update bus, so the message keeps its order with the widget updates
+        self.root_group.app.update_bus.sendMessage(message, keys=[self])
 
     # ------------------------------------------------------------------------------------------------------------------
     async def handle_message_from_web(self, data):
@@ -2328,6 +2327,13 @@ class ControlAppChild:
                     return None
                 return None
 
+            case 'update_widgets':
+                # One frame of the update bus of the child
+                for widget_data in message_data.get("data", []):
+                    widget_data['id'] = prepend_parent_path(widget_data['id'], self.root_group.get_path())
+                    await self.app.update_widget(widget_data)
+                return None
+
             case 'update_group':
                 raise NotImplementedError("I have to implement this.")
 
@@ -2735,6 +2741,223 @@ class StatusBar:
             self.app.updateStatusBarWidget(widget)
 
 
+# ======================================================================================================================
+def serialize_message(message) -> str:
+    # Like json.dumps, keys that are not strings (e.g. page numbers) are converted to strings
+    return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+
+
+# ======================================================================================================================
+class UpdateFrame:
+    """
+    All widget updates collected during one frame of the UpdateBus. The frame is serialized once and the same string is
+    sent to all clients.
+    """
+    state_updates: dict  # Latest update per (type, widget id). Widget updates always contain the full widget state
+    graph_updates: list  # One 'push_values' message per graph with all values pushed during the frame
+
+    def __init__(self, state_updates: dict, graph_updates: list):
+        self.state_updates = state_updates
+        self.graph_updates = graph_updates
+        self._data = None
+
+    @property
+    def messages(self) -> list:
+        return list(self.state_updates.values()) + self.graph_updates
+
+    def serialize(self) -> str:
+        if self._data is None:
+            self._data = serialize_message({'type': 'update_widgets', 'data': self.messages})
+        return self._data
+
+    def merge(self, newer: UpdateFrame) -> UpdateFrame:
+        """
+        Combines a stale frame with a newer one. The graph values of the stale frame are dropped, the widget states
+        are kept if the newer frame does not update the same widget.
+        """
+        return UpdateFrame(state_updates={**self.state_updates, **newer.state_updates},
+                           graph_updates=newer.graph_updates)
+
+
+# ======================================================================================================================
+class UpdateChannel:
+    """
+    Sends the frames and messages of the UpdateBus to one client in the order they were submitted. At most one item is
+    sent at a time. If the client is slower than the frame rate, a waiting frame is merged with the new one, so the
+    client only gets the newest graph values but no widget state is lost. Frames are never merged across a message.
+    """
+
+    def __init__(self, send_str: Callable, name: str = ''):
+        self.send_str = send_str
+        self.name = name
+        self.sent_frames = 0
+        self.dropped_frames = 0
+
+        self._pending: collections.deque[UpdateFrame | str] = collections.deque()
+        self._task: asyncio.Task | None = None
+
+    def submit(self, frame: UpdateFrame):
+        if self._pending and isinstance(self._pending[-1], UpdateFrame):
+            self._pending[-1] = self._pending[-1].merge(frame)
+            self.dropped_frames += 1
+        else:
+            self._pending.append(frame)
+        self._startSending()
+
+    def send(self, data: str):
+        """
+        Sends a serialized message after all frames and messages submitted before
+        """
+        self._pending.append(data)
+        self._startSending()
+
+    def close(self):
+        self._pending.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _startSending(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._send())
+
+    async def _send(self):
+        while self._pending:
+            item = self._pending.popleft()
+            try:
+                if isinstance(item, UpdateFrame):
+                    await self.send_str(item.serialize())
+                    self.sent_frames += 1
+                else:
+                    await self.send_str(item)
+            except Exception as e:
+                logger.debug(f"Could not send widget updates to {self.name}: {e}")
+                self._pending.clear()
+                return
+
+
+# ======================================================================================================================
+class UpdateBus:
+    """
+    Collects the widget updates of the app and sends them to all frontends and the parent app once per frame.
+
+    - Several updates of the same widget within one frame are reduced to the latest one
+    - All values pushed to a graph within one frame are sent as one 'push_values' message
+    - Each frame is serialized once and sent to all clients concurrently
+    - Other messages to the clients (sendMessage) use the same channels, so they keep their order with the frames
+
+    push() can be called from any thread. Updates pushed before start() are collected and sent with the first frame.
+    """
+    rate: float  # Frames per second
+    channels: dict[object, UpdateChannel]
+
+    def __init__(self, rate: float = 30):
+        self.rate = rate
+        self.channels = {}
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+        self._lock = threading.Lock()
+        self._state_updates = {}
+        self._graph_updates = {}
+        self._flush_requested = False
+        self._last_flush = 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def start(self, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            self.loop = loop
+            # Send the updates that were pushed before the loop existed
+            pending = (self._state_updates or self._graph_updates) and not self._flush_requested
+            if pending:
+                self._flush_requested = True
+
+        if pending:
+            loop.call_soon_threadsafe(self._scheduleFlush)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def addClient(self, key, send_str: Callable, name: str = ''):
+        """
+        Must be called from the event loop
+        """
+        self.channels[key] = UpdateChannel(send_str, name=name)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def removeClient(self, key):
+        channel = self.channels.pop(key, None)
+        if channel is not None:
+            channel.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def push(self, message: dict):
+        with self._lock:
+            if message['type'] in ('push_value', 'push_values'):
+                self._addGraphValues(message)
+            else:
+                self._state_updates[(message['type'], message['id'])] = message
+
+            # Without a loop, the updates are kept until start()
+            if self._flush_requested or self.loop is None:
+                return
+            self._flush_requested = True
+            loop = self.loop
+
+        loop.call_soon_threadsafe(self._scheduleFlush)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def sendMessage(self, message: dict, keys: list = None):
+        """
+        Sends a message that is not a widget update, e.g. a group or status bar update. The updates pushed so far are
+        sent first, so the clients receive everything in order. Must be called from the event loop
+
+        :param keys: Keys of the clients to send the message to. Defaults to all clients
+        """
+        self._flush()
+        data = serialize_message(message)
+        for key in (self.channels if keys is None else keys):
+            channel = self.channels.get(key)
+            if channel is not None:
+                channel.send(data)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _addGraphValues(self, message: dict):
+        update = self._graph_updates.get(message['id'])
+        if update is None:
+            update = {'type': 'push_values', 'id': message['id'], 'values': [], 'times': []}
+            self._graph_updates[message['id']] = update
+
+        if message['type'] == 'push_value':
+            update['values'].append(message['value'])
+            update['times'].append(message['time'])
+        else:
+            update['values'].extend(message['values'])
+            update['times'].extend(message['times'])
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _scheduleFlush(self):
+        delay = self._last_flush + 1 / self.rate - self.loop.time()
+        if delay > 0:
+            self.loop.call_later(delay, self._flush)
+        else:
+            self._flush()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _flush(self):
+        with self._lock:
+            # A scheduled flush finds nothing if sendMessage() flushed in the meantime
+            if not self._state_updates and not self._graph_updates:
+                self._flush_requested = False
+                return
+            frame = UpdateFrame(state_updates=self._state_updates,
+                                graph_updates=list(self._graph_updates.values()))
+            self._state_updates = {}
+            self._graph_updates = {}
+            self._flush_requested = False
+
+        self._last_flush = self.loop.time()
+        for channel in list(self.channels.values()):
+            channel.submit(frame)
+
+
 # ======================================================================================================================
 
 class ControlApp:
@@ -2747,7 +2970,10 @@ class ControlApp:
     _exit: bool
 
     def __init__(self, app_id: str, port=80, mdns_name: str = 'bilbolab', parent_address: str = None,
-                 parent_port: int = 80):
+                 parent_port: int = 80, update_rate: float = 30):
+        """
+        :param update_rate: Maximum rate in Hz at which widget updates are sent to the frontends and the parent app
+        """
 
         self.static_path = None
         self.running = False
@@ -2764,6 +2990,7 @@ class ControlApp:
         self.webapp_clients = set()
 
         self.frontends: list[Frontend] = []
+        self.update_bus = UpdateBus(rate=update_rate)
 
         # If the App is a child app
         self.parent_address = parent_address
@@ -2808,6 +3035,7 @@ class ControlApp:
     def run(self):
         self.event_loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.event_loop)
+        self.update_bus.start(self.event_loop)
 
         self.runner = web.AppRunner(self.app)
         self.event_loop.run_until_complete(self.runner.setup())
@@ -2980,6 +3208,8 @@ class ControlApp:
 
                                 # self.webapp_clients.add(ws)
                                 frontend = Frontend(websocket=ws, root_group=self.root_group)
+                                # The frontend sends its messages through the update bus, including the first set
+                                self.update_bus.addClient(frontend, ws.send_str, name='frontend')
                                 await frontend.init()
                                 self.frontends.append(frontend)
                                 logger.debug(f"Added Frontend")
@@ -3016,6 +3246,7 @@ class ControlApp:
             if client_type == 'control_app':
                 self.removeChild(child_id=client_id)
             elif client_type == 'web':
+                self.update_bus.removeClient(frontend)
                 await frontend.close()
                 self.frontends.remove(frontend)
 
@@ -3154,18 +3385,23 @@ class ControlApp:
                             'root_folder_pages': self.root_group.pages,
                         }
                         await self.parent_websocket.send_json(payload)
+                        self.update_bus.addClient('parent', parent_ws.send_str, name='parent')
 
                         # Listen for messages
-                        async for msg in parent_ws:
-                            if msg.type == aiohttp.WSMsgType.TEXT:
-                                data = json.loads(msg.data)
-                                await self._handle_message_from_parent(data)
-                            elif msg.type == aiohttp.WSMsgType.ERROR:
-                                logger.error("WebSocket error: %s", parent_ws.exception())
-                                break
-                            elif msg.type == aiohttp.WSMsgType.CLOSED:
-                                logger.warning("WebSocket closed by parent.")
-                                break
+                        try:
+                            async for msg in parent_ws:
+                                if msg.type == aiohttp.WSMsgType.TEXT:
+                                    data = json.loads(msg.data)
+                                    await self._handle_message_from_parent(data)
+                                elif msg.type == aiohttp.WSMsgType.ERROR:
+                                    logger.error("WebSocket error: %s", parent_ws.exception())
+                                    break
+                                elif msg.type == aiohttp.WSMsgType.CLOSED:
+                                    logger.warning("WebSocket closed by parent.")
+                                    break
+                        finally:
+                            self.update_bus.removeClient('parent')
+                            self.parent_websocket = None
 
                         logger.info("Parent disconnected. Reconnecting in 5 seconds...")
 
@@ -3210,7 +3446,7 @@ class ControlApp:
                         'data': payload,
                     }
 
-                    await self.parent_websocket.send_json(answer)
+                    self.update_bus.sendMessage(answer, keys=['parent'])
 
             case 'widget':
                 widget_data = data.get('data', None)
@@ -3221,7 +3457,7 @@ class ControlApp:
                         'request_id': data.get('request_id', None),
                         'data': output,
                     }
-                    await self.parent_websocket.send_json(answer)
+                    self.update_bus.sendMessage(answer, keys=['parent'])
 
             case _:
                 logger.warning(f"Unknown request type from parent: {request_type}")
@@ -3262,14 +3498,8 @@ class ControlApp:
 
     # ------------------------------------------------------------------------------------------------------------------
     async def update_widget(self, data):
-        await self.send_to_all_frontends(data)
-
-        if self.parent_websocket is not None:
-            msg = {
-                'type': 'update_widget',
-                'data': data,
-            }
-            await self.parent_websocket.send_json(msg)
+        # Sent with the next frame of the update bus to all frontends and the parent app
+        self.update_bus.push(data)
 
     # ------------------------------------------------------------------------------------------------------------------
     def updateGroup(self, path):
@@ -3286,7 +3516,7 @@ class ControlApp:
                 'type': 'update_group',
                 'path': path,
             }
-            await self.parent_websocket.send_json(msg)
+            self.update_bus.sendMessage(msg, keys=['parent'])
 
     # ------------------------------------------------------------------------------------------------------------------
     def updateStatusBar(self):
@@ -3303,8 +3533,7 @@ class ControlApp:
             'data': payload
         }
 
-        for frontend in self.frontends:
-            await frontend.send_json(message)
+        await self.send_to_all_frontends(message)
 
     # ------------------------------------------------------------------------------------------------------------------
     def updateStatusBarWidget(self, widget):
@@ -3324,13 +3553,12 @@ class ControlApp:
             'widget_type': widget.widget_type,
             'data': payload
         }
-        for frontend in self.frontends:
-            await frontend.send_json(message)
+        await self.send_to_all_frontends(message)
 
     # ------------------------------------------------------------------------------------------------------------------
     async def send_to_all_frontends(self, message):
-        for frontend in self.frontends:
-            await frontend.send_json(message)
+        # Serialized once and sent through the update bus, after the widget updates pushed before
+        self.update_bus.sendMessage(message, keys=list(self.frontends))
 
     # ------------------------------------------------------------------------------------------------------------------
     def getByPath(self, path: str):
@@ -27,6 +27,10 @@ class Dynamics(ScheduledObject):
     Ts: float
     state_initial: sp.State
 
+    # Dynamics that implement _dynamicsBatch can be advanced together in a DynamicsBatch
+    vectorized: bool = False
+    batch: 'DynamicsBatch' = None
+
     # === INIT =========================================================================================================
     def __init__(self, input_space: sp.Space = None, output_space: sp.Space = None, state_space: sp.Space = None,
                  Ts: float = None, state: Union[sp.State, list] = None, *args,
@@ -57,11 +61,15 @@ class Dynamics(ScheduledObject):
     # === PROPERTIES ===================================================================================================
     @property
     def state(self):
+        if self.batch is not None:
+            self.batch.pull(self)
         return self._state
 
     @state.setter
     def state(self, value):
         self._state = self.state_space.map(value)
+        if self.batch is not None:
+            self.batch.touch(self)
 
     @property
     def input(self):
@@ -95,11 +103,226 @@ class Dynamics(ScheduledObject):
     def _dynamics(self, state: sp.State, input: sp.State):
         pass
 
+    def _dynamicsBatch(self, states: np.ndarray, input: np.ndarray) -> np.ndarray:
+        """
+        Vectorized version of _dynamics for dynamics with vectorized = True. Row i belongs to the i-th dynamics of the
+        batch.
+
+        The default steps the dynamics of the batch one after another with their own _dynamics, so that a class can be
+        batched before it has a vectorized step. Override it with a vectorized step to make batching faster.
+
+        :param states: (n_agents, n_states) array with one flattened state per row
+        :param input: (n_agents, n_inputs) array with one flattened input per row
+        :return: (n_agents, n_states) array of the next states
+        """
+        batch = self.batch
+        next_states = np.empty_like(states)
+        for index, dynamics in enumerate(batch.dynamics):
+            state = dynamics.state_space.getState()
+            batch._unpack(states[index], batch._state_layout, state)
+            input_state = dynamics.input_space.getState()
+            batch._unpack(input[index], batch._input_layout, input_state)
+            state = dynamics.state_space.map(dynamics._dynamics(state, input_state))
+            batch._pack(state, batch._state_layout, next_states[index])
+        return next_states
+
+    def _batchKey(self):
+        """
+        Dynamics with the same key share a DynamicsBatch. Add all parameters used by _dynamicsBatch.
+        """
+        return type(self), self.Ts
+
     @abstractmethod
     def _output(self, state: sp.State):
         pass
 
 
+# ======================================================================================================================
+class DynamicsBatch:
+    """
+    Advances all dynamics of one class with a single vectorized step per tick.
+
+    The states of the dynamics are packed into one (n_agents, n_states) array. The State objects of the dynamics are
+    only updated from this array when they are accessed. States that have been accessed (and may have been changed) are
+    written back into the array before the next step.
+    """
+    dynamics: list[Dynamics]
+    states: np.ndarray
+    inputs: np.ndarray
+    step_count: int
+
+    _state_layout: list
+    _input_layout: list
+    _exposed: set
+
+    # === INIT =========================================================================================================
+    def __init__(self):
+        self.dynamics = []
+        self.states = None
+        self.inputs = None
+        self.step_count = 0
+
+        self._state_layout = None
+        self._input_layout = None
+        self._exposed = set()
+
+    # === METHODS ======================================================================================================
+    def add(self, dynamics: Dynamics):
+        assert dynamics.vectorized
+        assert dynamics.batch is None
+
+        if self._state_layout is None:
+            self._state_layout, n_states = self._getLayout(dynamics.state_space.getState())
+            self._input_layout, n_inputs = self._getLayout(dynamics.input_space.getState())
+            self.states = np.zeros((0, n_states))
+            self.inputs = np.zeros((0, n_inputs))
+            self._getLimits(dynamics.state_space.getState(), n_states)
+
+        row = np.zeros((1, self.states.shape[1]))
+        self._pack(dynamics.state, self._state_layout, row[0])
+        self.states = np.vstack((self.states, row))
+        self.inputs = np.vstack((self.inputs, np.zeros((1, self.inputs.shape[1]))))
+
+        dynamics._batch_index = len(self.dynamics)
+        dynamics._batch_step = self.step_count
+        dynamics.batch = self
+        self.dynamics.append(dynamics)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def remove(self, dynamics: Dynamics):
+        assert dynamics.batch is self
+
+        # Bring the State object up to date before it is detached from the batch
+        self.pull(dynamics)
+        index = dynamics._batch_index
+        if index in self._exposed:
+            self._pack(dynamics._state, self._state_layout, self.states[index])
+
+        self.states = np.delete(self.states, index, axis=0)
+        self.inputs = np.delete(self.inputs, index, axis=0)
+        del self.dynamics[index]
+        for i in range(index, len(self.dynamics)):
+            self.dynamics[i]._batch_index = i
+        self._exposed = {i if i < index else i - 1 for i in self._exposed if i != index}
+
+        dynamics.batch = None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def step(self):
+        if len(self.dynamics) == 0:
+            return
+
+        # Write back all states that have been accessed since the last step
+        for index in self._exposed:
+            self._pack(self.dynamics[index]._state, self._state_layout, self.states[index])
+        self._exposed.clear()
+
+        for index, dynamics in enumerate(self.dynamics):
+            self._pack(dynamics._input, self._input_layout, self.inputs[index])
+
+        states = self.dynamics[0]._dynamicsBatch(self.states, self.inputs)
+        self.states = self._applyLimits(np.asarray(states, dtype=float))
+        self.step_count += 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def pull(self, dynamics: Dynamics):
+        """
+        Updates the State object of the dynamics from the array. Called when the state is accessed.
+        """
+        index = dynamics._batch_index
+        if dynamics._batch_step != self.step_count:
+            self._unpack(self.states[index], self._state_layout, dynamics._state)
+            dynamics._batch_step = self.step_count
+        self._exposed.add(index)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def touch(self, dynamics: Dynamics):
+        """
+        Marks the State object of the dynamics as newer than the array. Called when the state is set.
+        """
+        dynamics._batch_step = self.step_count
+        self._exposed.add(dynamics._batch_index)
+
+    # === PRIVATE METHODS ==============================================================================================
+    @staticmethod
+    def _getLayout(state: sp.State) -> (list, int):
+        layout = []
+        size = 0
+        for value in state.value:
+            if isinstance(value, sp.ScalarValue):
+                layout.append((size, 0))
+                size += 1
+            elif isinstance(value, sp.VectorValue):
+                layout.append((size, value.len))
+                size += value.len
+            else:
+                raise TypeError(f"Cannot vectorize state values of type {type(value).__name__}")
+        return layout, size
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def _pack(state: sp.State, layout: list, row: np.ndarray):
+        for value, (offset, length) in zip(state.value, layout):
+            if length == 0:
+                row[offset] = value.value
+            else:
+                row[offset:offset + length] = value.value
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def _unpack(row: np.ndarray, layout: list, state: sp.State):
+        for value, (offset, length) in zip(state.value, layout):
+            if length == 0:
+                value.value = float(row[offset])
+            else:
+                value.value[:] = row[offset:offset + length]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _getLimits(self, state: sp.State, size: int):
+        """
+        Collects the limits, wrapping and discretization of all state values, so that they can be applied to the
+        whole array in the same way as ScalarValue.set and VectorValue.set do for a single value
+        """
+        self._lower = np.full(size, np.nan)
+        self._upper = np.full(size, np.nan)
+        self._wrap = np.zeros(size, dtype=bool)
+        self._discretization = np.zeros(size)
+
+        for value, (offset, length) in zip(state.value, self._state_layout):
+            if length == 0:
+                entries = [(offset, value.limits, value.wrapping, value.discretization)]
+            else:
+                entries = []
+                for i in range(length):
+                    wrapping = value.wrapping[i] if isinstance(value.wrapping, list) else bool(value.wrapping)
+                    discretization = value.discretization[i] if value.discretization is not None else None
+                    limits = value.limits[i] if value.limits is not None else None
+                    entries.append((offset + i, limits, wrapping, discretization))
+
+            for index, limits, wrapping, discretization in entries:
+                if limits is not None:
+                    self._lower[index], self._upper[index] = limits
+                    self._wrap[index] = bool(wrapping)
+                if discretization is not None and discretization > 0:
+                    self._discretization[index] = discretization
+
+        self._clip = ~np.isnan(self._lower) & ~self._wrap
+        self._discretize = self._discretization > 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _applyLimits(self, states: np.ndarray) -> np.ndarray:
+        if self._wrap.any():
+            lower = self._lower[self._wrap]
+            span = self._upper[self._wrap] - lower
+            states[:, self._wrap] = lower + np.fmod(span + np.fmod(states[:, self._wrap] - lower, span), span)
+        if self._clip.any():
+            states[:, self._clip] = np.clip(states[:, self._clip], self._lower[self._clip], self._upper[self._clip])
+        if self._discretize.any():
+            discretization = self._discretization[self._discretize]
+            states[:, self._discretize] = discretization * np.round(states[:, self._discretize] / discretization)
+        return states
+
+
 # ======================================================================================================================
 class LinearDynamics(Dynamics):
     A: np.ndarray
@@ -227,6 +450,8 @@ class DynamicObject(Object, ABC):
 
     # === ACTIONS ======================================================================================================
     def action_dynamics(self, *args, **kwargs):
-        self.dynamics.update()
+        # Batched dynamics are advanced by the environment
+        if self.dynamics.batch is None:
+            self.dynamics.update()
 
     # === PRIVATE METHODS ==============================================================================================
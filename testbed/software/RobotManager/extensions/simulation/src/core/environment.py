@@ -522,17 +522,30 @@ class Environment(scheduling.ScheduledObject):
     agents: dict[str, 'Agent']
     name = 'env'
 
+    batch_dynamics: bool
+    dynamics_batches: dict
+
+    collision_check: bool
+    collision_broadphase: physics.CollisionBroadPhase
+    collisions: list
+
     logger: Logger
 
     # size: dict  # World dimensions; this is separate from the space definition.
 
-    def __init__(self, Ts, run_mode: str = None, space: core_spaces.Space = None, size=None, *args, **kwargs):
+    def __init__(self, Ts, run_mode: str = None, space: core_spaces.Space = None, size=None,
+                 batch_dynamics: bool = False, compile_actions: bool = False, collision_check: bool = False,
+                 *args, **kwargs):
         """
         Initialize the world.
 
         Args:
             space (core_spaces.Space): The global space of the world.
             size (dict): Dimensions of the world.
+            batch_dynamics (bool): Advance all vectorized dynamics of the same class with one step per tick instead
+                of updating each object separately.
+            compile_actions (bool): Run the step action as a compiled ActionSchedule.
+            collision_check (bool): Check all objects with physics for collisions at the end of the physics phase.
         """
         super().__init__(*args, **kwargs)
 
@@ -547,12 +560,20 @@ class Environment(scheduling.ScheduledObject):
         self.objects = {}
         self.agents = {}
 
+        self.batch_dynamics = batch_dynamics
+        self.dynamics_batches = {}
+
+        self.collision_check = collision_check
+        self.collision_broadphase = physics.CollisionBroadPhase()
+        self.collisions = []
+
         self.scheduling.actions['entry'].addParent(self.scheduling.actions['step'])
         self.scheduling.actions['entry'].priority = 0
         self.scheduling.actions['exit'].addParent(self.scheduling.actions['step'])
         self.scheduling.actions['exit'].priority = 1000
 
-        self.scheduler = scheduling.Scheduler(action=self.scheduling.actions['step'], mode=self.run_mode, Ts=self.Ts)
+        self.scheduler = scheduling.Scheduler(action=self.scheduling.actions['step'], mode=self.run_mode, Ts=self.Ts,
+                                              compile=compile_actions)
 
         core.scheduling.Action(action_id=BASE_ENVIRONMENT_ACTIONS.ENV_INPUT,
                                object=self,
@@ -604,16 +625,30 @@ class Environment(scheduling.ScheduledObject):
                                priority=40,
                                parent=action_objects)
 
-        core.scheduling.Action(action_id=BASE_ENVIRONMENT_ACTIONS.DYNAMICS,
+        action_dynamics = core.scheduling.Action(action_id=BASE_ENVIRONMENT_ACTIONS.DYNAMICS,
+                                                 object=self,
+                                                 function=self.action_dynamics,
+                                                 priority=50,
+                                                 parent=action_objects)
+
+        # Runs before the dynamics actions of the objects
+        core.scheduling.Action(action_id='dynamics_batches',
                                object=self,
-                               function=self.action_dynamics,
-                               priority=50,
-                               parent=action_objects)
+                               function=self._stepDynamicsBatches,
+                               priority=0,
+                               parent=action_dynamics)
 
-        core.scheduling.Action(action_id=BASE_ENVIRONMENT_ACTIONS.PHYSICS,
+        action_physics = core.scheduling.Action(action_id=BASE_ENVIRONMENT_ACTIONS.PHYSICS,
+                                                object=self,
+                                                function=self.action_physics_update,
+                                                priority=60, parent=action_objects)
+
+        # Runs after the physics actions of the objects
+        core.scheduling.Action(action_id='collision_check',
                                object=self,
-                               function=self.action_physics_update,
-                               priority=60, parent=action_objects)
+                               function=self._collisionCheck,
+                               priority=1000,
+                               parent=action_physics)
 
         core.scheduling.Action(action_id=BASE_ENVIRONMENT_ACTIONS.OUTPUT,
                                object=self,
@@ -688,6 +723,12 @@ class Environment(scheduling.ScheduledObject):
                                                                                   scheduling.SCHEDULING_DEFAULT_ACTIONS)):
                     obj.scheduling.actions[action_name].addParent(action)
 
+            if self.batch_dynamics:
+                self._addToDynamicsBatch(obj)
+
+            if isinstance(getattr(obj, 'physics', None), physics.PhysicalBody):
+                self.collision_broadphase.add(obj.physics, owner=obj)
+
             logging.info(f"Added Object \"{obj.id}\" ({type(obj)}) to the world.")
 
             obj._onAdd_callback()
@@ -707,6 +748,11 @@ class Environment(scheduling.ScheduledObject):
             assert isinstance(obj, Object)
             if obj in self.objects.values():
                 del self.objects[obj.id]
+            dynamics = getattr(obj, 'dynamics', None)
+            if getattr(dynamics, 'batch', None) is not None:
+                dynamics.batch.remove(dynamics)
+            if isinstance(getattr(obj, 'physics', None), physics.PhysicalBody):
+                self.collision_broadphase.remove(obj.physics)
             # TODO: Also deregister the simulation object.
             self.removeChild(obj)
 
@@ -771,6 +817,18 @@ class Environment(scheduling.ScheduledObject):
             if hasattr(obj, 'physics') and obj.physics is not None:
                 obj.scheduling.actions['physics_update']()
 
+    # ------------------------------------------------------------------------------------------------------------------
+    def collisionCheck(self) -> list[tuple[Object, Object]]:
+        """
+        Check all objects with physics for collisions. The proximity spheres select candidate pairs, which are then
+        checked with their bounding objects.
+
+        Returns:
+            List of the colliding object pairs.
+        """
+        self.collisions = self.collision_broadphase.collisionCheck()
+        return self.collisions
+
     # ------------------------------------------------------------------------------------------------------------------
     def getSample(self) -> dict:
         """
@@ -825,6 +883,30 @@ class Environment(scheduling.ScheduledObject):
 
         return world_definition
 
+    # ------------------------------------------------------------------------------------------------------------------
+    def _addToDynamicsBatch(self, obj: Object):
+        """
+        Adds the dynamics of the object to the batch of its class, if the dynamics can be vectorized.
+        """
+        dynamics = getattr(obj, 'dynamics', None)
+        if not isinstance(dynamics, core.dynamics.Dynamics) or not dynamics.vectorized or dynamics.batch is not None:
+            return
+
+        key = dynamics._batchKey()
+        if key not in self.dynamics_batches:
+            self.dynamics_batches[key] = core.dynamics.DynamicsBatch()
+        self.dynamics_batches[key].add(dynamics)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _collisionCheck(self, *args, **kwargs):
+        if self.collision_check:
+            self.collisionCheck()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _stepDynamicsBatches(self, *args, **kwargs):
+        for batch in self.dynamics_batches.values():
+            batch.step()
+
     # ------------------------------------------------------------------------------------------------------------------
     # def _buildActionTree(self):
     #     """
@@ -1,4 +1,3 @@
-import copy
 import dataclasses
 from abc import ABC, abstractmethod
 from typing import Union
@@ -27,33 +26,55 @@ class ObjectPrimitive(ABC):
 
 # ----------------------------------------------------------------------------------------------------------------------
 def collisionCuboidCuboid(cuboid1: 'CuboidPrimitive', cuboid2: 'CuboidPrimitive'):
-    collided_points_1 = []
-    collided_points_2 = []
+    collision = collisionCuboidCuboidBatch(np.asarray(cuboid1.position, dtype=float)[np.newaxis],
+                                           np.asarray(cuboid1.orientation, dtype=float)[np.newaxis],
+                                           np.asarray(cuboid1.size, dtype=float)[np.newaxis] / 2,
+                                           np.asarray(cuboid2.position, dtype=float)[np.newaxis],
+                                           np.asarray(cuboid2.orientation, dtype=float)[np.newaxis],
+                                           np.asarray(cuboid2.size, dtype=float)[np.newaxis] / 2)
+    return bool(collision[0])
 
-    R_T = cuboid1.orientation.T
-    for point in cuboid2.points_global:
-        vec_rel_global = point - cuboid1.position
-        vec_rel_local = R_T @ vec_rel_global
 
-        if abs(vec_rel_local[0]) <= cuboid1.size[0] / 2 and abs(vec_rel_local[1]) <= cuboid1.size[1] / 2 and abs(
-                vec_rel_local[2]) <= cuboid1.size[2] / 2:
-            collided_points_1.append(point)
-
-    if len(collided_points_1) > 0:
-        return True
-
-    R_T_2 = cuboid2.orientation.T
-    for point in cuboid1.points_global:
-        vec_rel_global = point - cuboid2.position
-        vec_rel_local = R_T_2 @ vec_rel_global
-
-        if abs(vec_rel_local[0]) <= cuboid2.size[0] / 2 and abs(vec_rel_local[1]) <= cuboid2.size[1] / 2 and abs(
-                vec_rel_local[2]) <= cuboid2.size[2] / 2:
-            collided_points_2.append(point)
-    if len(collided_points_2) > 0:
-        return True
-
-    return False
+# ----------------------------------------------------------------------------------------------------------------------
+def collisionCuboidCuboidBatch(position1: np.ndarray, orientation1: np.ndarray, half_size1: np.ndarray,
+                               position2: np.ndarray, orientation2: np.ndarray, half_size2: np.ndarray) -> np.ndarray:
+    """
+    Separating axis test for n pairs of oriented boxes. Two boxes are separated if their projections on one of the 15
+    axes (3 face normals of each box and the 9 cross products of their edges) do not overlap. Touching boxes collide.
+
+    :param position1: (n, 3) centers of the first boxes
+    :param orientation1: (n, 3, 3) rotation matrices of the first boxes, the columns are the axes of the box
+    :param half_size1: (n, 3) half edge lengths of the first boxes
+    :param position2: (n, 3) centers of the second boxes
+    :param orientation2: (n, 3, 3) rotation matrices of the second boxes
+    :param half_size2: (n, 3) half edge lengths of the second boxes
+    :return: (n,) bool array, True if the boxes of a pair collide
+    """
+    # Rotation and translation of box 2 in the frame of box 1
+    R = np.einsum('nki,nkj->nij', orientation1, orientation2)
+    t = np.einsum('nki,nk->ni', orientation1, position2 - position1)
+    # The epsilon avoids false separations for (nearly) parallel edges, where the cross products vanish
+    R_abs = np.abs(R) + 1e-9
+
+    # Face normals of box 1
+    separated = np.any(np.abs(t) > half_size1 + np.einsum('nij,nj->ni', R_abs, half_size2), axis=1)
+
+    # Face normals of box 2
+    separated |= np.any(np.abs(np.einsum('ni,nij->nj', t, R)) >
+                        np.einsum('ni,nij->nj', half_size1, R_abs) + half_size2, axis=1)
+
+    # Cross products of the edges
+    for i in range(3):
+        i1 = (i + 1) % 3
+        i2 = (i + 2) % 3
+        for j in range(3):
+            j1 = (j + 1) % 3
+            j2 = (j + 2) % 3
+            r1 = half_size1[:, i1] * R_abs[:, i2, j] + half_size1[:, i2] * R_abs[:, i1, j]
+            r2 = half_size2[:, j1] * R_abs[:, i, j2] + half_size2[:, j2] * R_abs[:, i, j1]
+            separated |= np.abs(t[:, i2] * R[:, i1, j] - t[:, i1] * R[:, i2, j]) > r1 + r2
+
+    return ~separated
 
 
 def collisionCuboidSphere(cuboid: 'CuboidPrimitive', sphere: 'SpherePrimitive'):
@@ -71,6 +92,20 @@ def collisionSphereSphere(sphere1: 'SpherePrimitive', sphere2: 'SpherePrimitive'
         return False
 
 
+# ----------------------------------------------------------------------------------------------------------------------
+def collisionSphereSphereBatch(position1: np.ndarray, radius1: np.ndarray, position2: np.ndarray,
+                               radius2: np.ndarray) -> np.ndarray:
+    """
+    :param position1: (n, 3) centers of the first spheres
+    :param radius1: (n,) radii of the first spheres
+    :param position2: (n, 3) centers of the second spheres
+    :param radius2: (n,) radii of the second spheres
+    :return: (n,) bool array, True if the spheres of a pair collide
+    """
+    distance_squared = np.sum((position2 - position1) ** 2, axis=1)
+    return distance_squared <= (radius1 + radius2) ** 2
+
+
 # ======================================================================================================================
 @dataclasses.dataclass
 class CuboidCollisionData:
@@ -85,7 +120,6 @@ class CuboidPrimitive(ObjectPrimitive):
     orientation: np.ndarray
 
     points_local: list[np.ndarray]
-    points_global: list[np.ndarray]
 
     discretization: Union[float, int]
     discretization_type: str  # 'spacing', 'number'
@@ -100,8 +134,15 @@ class CuboidPrimitive(ObjectPrimitive):
         self.discretization = discretization
 
         self._calcPointsIntrinsic(self.discretization, self.discretization_type)
-        self.points_global = copy.copy(self.points_local)
-        self._updatePointsGlobal()
+
+    # === PROPERTIES ===================================================================================================
+    @property
+    def points_global(self) -> np.ndarray:
+        """
+        Discretized surface points in global coordinates. Only used for plotting, the collision check uses the
+        separating axis test and does not need the points.
+        """
+        return np.asarray(self.points_local) @ np.asarray(self.orientation).T + self.position
 
     # === METHODS ======================================================================================================
     def update(self, position: np.ndarray, orientation: np.ndarray, *args, **kwargs):
@@ -121,7 +162,6 @@ class CuboidPrimitive(ObjectPrimitive):
 
         self.position = position
         self.orientation = orientation
-        self._updatePointsGlobal()
 
     # ------------------------------------------------------------------------------------------------------------------
     def collision(self, object: ObjectPrimitive):
@@ -174,10 +214,6 @@ class CuboidPrimitive(ObjectPrimitive):
                                           (z * self.size[2] / 2) * (i / self.discretization)])
                         self.points_local.append(edges)
 
-    def _updatePointsGlobal(self):
-        for i, point in enumerate(self.points_local):
-            self.points_global[i] = self.orientation @ point + self.position
-
 
 # ======================================================================================================================
 class CylinderPrimitive(ObjectPrimitive):
@@ -308,6 +344,159 @@ class PhysicalBody(ABC):
         ...
 
 
+# ======================================================================================================================
+class CollisionBroadPhase:
+    """
+    Collision detection for many physical bodies.
+
+    The broad phase is a sweep and prune over the proximity spheres along one axis. It only passes the pairs with
+    overlapping proximity spheres to the narrow phase, which checks the bounding objects. Pairs of cuboids are checked
+    together with one vectorized separating axis test. The sort order of the previous check is reused, so the sort is
+    nearly linear if the bodies move little between two checks.
+
+    Bodies without a proximity sphere (radius <= 0) are checked against all other bodies.
+    """
+    bodies: list[PhysicalBody]
+    owners: list
+    axis: int
+
+    _order: np.ndarray
+
+    # === INIT =========================================================================================================
+    def __init__(self, axis: int = 0):
+        """
+        :param axis: Axis along which the proximity spheres are sorted
+        """
+        self.bodies = []
+        self.owners = []
+        self.axis = axis
+        self._order = np.zeros(0, dtype=int)
+
+    # === METHODS ======================================================================================================
+    def add(self, body: PhysicalBody, owner=None):
+        """
+        :param body: Physical body to check for collisions
+        :param owner: Object that is returned for collisions of this body. Defaults to the body
+        """
+        if body in self.bodies:
+            return
+        self.bodies.append(body)
+        self.owners.append(owner if owner is not None else body)
+        self._order = np.zeros(0, dtype=int)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def remove(self, body: PhysicalBody):
+        if body not in self.bodies:
+            return
+        index = self.bodies.index(body)
+        del self.bodies[index]
+        del self.owners[index]
+        self._order = np.zeros(0, dtype=int)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def getCandidatePairs(self) -> (np.ndarray, np.ndarray):
+        """
+        :return: Indices of the two bodies of all pairs with overlapping proximity spheres
+        """
+        n = len(self.bodies)
+        if n < 2:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+        positions = np.zeros((n, 3))
+        radii = np.zeros(n)
+        for index, body in enumerate(self.bodies):
+            position = np.asarray(body.proximity_sphere.position, dtype=float)
+            positions[index, :len(position)] = position
+            radii[index] = body.proximity_sphere.radius
+
+        bounded = radii > 0
+        if not np.all(bounded):
+            # Sort only the bodies with a proximity sphere
+            bounded_indices = np.flatnonzero(bounded)
+            first, second = self._sweepAndPrune(positions[bounded_indices], radii[bounded_indices], reuse_order=False)
+            first, second = bounded_indices[first], bounded_indices[second]
+
+            # Pair every body without a proximity sphere with all other bodies. Pairs of two such bodies only once
+            unbounded_indices = np.flatnonzero(~bounded)
+            unbounded_first = np.repeat(unbounded_indices, n)
+            unbounded_second = np.tile(np.arange(n), len(unbounded_indices))
+            keep = (unbounded_second != unbounded_first) & (bounded[unbounded_second]
+                                                            | (unbounded_second > unbounded_first))
+            first = np.concatenate((first, unbounded_first[keep]))
+            second = np.concatenate((second, unbounded_second[keep]))
+            return first.astype(int), second.astype(int)
+
+        return self._sweepAndPrune(positions, radii, reuse_order=True)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def collisionCheck(self) -> list[tuple]:
+        """
+        Checks all bodies for collisions and sets the collision state of each body.
+
+        :return: List of the owners of all colliding pairs
+        """
+        first, second = self.getCandidatePairs()
+        collided = np.zeros(len(first), dtype=bool)
+
+        cuboid_pairs = []
+        for k, (a, b) in enumerate(zip(first, second)):
+            for obj in self.bodies[a].bounding_objects.values():
+                for obj_other in self.bodies[b].bounding_objects.values():
+                    if isinstance(obj, CuboidPrimitive) and isinstance(obj_other, CuboidPrimitive):
+                        cuboid_pairs.append((k, obj, obj_other))
+                    elif not collided[k] and obj.collision(obj_other):
+                        collided[k] = True
+
+        if cuboid_pairs:
+            collisions = collisionCuboidCuboidBatch(
+                np.array([np.asarray(pair[1].position, dtype=float) for pair in cuboid_pairs]),
+                np.array([pair[1].orientation for pair in cuboid_pairs], dtype=float),
+                np.array([pair[1].size for pair in cuboid_pairs], dtype=float) / 2,
+                np.array([np.asarray(pair[2].position, dtype=float) for pair in cuboid_pairs]),
+                np.array([pair[2].orientation for pair in cuboid_pairs], dtype=float),
+                np.array([pair[2].size for pair in cuboid_pairs], dtype=float) / 2)
+            np.logical_or.at(collided, [pair[0] for pair in cuboid_pairs], collisions)
+
+        for body in self.bodies:
+            body.collision.collision_state = False
+
+        result = []
+        for a, b in zip(first[collided], second[collided]):
+            self.bodies[a].collision.collision_state = True
+            self.bodies[b].collision.collision_state = True
+            result.append((self.owners[a], self.owners[b]))
+        return result
+
+    # === PRIVATE METHODS ==============================================================================================
+    def _sweepAndPrune(self, positions: np.ndarray, radii: np.ndarray, reuse_order: bool) -> (np.ndarray, np.ndarray):
+        n = len(radii)
+        lower = positions[:, self.axis] - radii
+        upper = positions[:, self.axis] + radii
+
+        # A stable sort of the previous order is nearly linear if the order did not change much
+        order = self._order if (reuse_order and len(self._order) == n) else np.arange(n)
+        order = order[np.argsort(lower[order], kind='stable')]
+        if reuse_order:
+            self._order = order
+
+        lower_sorted = lower[order]
+        upper_sorted = upper[order]
+
+        # All bodies after k in the sorted order, whose interval starts before the interval of k ends, overlap on
+        # this axis
+        end = np.searchsorted(lower_sorted, upper_sorted, side='right')
+        counts = np.maximum(end - np.arange(n) - 1, 0)
+        first = np.repeat(np.arange(n), counts)
+        offsets = np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = first + 1 + offsets
+
+        first = order[first]
+        second = order[second]
+
+        overlap = collisionSphereSphereBatch(positions[first], radii[first], positions[second], radii[second])
+        return first[overlap], second[overlap]
+
+
 # ======================================================================================================================
 class CuboidPhysics(PhysicalBody):
     def __init__(self, size_x, size_y, size_z, position, orientation):
@@ -44,6 +44,19 @@ Tutorial
    See the Scheduler class for details on starting the simulation, using SimPy events, and running in
    either real-time or fast mode.
 
+5. Compiling an Action Tree:
+   Calling `compile()` on the top-level Action flattens its tree into a precomputed list of callables
+   (see ActionSchedule). Calls without arguments then run this list instead of recursing through the
+   tree. The schedule is rebuilt automatically when actions are added to or removed from its tree, or when
+   the priority of one of its actions changes. Parameters, functions and lambdas of existing actions are
+   read at compile time, so call `compile()` again after changing them. With `compile(profile=True)` the time spent in each action is recorded.
+
+   Example:
+       action.compile(profile=True)
+       action()
+       for label, calls, total_time in action.schedule.getProfile():
+           print(label, calls, total_time)
+
 ---------------------------------------------------------------------
 
 Below is the complete source code for the Action and Scheduling classes.
@@ -79,9 +92,13 @@ class Action:
     lambdas: Dict
     object: 'ScheduledObject'
     frequency: int
-    priority: int
     actions: Dict[str, 'Action']
     id: str
+    schedule: 'ActionSchedule'
+
+    # Incremented on every change of the tree below this action. Compiled schedules are rebuilt if the version of
+    # their top-level action changed
+    _structure_version: int
 
     def __init__(self, action_id: str = None, function: Callable = None,
                  parent: Union['Action', List['Action']] = None,
@@ -111,7 +128,9 @@ class Action:
         self.lambdas = lambdas
         self.function = function
         self.frequency = frequency
-        self.priority = priority
+        self._priority = priority
+        self.schedule = None
+        self._structure_version = 0
 
         # Generate a unique identifier if not provided.
         if action_id is None:
@@ -135,6 +154,18 @@ class Action:
         if object is not None:
             object.addAction(self)
 
+    @property
+    def priority(self) -> int:
+        return self._priority
+
+    @priority.setter
+    def priority(self, value: int):
+        # Keep the children of all parents sorted
+        self._priority = value
+        for parent in self._parents:
+            parent._sortActions()
+            parent._structureChanged()
+
     @property
     def parents(self) -> List['Action']:
         """Return the list of parent actions."""
@@ -170,12 +201,33 @@ class Action:
         """
         if parent in self._parents:
             self._parents.remove(parent)
+            parent._structureChanged()
+
+    def compile(self, profile: bool = False) -> 'ActionSchedule':
+        """
+        Flatten this action and all child actions into an ActionSchedule, which is used for all further
+        calls without arguments.
+
+        Args:
+            profile (bool): Record the number of calls and the time spent in each action.
+        """
+        self.schedule = ActionSchedule(self, profile=profile)
+        return self.schedule
+
+    def decompile(self):
+        """Remove the compiled schedule and run the action tree recursively again."""
+        self.schedule = None
 
     def run(self, *args, **kwargs):
         """
         Execute the action. Evaluates lambda parameters and then calls the function with a merged set
         of arguments (default parameters, additional kwargs, and lambda outputs). Then runs all child actions.
         """
+        # Arguments would have to be merged into every call, so they are only supported by the recursive run
+        if self.schedule is not None and not args and not kwargs:
+            self.schedule.run()
+            return
+
         # If 'calltree' is provided for debugging, print the call trace.
         if kwargs.get('calltree', False):
             try:
@@ -212,9 +264,13 @@ class Action:
             key = action.id
             if key in self.actions:
                 key = f"{key}_{id(action)}"
+            # Sort child actions by priority. The sort is stable, so appending an action with the highest
+            # priority value keeps the order.
+            needs_sort = len(self.actions) > 0 and action.priority < next(reversed(self.actions.values())).priority
             self.actions[key] = action
-            # Sort child actions by priority.
-            self.actions = dict(sorted(self.actions.items(), key=lambda item: item[1].priority))
+            if needs_sort:
+                self._sortActions()
+            self._structureChanged()
         elif callable(action):
             self.addAction(Action(action_id=None, function=action))
         else:
@@ -238,15 +294,158 @@ class Action:
             # Remove this parent from the child's parent list.
             action.removeParent(self)
             # Re-sort the dictionary.
-            self.actions = dict(sorted(self.actions.items(), key=lambda item: item[1].priority))
+            self._sortActions()
+            self._structureChanged()
 
     def removeAllActions(self):
         self.actions = {}
+        self._structureChanged()
 
     def __call__(self, *args, **kwargs):
         """Allow the Action instance to be called directly to execute it."""
         return self.run(*args, **kwargs)
 
+    def _sortActions(self):
+        """Sort the child actions by priority. The sort is stable, so actions with equal priority keep their order."""
+        self.actions = dict(sorted(self.actions.items(), key=lambda item: item[1].priority))
+
+    def _structureChanged(self):
+        """Increment the structure version of this action and of all actions above it, whose trees contain it."""
+        visited = set()
+        stack = [self]
+        while stack:
+            action = stack.pop()
+            if action in visited:
+                continue
+            visited.add(action)
+            action._structure_version += 1
+            stack.extend(action._parents)
+
+
+@dataclasses.dataclass
+class ActionProfile:
+    """
+    Timing of a single action in a compiled schedule.
+
+    Attributes:
+        label (str): Object and action id.
+        calls (int): Number of calls of the function of the action.
+        total_time (float): Time spent in the function in seconds. Child actions are profiled separately.
+    """
+    label: str
+    calls: int = 0
+    total_time: float = 0
+
+
+class ActionSchedule:
+    """
+    Flattened execution order of an Action tree.
+
+    The tree is traversed once in the same order as Action.run. Every call of a function becomes one entry
+    with its keyword arguments merged in advance. Only lambdas are still evaluated on every run, and each
+    lambda is evaluated once per run of its action, as in the recursive run.
+
+    Attributes:
+        action (Action): The top-level action.
+        profiling (bool): Whether the time spent in each action is recorded.
+        profile (dict[Action, ActionProfile]): Recorded timing per action.
+    """
+    action: Action
+    profiling: bool
+    profile: Dict[Action, ActionProfile]
+
+    def __init__(self, action: Action, profile: bool = False):
+        self.action = action
+        self.profiling = profile
+        self.profile = {}
+        self._entries = []
+        self._num_slots = 0
+        self._version = None
+        self.update()
+
+    def update(self):
+        """Rebuild the entries from the current action tree."""
+        self._entries = []
+        self._num_slots = 0
+        self._addAction(self.action, [])
+        self._version = self.action._structure_version
+
+    def run(self):
+        if self._version != self.action._structure_version:
+            self.update()
+
+        values = [None] * self._num_slots
+        for action, function, lambdas, slot, kwargs, layers in self._entries:
+            if lambdas is not None:
+                values[slot] = {key: value() for key, value in lambdas}
+            if function is None:
+                continue
+            if layers is not None:
+                kwargs = {}
+                for layer in layers:
+                    kwargs.update(values[layer] if isinstance(layer, int) else layer)
+
+            if self.profiling:
+                start = time.perf_counter()
+                function(**kwargs)
+                self._record(action, time.perf_counter() - start)
+            else:
+                function(**kwargs)
+
+    def getProfile(self) -> List[tuple]:
+        """
+        Returns:
+            List of (label, calls, total_time), sorted by the total time.
+        """
+        profile = sorted(self.profile.values(), key=lambda item: item.total_time, reverse=True)
+        return [(item.label, item.calls, item.total_time) for item in profile]
+
+    def resetProfile(self):
+        self.profile = {}
+
+    def _addAction(self, action: Action, inherited_layers: list):
+        # Same precedence as Action.run: own parameters < arguments from the parent < own lambdas
+        layers = self._mergeLayers([dict(action.parameters)] + inherited_layers)
+        slot = None
+        lambdas = None
+        if action.lambdas:
+            slot = self._num_slots
+            self._num_slots += 1
+            lambdas = list(action.lambdas.items())
+            layers = layers + [slot]
+
+        if action.function is not None or lambdas is not None:
+            if all(isinstance(layer, dict) for layer in layers):
+                kwargs = layers[0] if layers else {}
+                self._entries.append((action, action.function, lambdas, slot, kwargs, None))
+            else:
+                self._entries.append((action, action.function, lambdas, slot, None, layers))
+
+        # The sort order is recomputed, so the schedule does not depend on how the children were added
+        action._sortActions()
+        for child in action.actions.values():
+            self._addAction(child, layers)
+
+    @staticmethod
+    def _mergeLayers(layers: list) -> list:
+        merged = []
+        for layer in layers:
+            if isinstance(layer, dict) and merged and isinstance(merged[-1], dict):
+                merged[-1] = {**merged[-1], **layer}
+            elif isinstance(layer, dict) and not layer:
+                continue
+            else:
+                merged.append(layer)
+        return merged
+
+    def _record(self, action: Action, duration: float):
+        entry = self.profile.get(action)
+        if entry is None:
+            label = f"{action.object.id}/{action.id}" if getattr(action, 'object', None) is not None else action.id
+            entry = self.profile[action] = ActionProfile(label=label)
+        entry.calls += 1
+        entry.total_time += duration
+
 
 @dataclasses.dataclass
 class SchedulingData:
@@ -464,7 +663,8 @@ class Scheduler:
     steps: int
     thread: threading.Thread
 
-    def __init__(self, action: Action, mode: str = 'rt', Ts: float = 1):
+    def __init__(self, action: Action, mode: str = 'rt', Ts: float = 1, compile: bool = False,
+                 profile: bool = False):
         """
         Initialize the Scheduler.
 
@@ -472,10 +672,14 @@ class Scheduler:
             action (Action): The root action to schedule.
             mode (str): 'rt' for real-time, 'fast' for fast simulation.
             Ts (float): Sample time.
+            compile (bool): Run the root action as a compiled ActionSchedule.
+            profile (bool): Record the time spent in each action. Requires compile.
         """
         self.action = action
         self.mode = mode
         self.Ts = Ts
+        if compile:
+            self.action.compile(profile=profile)
         self.simpy_events = SimpyEvents()
         self.thread = None
         self._init()
@@ -651,6 +651,8 @@ class BILBO_Dynamics_3D(core.dynamics.Dynamics):
     input_space = BILBO_3D_InputSpace()
     output_space = BILBO_3D_StateSpace_7D()
 
+    vectorized = True
+
     def __init__(self, model: BilboModel, Ts, poles=None, eigenvectors=None, speed_control: bool = False, *args,
                  **kwargs):
         super().__init__(Ts=Ts, *args, **kwargs)
@@ -667,15 +669,29 @@ class BILBO_Dynamics_3D(core.dynamics.Dynamics):
         self.state = self._dynamics(self.state, self.input)
 
     def _dynamics(self, state, input):
+        states = np.array([[state[i].value for i in range(self.n)]])
+        inputs = np.array([[input[0].value, input[1].value]])
+        state_dot = self._stateDerivative(states, inputs)[0]
+        state = state + state_dot * self.Ts
+        return state
+
+    def _dynamicsBatch(self, states: np.ndarray, input: np.ndarray):
+        return states + self._stateDerivative(states, input) * self.Ts
+
+    def _batchKey(self):
+        return type(self), self.Ts, id(self.model)
+
+    def _stateDerivative(self, states: np.ndarray, input: np.ndarray) -> np.ndarray:
+        """
+        Nonlinear dynamics for an (n_agents, 7) array of states and an (n_agents, 2) array of inputs.
+        """
         g = 9.81
-        x = state[0].value
-        y = state[1].value
-        v = state[2].value
-        theta = state[3].value
-        theta_dot = state[4].value
-        psi = state[5].value
-        psi_dot = state[6].value
-        u = [input[0].value, input[1].value]
+        v = states[:, 2]
+        theta = states[:, 3]
+        theta_dot = states[:, 4]
+        psi = states[:, 5]
+        psi_dot = states[:, 6]
+        u = [input[:, 0], input[:, 1]]
         model = self.model
         C_12 = (model.I_y + model.m_b * model.l ** 2) * model.m_b * model.l
         C_22 = model.m_b ** 2 * model.l ** 2 * np.cos(theta)
@@ -708,20 +724,19 @@ class BILBO_Dynamics_3D(core.dynamics.Dynamics):
         C_23 = (model.m_b ** 2 * model.l ** 2 + (model.m_b + 2 * model.m_w + 2 * model.I_w / model.r_w ** 2) * (
                 model.I_z - model.I_x - model.m_b * model.l ** 2)) * np.cos(theta)
 
-        state_dot = np.zeros(self.n)
-        state_dot[0] = v * np.cos(psi)
-        state_dot[1] = v * np.sin(psi)
-        state_dot[2] = (np.sin(theta) / V_1) * (-C_11 * g + C_12 * theta_dot ** 2 + C_13 * psi_dot ** 2) - (
+        state_dot = np.zeros((len(states), self.n))
+        state_dot[:, 0] = v * np.cos(psi)
+        state_dot[:, 1] = v * np.sin(psi)
+        state_dot[:, 2] = (np.sin(theta) / V_1) * (-C_11 * g + C_12 * theta_dot ** 2 + C_13 * psi_dot ** 2) - (
                 D_11 / V_1) * v + (D_12 / V_1) * theta_dot + (B_1 / V_1) * (u[0] + u[1]) - model.tau_x * v
-        state_dot[3] = theta_dot
-        state_dot[4] = (np.sin(theta) / V_1) * (C_21 * g - C_22 * theta_dot ** 2 - C_23 * psi_dot ** 2) + (
+        state_dot[:, 3] = theta_dot
+        state_dot[:, 4] = (np.sin(theta) / V_1) * (C_21 * g - C_22 * theta_dot ** 2 - C_23 * psi_dot ** 2) + (
                 D_21 / V_1) * v - (D_22 / V_1) * theta_dot - (B_2 / V_1) * (
                                u[0] + u[1]) - model.tau_theta * theta_dot
-        state_dot[5] = psi_dot
-        state_dot[6] = (np.sin(theta) / V_2) * (C_31 * theta_dot * psi_dot - C_32 * psi_dot * v) - (
+        state_dot[:, 5] = psi_dot
+        state_dot[:, 6] = (np.sin(theta) / V_2) * (C_31 * theta_dot * psi_dot - C_32 * psi_dot * v) - (
                 D_33 / V_2) * psi_dot - (B_3 / V_2) * (u[0] - u[1])
-        state = state + state_dot * self.Ts
-        return state
+        return state_dot
 
     def _output(self, state):
         return state['theta']
@@ -51,6 +51,8 @@ class FRODO_Dynamics(core.dynamics.Dynamics):
     state_space = core.spaces.Space2D()
     output_space = core.spaces.Space2D()
 
+    vectorized = True
+
     def init(self):
         pass
 
@@ -72,6 +74,14 @@ class FRODO_Dynamics(core.dynamics.Dynamics):
         state['psi'] = state['psi'] + self.Ts * input['psi_dot']
         return state
 
+    def _dynamicsBatch(self, states: np.ndarray, input: np.ndarray):
+        # States: [x, y, psi], inputs: [v, psi_dot]
+        next_states = np.empty_like(states)
+        next_states[:, 0] = states[:, 0] + self.Ts * input[:, 0] * np.cos(states[:, 2])
+        next_states[:, 1] = states[:, 1] + self.Ts * input[:, 0] * np.sin(states[:, 2])
+        next_states[:, 2] = states[:, 2] + self.Ts * input[:, 1]
+        return next_states
+
     def _output(self, state: core.spaces.State):
         output = self.output_space.getState()
         output['pos']['x'] = state['pos']['x']
@@ -3,6 +3,7 @@ from core.device import Device
 from robots.bilbo.manager.bilbo_manager_cli import BILBO_Manager_CommandSet
 from core.utils.callbacks import callback_definition, CallbackContainer
 from robots.bilbo.robot.bilbo import BILBO
+from robots.bilbo.robot.bilbo_data import twiprSampleFromDict
 from robots.bilbo.robot.bilbo_definitions import BILBO_Control_Mode, TWIPR_IDS, TWIPR_PASSWORD, TWIPR_REMOTE_START_COMMAND, \
     TWIPR_USER_NAME, TWIPR_REMOTE_STOP_COMMAND
 from robots.bilbo.manager.robotscanner import RobotScanner
@@ -47,6 +48,7 @@ class BILBO_Manager:
         self.deviceManager.callbacks.new_device.register(self._newDevice_callback)
         self.deviceManager.callbacks.device_disconnected.register(self._deviceDisconnected_callback)
         self.deviceManager.callbacks.stream.register(self._deviceStream_callback)
+        self.deviceManager.stream_hub.registerDecoder('bilbo', twiprSampleFromDict)
 
         self.robots = {}
 
@@ -158,7 +160,7 @@ class BILBO_Manager:
                 logger.warning(f"Robot attempted to connect with type {device.information.device_type}")
             return
 
-        robot = BILBO(device)
+        robot = BILBO(device, stream_hub=self.deviceManager.stream_hub)
 
         # Check if this robot ID is already used
         if robot.device.information.device_id in self.robots.keys():
@@ -1,4 +1,5 @@
 from core.device import Device
+from core.stream_hub import StreamHub, StreamSample
 from robots.bilbo.robot.bilbo_control import BILBO_Control
 from robots.bilbo.robot.bilbo_core import BILBO_Core
 from robots.bilbo.robot.bilbo_experiment import BILBO_Experiments
@@ -20,14 +21,18 @@ class BILBO:
     data: TWIPR_Data
 
     # ==================================================================================================================
-    def __init__(self, device: Device, *args, **kwargs):
+    def __init__(self, device: Device, stream_hub: StreamHub = None, *args, **kwargs):
+        """
+        :param stream_hub: Hub of the device manager. If given, the stream is taken decoded from the hub instead of
+            being decoded again for the robot and its interfaces
+        """
         self.device = device
 
         self.core = BILBO_Core(device=device, robot_id=self.device.information.device_id)
 
         self.control = BILBO_Control(core=self.core)
         self.experiments = BILBO_Experiments(core=self.core)
-        self.interfaces = BILBO_Interfaces(core=self.core, control=self.control)
+        self.interfaces = BILBO_Interfaces(core=self.core, control=self.control, stream_hub=stream_hub)
 
         self.data = TWIPR_Data()
 
@@ -36,7 +41,10 @@ class BILBO:
         # TODO Remove this from here
         self.cli_command_set = BILBO_CommandSet(self)
 
-        self.device.callbacks.stream.register(self._onStreamCallback)
+        if stream_hub is not None:
+            stream_hub.subscribe(self._onStreamSample_callback, device_id=self.device.information.device_id)
+        else:
+            self.device.callbacks.stream.register(self._onStreamCallback)
         self.device.callbacks.disconnected.register(self._disconnected_callback)
 
         self.interfaces.openLivePlot('theta')
@@ -108,6 +116,10 @@ class BILBO:
     def _onStreamCallback(self, stream, *args, **kwargs):
         self.data = twiprSampleFromDict(stream.data)
 
+    # ------------------------------------------------------------------------------------------------------------------
+    def _onStreamSample_callback(self, sample: StreamSample, *args, **kwargs):
+        self.data = sample.data
+
     # ------------------------------------------------------------------------------------------------------------------
     def _disconnected_callback(self, *args, **kwargs):
         del self.experiments
@@ -26,7 +26,7 @@ class BILBO_Control:
         self.mode = None
 
         self.device.events.event.on(callback=self.handleEventMessage, flags={'event': 'control'}, input_resource=True)
-        self.device.events.stream.on(callback=self._handle_stream, input_resource=True)
+        self.device.events.stream.on(callback=self._handle_stream, input_resource=True, ordered=True)
 
     # ------------------------------------------------------------------------------------------------------------------
     def setControlMode(self, mode: (int, BILBO_Control_Mode), *args, **kwargs):
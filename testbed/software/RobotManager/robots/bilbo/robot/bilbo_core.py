@@ -42,7 +42,7 @@ class BILBO_Core:
 
         self.device.events.event.on(self._handleLogMessage, flags={'event': 'log'}, input_resource=True)
         self.device.events.event.on(self._handleSpeakEventMessage, flags={'event': 'speak'}, input_resource=True)
-        self.device.events.stream.on(self._handleStream, input_resource=True)
+        self.device.events.stream.on(self._handleStream, input_resource=True, ordered=True)
 
     # ------------------------------------------------------------------------------------------------------------------
     def beep(self, frequency=1000, time_ms=250, repeats=1):
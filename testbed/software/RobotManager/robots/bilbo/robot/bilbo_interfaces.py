@@ -3,6 +3,7 @@ import threading
 import time
 
 # === CUSTOM PACKAGES ==================================================================================================
+from core.stream_hub import StreamHub, StreamSample
 from core.utils.sound.sound import speak
 from extensions.cli.src.cli import CommandSet, Command, CommandArgument
 from extensions.joystick.joystick_manager import Joystick
@@ -18,6 +19,7 @@ from core.utils.exit import register_exit_callback
 # ======================================================================================================================
 
 JOYSTICK_UPDATE_TIME = 0.05
+LIVE_PLOT_RATE = 20  # Maximum update rate of the live plots in Hz if the stream is taken from a stream hub
 
 
 # ======================================================================================================================
@@ -42,10 +44,14 @@ class BILBO_Interfaces:
     _exit_joystick_thread: bool
 
     # ------------------------------------------------------------------------------------------------------------------
-    def __init__(self, core: BILBO_Core, control: BILBO_Control):
+    def __init__(self, core: BILBO_Core, control: BILBO_Control, stream_hub: StreamHub = None):
         self.core = core
         self.control = control
-        self.core.events.stream.on(self._streamCallback)
+        if stream_hub is not None:
+            stream_hub.subscribe(self._streamSample_callback, device_id=self.core.id, mode='decimate',
+                                 rate=LIVE_PLOT_RATE)
+        else:
+            self.core.events.stream.on(self._streamCallback)
 
         self.live_plots = []
         self.joystick = None
@@ -168,8 +174,14 @@ class BILBO_Interfaces:
 
     # ------------------------------------------------------------------------------------------------------------------
     def _streamCallback(self, stream, *args, **kwargs):
-        data = twiprSampleFromDict(stream.data)
+        self._updateLivePlots(twiprSampleFromDict(stream.data))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _streamSample_callback(self, sample: StreamSample, *args, **kwargs):
+        self._updateLivePlots(sample.data)
 
+    # ------------------------------------------------------------------------------------------------------------------
+    def _updateLivePlots(self, data):
         for plot in self.live_plots:
             state_name = plot["state_name"]
             state_data = getattr(data.estimation.state, state_name)